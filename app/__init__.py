@@ -1,4 +1,4 @@
-from flask import Flask, send_from_directory
+from flask import Flask, send_file, jsonify, abort
 from flask_sqlalchemy import SQLAlchemy
 from flask_login import LoginManager
 from datetime import datetime
@@ -82,7 +82,47 @@ def seed_sample_posts():
     db.session.commit()
 
 # ========================
-# 3. Application Factory (Hàm chính)
+# 3. Cập nhật schema cho database đã tồn tại
+# ========================
+def upgrade_schema():
+    """
+    db.create_all() không sửa bảng đã có, nên bổ sung cột / index còn thiếu
+    (chỉ thêm, không xóa) để hotel.db cũ chạy được với model mới.
+    """
+    from sqlalchemy import inspect, text
+
+    inspector = inspect(db.engine)
+    existing_tables = set(inspector.get_table_names())
+
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        columns = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in columns:
+                continue
+            col_type = column.type.compile(dialect=db.engine.dialect)
+            with db.engine.begin() as conn:
+                conn.execute(text(
+                    f"ALTER TABLE {table.name} ADD COLUMN {column.name} {col_type}"
+                ))
+
+        indexes = {i["name"] for i in inspector.get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in indexes:
+                index.create(bind=db.engine, checkfirst=True)
+
+    # posts.created_at tạo bằng NOW() của SQLite chỉ có 'YYYY-MM-DD HH:MM:SS', trong khi
+    # cursor keyset bind '...SS.000000' -> so sánh chuỗi lệch, trang không tiến. Chuẩn hóa.
+    if db.engine.dialect.name == "sqlite" and "posts" in existing_tables:
+        with db.engine.begin() as conn:
+            conn.execute(text(
+                "UPDATE posts SET created_at = created_at || '.000000' WHERE length(created_at) = 19"
+            ))
+
+# ========================
+# 4. Application Factory (Hàm chính)
 # ========================
 def create_app(config_name=None):
     app = Flask(__name__, template_folder='../templates', static_folder='../static')
@@ -97,8 +137,69 @@ def create_app(config_name=None):
     # Tự động tạo thư mục uploads nếu chưa có
     os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
+    # Ghi file mới theo bố cục shard uploads/ab/cd/<file> (đọc được cả bố cục phẳng cũ)
+    app.config['UPLOAD_SHARDING'] = True
+
+    # Lưu media theo nội dung: file trùng sha256 dùng chung 1 blob (tắt mặc định)
+    app.config['MEDIA_DEDUP'] = os.environ.get('MEDIA_DEDUP') == '1'
+
+    # Giới hạn dung lượng upload-thumbnail theo loại (kiểm tra trong lúc stream)
+    app.config['UPLOAD_MAX_IMAGE_BYTES'] = 25 * 1024 * 1024
+    app.config['UPLOAD_MAX_VIDEO_BYTES'] = 500 * 1024 * 1024
+
+    # Số process tạo ảnh thu nhỏ (0 = chạy ngay trong request)
+    app.config['DERIVATIVE_WORKERS'] = 2
+
+    # Bỏ EXIF / ảnh nhúng và xoay ảnh upload theo Orientation trong cùng job (app/exif_strip.py)
+    app.config['STRIP_IMAGE_METADATA'] = True
+
+    # Cache ảnh resize theo yêu cầu (/uploads/<w>x<h>/...)
+    app.config['RESIZE_CACHE_MAX_BYTES'] = 512 * 1024 * 1024
+    app.config['RESIZE_MAX_DIMENSION'] = 2048
+    app.config['RESIZE_CACHE_MAX_AGE'] = 7 * 24 * 3600
+
+    # Nơi lưu media upload: "local" (UPLOAD_FOLDER) | "s3" (S3 / MinIO, UPLOAD_FOLDER thành cache cục bộ)
+    app.config['MEDIA_STORAGE'] = os.environ.get('MEDIA_STORAGE', 'local')
+    app.config['S3_ENDPOINT'] = os.environ.get('S3_ENDPOINT')
+    app.config['S3_BUCKET'] = os.environ.get('S3_BUCKET')
+    app.config['S3_ACCESS_KEY'] = os.environ.get('S3_ACCESS_KEY')
+    app.config['S3_SECRET_KEY'] = os.environ.get('S3_SECRET_KEY')
+    app.config['S3_REGION'] = os.environ.get('S3_REGION', 'us-east-1')
+    app.config['S3_PRESIGN_EXPIRES'] = 3600
+    app.config['S3_TIMEOUT'] = 30
+
+    # Metadata cho media là URL ngoài: lấy ở thread nền, lưu DB với TTL
+    app.config['REMOTE_META_BACKGROUND'] = True
+    app.config['REMOTE_META_WORKERS'] = 4
+    app.config['REMOTE_META_TIMEOUT'] = 5.0
+    app.config['REMOTE_META_TTL'] = 24 * 3600
+    app.config['REMOTE_META_RETRY'] = 600     # URL lỗi: thử lại sau 10 phút
+
+    # Cache đọc-qua cho video URL ngoài (/remote/<media id>), tắt mặc định
+    app.config['REMOTE_CACHE'] = os.environ.get('REMOTE_CACHE') == '1'
+    app.config['REMOTE_CACHE_MAX_BYTES'] = 2 * 1024 ** 3
+    app.config['REMOTE_CACHE_TIMEOUT'] = 30
+    app.config['REMOTE_CACHE_MAX_AGE'] = 24 * 3600
+
+    # Bộ lọc spam bình luận (app/spam_filter.py): model học bằng train_spam_filter.py
+    app.config['SPAM_FILTER'] = True
+    app.config['SPAM_MODEL_PATH'] = None          # None = <instance>/spam_model.npz
+    app.config['SPAM_APPROVE_THRESHOLD'] = 0.01   # P(spam) <= ngưỡng -> tự duyệt
+    app.config['SPAM_REJECT_THRESHOLD'] = 0.99    # P(spam) >= ngưỡng -> tự từ chối
+    app.config['SPAM_BATCH_SIZE'] = 256
+    app.config['SPAM_MIN_EXAMPLES'] = 20          # số bình luận tối thiểu mỗi loại để học
+
+    # Nhập bình luận từ file export NDJSON / CSV: số dòng mỗi lô INSERT (executemany)
+    app.config['INGEST_BATCH_SIZE'] = 5000
+
+    # Giao việc đẩy bytes file upload cho proxy: None | "x-sendfile" | "x-accel"
+    app.config['MEDIA_OFFLOAD'] = os.environ.get('MEDIA_OFFLOAD') or None
+    app.config['X_ACCEL_PREFIX'] = '/_uploads/'
+
     if config_name == 'testing':
         app.config['TESTING'] = True
+        app.config['DERIVATIVE_WORKERS'] = 0
+        app.config['REMOTE_META_BACKGROUND'] = False
         app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///:memory:'
     else:
         app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///hotel.db'
@@ -117,7 +218,32 @@ def create_app(config_name=None):
     # --- Route xử lý file Upload (QUAN TRỌNG: Phải nằm trong create_app) ---
     @app.route("/uploads/<path:filename>")
     def uploaded_file(filename):
-        return send_from_directory(app.config['UPLOAD_FOLDER'], filename)
+        from app.file_serving import serve_upload
+        return serve_upload(filename)
+
+    # --- Resize theo yêu cầu: /uploads/480x0/<file> (0 = không giới hạn chiều đó) ---
+    @app.route("/uploads/<int:width>x<int:height>/<path:filename>")
+    def resized_file(width, height, filename):
+        from app.resize_cache import resized_path, ResizeError
+        for _ in range(2):
+            try:
+                path = resized_path(filename, width, height)
+            except ResizeError as e:
+                return jsonify({"error": str(e)}), 400
+            if path is None:
+                abort(404)
+            try:
+                return send_file(path, max_age=app.config['RESIZE_CACHE_MAX_AGE'])
+            except FileNotFoundError:
+                # Bản resize bị xóa (LRU) giữa lúc kiểm tra và mở file -> render lại
+                continue
+        abort(503)
+
+    # --- Video URL ngoài qua cache trên đĩa (hỗ trợ Range) ---
+    @app.route("/remote/<int:media_id>")
+    def remote_file(media_id):
+        from app.remote_cache import serve
+        return serve(media_id)
 
     # --- Đăng ký Blueprint ---
     from app.routes import auth
@@ -129,7 +255,12 @@ def create_app(config_name=None):
         from app.models.post import Post
         
         db.create_all()         
+        upgrade_schema()
         seed_sample_posts()     
         seed_selenium_user()    
+
+        # Bộ đếm trạng thái bình luận / chiến dịch: dựng lần đầu từ dữ liệu có sẵn
+        from app import status_counters
+        status_counters.initialize()
         
     return app
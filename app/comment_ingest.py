@@ -0,0 +1,308 @@
+"""
+Nhập bình luận hàng loạt từ file export của từng nền tảng (NDJSON / CSV).
+
+- Đọc theo stream từng dòng, gom lô INGEST_BATCH_SIZE dòng rồi INSERT bằng
+  executemany (một câu lệnh, nhiều bộ tham số), commit từng lô -> bộ nhớ chỉ
+  giữ một lô dù file vài triệu dòng.
+- Chống trùng theo khóa (source, external_id) (unique index): bỏ trùng trong lô,
+  bỏ dòng đã có trong DB (tra bằng index), INSERT còn dùng OR IGNORE / ON CONFLICT
+  DO NOTHING nên nhập lại cùng một file bao nhiêu lần cũng không sinh dòng mới.
+- Tên trường khác nhau giữa các nền tảng (message / text / comment...) được ánh
+  xạ qua FIELDS; dòng lỗi được đếm và báo số dòng, không làm dừng cả lần nhập.
+- Bộ đếm trạng thái / theo bài viết cập nhật cùng lô; sau khi nhập, bình luận
+  pending đi qua bộ lọc spam (nếu đã có model).
+"""
+import csv
+import gzip
+import io
+import json
+import zlib
+from datetime import datetime, timezone
+
+from flask import current_app
+
+from app import db, spam_filter, status_counters
+from app.comment_posts import normalize_title
+from app.models.comment import Comment
+from app.models.post import Post
+
+FORMATS = ("ndjson", "csv")
+CONTENT_TYPES = {
+    "application/x-ndjson": "ndjson", "application/ndjson": "ndjson", "application/jsonl": "ndjson",
+    "application/json": "ndjson", "text/csv": "csv",
+}
+SOURCES = {
+    "website": "Website", "web": "Website", "facebook": "Facebook", "fb": "Facebook",
+    "zalo": "Zalo", "tiktok": "Tiktok", "youtube": "Youtube", "yt": "Youtube",
+}
+STATUSES = ("pending", "approved", "rejected")
+# Trường của Comment -> tên trường trong file export (theo thứ tự ưu tiên, "a.b" = object lồng nhau)
+FIELDS = {
+    "external_id": ("external_id", "comment_id", "cid", "id"),
+    "source": ("source", "platform"),
+    "author_name": ("author_name", "author", "from.name", "user.nickname", "username", "name"),
+    "author_email": ("author_email", "email"),
+    "content": ("content", "message", "text", "comment"),
+    "post_id": ("post_id",),
+    "post_title": ("post_title",),
+    "status": ("status",),
+    "created_at": ("created_at", "created_time", "create_time", "timestamp", "published_at"),
+}
+AVATAR_COLORS = ("#e0e7ff", "#d1fae5", "#e0f2fe", "#fef3c7", "#fce7f3", "#feebea")
+ID_CHUNK = 500     # số external_id mỗi câu SELECT kiểm tra trùng
+MAX_ERRORS = 20    # số dòng lỗi giữ lại trong báo cáo
+
+
+def detect_format(name=None, content_type=None):
+    """Định dạng theo tên file (.ndjson / .jsonl / .csv, có thể .gz) hoặc Content-Type"""
+    if content_type:
+        fmt = CONTENT_TYPES.get(content_type.split(";")[0].strip().lower())
+        if fmt:
+            return fmt
+    name = (name or "").lower()
+    if name.endswith(".gz"):
+        name = name[:-3]
+    if name.endswith((".ndjson", ".jsonl", ".json")):
+        return "ndjson"
+    if name.endswith(".csv"):
+        return "csv"
+    return None
+
+
+def open_export(path):
+    """File export (tự giải nén .gz) dạng stream nhị phân"""
+    return gzip.open(path, "rb") if path.endswith(".gz") else open(path, "rb")
+
+
+def read_ndjson(stream):
+    """stream nhị phân -> (số dòng, dict | None, lỗi | None)"""
+    for lineno, line in enumerate(stream, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            yield lineno, None, f"JSON không hợp lệ: {e}"
+            continue
+        if isinstance(record, dict):
+            yield lineno, record, None
+        else:
+            yield lineno, None, "mỗi dòng phải là một object JSON"
+
+
+def read_csv(stream):
+    """stream nhị phân (có header) -> (số dòng, dict | None, lỗi | None)"""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", errors="replace", newline="")
+    reader = csv.DictReader(text)
+    for record in reader:
+        yield reader.line_num, record, None
+
+
+def read_records(stream, fmt):
+    if fmt not in FORMATS:
+        raise ValueError("format phải là ndjson hoặc csv")
+    return read_ndjson(stream) if fmt == "ndjson" else read_csv(stream)
+
+
+def parse_timestamp(value):
+    """ISO 8601 / epoch giây hoặc mili giây / dd/mm/YYYY HH:MM -> datetime UTC (naive)"""
+    if value is None or value == "":
+        return datetime.utcnow()
+    if isinstance(value, (int, float)) or str(value).strip().isdigit():
+        seconds = float(value)
+        if seconds > 1e11:  # mili giây
+            seconds /= 1000
+        return datetime.fromtimestamp(seconds, timezone.utc).replace(tzinfo=None)
+    value = str(value).strip()
+    try:
+        parsed = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        for fmt in ("%d/%m/%Y %H:%M", "%d/%m/%Y"):
+            try:
+                return datetime.strptime(value, fmt)
+            except ValueError:
+                pass
+        raise ValueError(f"thời gian không hợp lệ: {value}")
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _field(record, name):
+    for path in FIELDS[name]:
+        value = record
+        for part in path.split("."):
+            value = value.get(part) if isinstance(value, dict) else None
+        if value not in (None, ""):
+            return value
+    return None
+
+
+def _avatar(name):
+    words = name.split()
+    text = (words[0][0] + words[-1][0] if len(words) > 1 else name[:2]).upper()
+    return text, AVATAR_COLORS[zlib.crc32(name.encode()) % len(AVATAR_COLORS)]
+
+
+def canonical_source(source):
+    source = str(source or "").strip()
+    return SOURCES.get(source.lower(), source)
+
+
+class PostLookup:
+    """post_id / post_title trong file -> (post_id, tiêu đề) của bài viết có thật (tải một lần)"""
+
+    def __init__(self):
+        self.titles = dict(db.session.query(Post.id, Post.title))
+        by_title = {}
+        for post_id, title in self.titles.items():
+            by_title.setdefault(normalize_title(title), []).append(post_id)
+        self.by_title = {title: ids[0] for title, ids in by_title.items() if len(ids) == 1}
+
+    def resolve(self, post_id, post_title):
+        if post_id is not None:
+            post_id = int(post_id)
+            if post_id in self.titles:
+                return post_id, self.titles[post_id]
+        if post_title:
+            post_id = self.by_title.get(normalize_title(post_title))
+            return post_id, str(post_title)[:255]
+        return None, None
+
+
+def to_row(record, source, posts):
+    """Một dòng export -> bộ tham số INSERT (đủ mọi cột để dùng chung executemany); sai -> ValueError"""
+    external_id = _field(record, "external_id")
+    content = _field(record, "content")
+    source = canonical_source(source or _field(record, "source"))
+    if external_id is None:
+        raise ValueError("thiếu external_id")
+    if not content:
+        raise ValueError("thiếu nội dung")
+    if not source:
+        raise ValueError("thiếu source")
+
+    author = " ".join(str(_field(record, "author_name") or "Khách").split())[:100] or "Khách"
+    avatar_text, avatar_bg = _avatar(author)
+    status = str(_field(record, "status") or "pending").lower()
+    post_id, post_title = posts.resolve(_field(record, "post_id"), _field(record, "post_title"))
+    return {
+        "source": source[:50],
+        "external_id": str(external_id)[:128],
+        "author_name": author,
+        "author_email": (str(_field(record, "author_email") or "")[:120]) or None,
+        "avatar_text": avatar_text,
+        "avatar_bg": avatar_bg,
+        "content": str(content),
+        "post_id": post_id,
+        "post_title": post_title,
+        "status": status if status in STATUSES else "pending",
+        "spam_score": None,
+        "auto_moderated": False,
+        "created_at": parse_timestamp(_field(record, "created_at")),
+    }
+
+
+def _insert_statement():
+    """INSERT bỏ qua dòng trùng unique key (nhập song song cùng một file vẫn an toàn)"""
+    table = Comment.__table__
+    dialect = db.engine.dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+        return insert(table).on_conflict_do_nothing()
+    if dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+        return insert(table).on_conflict_do_nothing()
+    if dialect == "mysql":
+        return table.insert().prefix_with("IGNORE")
+    return table.insert()
+
+
+def _existing_keys(rows):
+    by_source = {}
+    for source, external_id in rows:
+        by_source.setdefault(source, []).append(external_id)
+    found = set()
+    for source, ids in by_source.items():
+        for i in range(0, len(ids), ID_CHUNK):
+            query = (db.session.query(Comment.external_id)
+                     .filter(Comment.source == source, Comment.external_id.in_(ids[i:i + ID_CHUNK])))
+            found.update((source, external_id) for (external_id,) in query)
+    return found
+
+
+def _insert_batch(rows, summary):
+    """rows: {(source, external_id): tham số} -> INSERT các dòng chưa có, commit"""
+    existing = _existing_keys(rows)
+    new = [row for key, row in rows.items() if key not in existing]
+    summary["duplicates"] += len(rows) - len(new)
+    try:
+        if new:
+            inserted = db.session.execute(_insert_statement(), new).rowcount
+            if inserted != len(new):
+                # Tiến trình khác vừa chèn cùng khóa -> đếm lại bộ đếm khi xong
+                summary["raced"] = True
+                inserted = max(inserted, 0)
+            summary["inserted"] += inserted
+            summary["duplicates"] += len(new) - inserted
+
+            deltas, per_post = {}, {}
+            for row in new:
+                deltas[row["status"]] = deltas.get(row["status"], 0) + 1
+                if row["post_id"] is not None:
+                    total, pending = per_post.get(row["post_id"], (0, 0))
+                    per_post[row["post_id"]] = (total + 1, pending + (row["status"] == "pending"))
+            status_counters.adjust("comments", deltas)
+            status_counters.adjust_posts(per_post)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+
+def ingest(records, source=None, batch_size=None):
+    """
+    records: iterable (số dòng, dict | None, lỗi | None) như read_records().
+    source: nguồn cho cả file (None = lấy trường source / platform của từng dòng).
+    -> {"read", "inserted", "duplicates", "invalid", "errors": [{"line", "error"}]}
+    """
+    batch_size = batch_size or current_app.config["INGEST_BATCH_SIZE"]
+    summary = {"read": 0, "inserted": 0, "duplicates": 0, "invalid": 0, "errors": []}
+    posts = PostLookup()
+    batch = {}
+    for lineno, record, error in records:
+        summary["read"] += 1
+        row = None
+        if error is None:
+            try:
+                row = to_row(record, source, posts)
+            except (TypeError, ValueError, OverflowError) as e:
+                error = str(e)
+        if row is None:
+            summary["invalid"] += 1
+            if len(summary["errors"]) < MAX_ERRORS:
+                summary["errors"].append({"line": lineno, "error": error})
+            continue
+
+        key = (row["source"], row["external_id"])
+        if key in batch:
+            summary["duplicates"] += 1
+            continue
+        batch[key] = row
+        if len(batch) >= batch_size:
+            _insert_batch(batch, summary)
+            batch = {}
+    if batch:
+        _insert_batch(batch, summary)
+
+    if summary.pop("raced", False):
+        status_counters.reconcile(["comments"])
+    return summary
+
+
+def import_stream(stream, fmt, source=None, batch_size=None, triage=True):
+    """Đọc + nhập một file export; triage: chấm spam các bình luận pending mới"""
+    summary = ingest(read_records(stream, fmt), canonical_source(source) or None, batch_size)
+    if triage and summary["inserted"]:
+        summary["triage"] = spam_filter.triage_pending()
+    return summary
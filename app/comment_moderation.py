@@ -0,0 +1,107 @@
+"""
+Duyệt / từ chối / xóa bình luận hàng loạt (binhluanchoduyet.html).
+
+Một request = một transaction: UPDATE / DELETE theo tập (mỗi trạng thái hiện có một
+câu lệnh), thay vì mỗi bình luận một request và một lần commit. Bộ đếm tính từ các
+dòng câu lệnh trả về (RETURNING), không từ lần đếm trước đó.
+Danh sách id được bỏ trùng rồi chia lô ID_CHUNK phần tử (giới hạn số tham số của SQLite),
+các lô vẫn nằm chung một transaction, bộ đếm trạng thái và bộ đếm theo bài viết
+cũng được cập nhật trong đó.
+"""
+from sqlalchemy import func
+
+from app import db, status_counters
+from app.models.comment import Comment
+
+ACTIONS = {"approve": "approved", "reject": "rejected", "delete": None}
+ID_CHUNK = 500
+
+
+def _chunks(ids):
+    if ids is None:
+        yield None
+        return
+    ids = list(dict.fromkeys(ids))  # id lặp ở hai lô sẽ bị đếm hai lần vào bộ đếm
+    for i in range(0, len(ids), ID_CHUNK):
+        yield ids[i:i + ID_CHUNK]
+
+
+def _apply(where, status, new_status):
+    """
+    UPDATE / DELETE các dòng khớp where đang ở trạng thái status
+    -> [post_id] của đúng những dòng đã đổi (RETURNING, trạng thái cũ = status)
+    """
+    comments = Comment.__table__
+    where = [*where, comments.c.status.is_(None) if status is None else comments.c.status == status]
+    if new_status is None:
+        stmt, returning = comments.delete().where(*where), db.engine.dialect.delete_returning
+    else:
+        stmt = comments.update().where(*where).values(status=new_status, auto_moderated=False)
+        returning = db.engine.dialect.update_returning
+    if returning:
+        return db.session.execute(stmt.returning(comments.c.post_id)).scalars().all()
+    # MySQL: không có RETURNING -> khóa dòng trước rồi ghi đúng các dòng đó
+    ids, post_ids = [], []
+    for row_id, post_id in db.session.execute(
+            db.select(comments.c.id, comments.c.post_id).where(*where).with_for_update()):
+        ids.append(row_id)
+        post_ids.append(post_id)
+    if ids:
+        db.session.execute(stmt.where(comments.c.id.in_(ids)))
+    return post_ids
+
+
+def moderate(action, criteria=(), ids=None):
+    """
+    Áp dụng action cho các bình luận khớp criteria (và nằm trong ids nếu có), commit một lần.
+    -> {"action", "matched", "changed", "by_status": {trạng thái trước đó: số dòng}}
+    """
+    if action not in ACTIONS:
+        raise ValueError("action không hợp lệ")
+    new_status = ACTIONS[action]
+
+    by_status = {}  # trạng thái trước đó -> số dòng khớp
+    moved = {}      # trạng thái trước đó -> số dòng thực sự đổi (từ RETURNING)
+    by_post = {}    # post_id -> (số bình luận, số đang chờ duyệt) thay đổi
+    try:
+        for chunk in _chunks(ids):
+            where = list(criteria)
+            if chunk is not None:
+                where.append(Comment.id.in_(chunk))
+
+            # Chỉ để biết các trạng thái hiện có; bộ đếm lấy từ dòng UPDATE / DELETE trả về
+            # (bình luận được duyệt lẻ xen giữa hai câu lệnh không bị đếm hai lần)
+            counts = (db.session.query(Comment.status, func.count(Comment.id))
+                      .filter(*where).group_by(Comment.status).all())
+            for status, count in counts:
+                if new_status is not None and status == new_status:
+                    # Dòng đã ở trạng thái đích thì không ghi lại
+                    by_status[status] = by_status.get(status, 0) + count
+                    continue
+                post_ids = _apply(where, status, new_status)
+                by_status[status] = by_status.get(status, 0) + len(post_ids)
+                moved[status] = moved.get(status, 0) + len(post_ids)
+                for post_id in post_ids:
+                    if new_status is None:
+                        delta = (-1, -(status == "pending"))
+                    else:
+                        delta = (0, (new_status == "pending") - (status == "pending"))
+                    total, pending = by_post.get(post_id, (0, 0))
+                    by_post[post_id] = (total + delta[0], pending + delta[1])
+
+        deltas = {status: -count for status, count in moved.items()}
+        if new_status is not None:
+            deltas[new_status] = sum(moved.values())
+        status_counters.adjust("comments", deltas)
+        status_counters.adjust_posts(by_post)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return {
+        "action": action,
+        "matched": sum(by_status.values()),
+        "changed": sum(moved.values()),
+        "by_status": {status or "none": count for status, count in by_status.items() if count},
+    }
@@ -0,0 +1,61 @@
+"""
+Liên kết bình luận với bài viết qua Comment.post_id.
+
+Dữ liệu cũ chỉ có Comment.post_title (chuỗi tự do, lệch khi bài viết đổi tiêu đề).
+resolve_titles() so khớp tiêu đề đã chuẩn hóa (bỏ khoảng trắng thừa, không phân biệt
+hoa thường) với Post.title rồi ghi post_id theo lô; tiêu đề không khớp hoặc khớp
+nhiều bài được giữ nguyên để xử lý tay. Chạy qua migrate_comment_posts.py.
+"""
+from sqlalchemy import bindparam, func
+
+from app import db, status_counters
+from app.models.comment import Comment
+from app.models.post import Post
+
+
+def normalize_title(title):
+    return " ".join((title or "").split()).casefold()
+
+
+def post_ids_by_title():
+    """Tiêu đề đã chuẩn hóa -> [post_id]"""
+    result = {}
+    for post_id, title in db.session.query(Post.id, Post.title):
+        result.setdefault(normalize_title(title), []).append(post_id)
+    return result
+
+
+def resolve_titles(batch_size=1000, dry_run=False, log=print):
+    """
+    Gán post_id cho bình luận chưa có, theo post_title; commit từng lô rồi đếm lại
+    bộ đếm theo bài viết.
+    -> {"resolved": số bình luận, "unmatched": {tiêu đề: số}, "ambiguous": {tiêu đề: số}}
+    """
+    posts = post_ids_by_title()
+    pending = (db.session.query(Comment.post_title, func.count(Comment.id))
+               .filter(Comment.post_id.is_(None), Comment.post_title.isnot(None))
+               .group_by(Comment.post_title).all())
+
+    params, resolved, unmatched, ambiguous = [], 0, {}, {}
+    for title, n in pending:
+        ids = posts.get(normalize_title(title), [])
+        if not ids:
+            unmatched[title] = n
+        elif len(ids) > 1:
+            ambiguous[title] = n
+        else:
+            params.append({"title": title, "pid": ids[0]})
+            resolved += n
+
+    if not dry_run:
+        comments = Comment.__table__
+        stmt = (comments.update()
+                .where(comments.c.post_title == bindparam("title"), comments.c.post_id.is_(None))
+                .values(post_id=bindparam("pid")))
+        for i in range(0, len(params), batch_size):
+            db.session.execute(stmt, params[i:i + batch_size])
+            db.session.commit()
+            log(f"   ... đã xử lý {min(i + batch_size, len(params))}/{len(params)} tiêu đề")
+        status_counters.reconcile(["comments"])
+
+    return {"resolved": resolved, "unmatched": unmatched, "ambiguous": ambiguous}
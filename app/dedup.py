@@ -0,0 +1,79 @@
+"""
+Lưu trữ media theo nội dung (content-addressed), bật bằng config MEDIA_DEDUP.
+
+File upload được hash trong lúc ghi (xem media_meta.save_stream). Nếu sha256
+đã có blob thì bỏ file vừa ghi và tăng ref_count; nếu chưa thì đổi tên file
+thành <sha256>.<ext> và tạo blob mới (upsert: hai upload cùng nội dung mới chạy
+song song thì request sau chỉ tăng ref_count).
+"""
+import os
+
+from app import db, storage
+from app.models.media_blob import MediaBlob
+from app.sharding import upload_path
+
+
+def store_upload(path, ext, size, sha256):
+    """
+    path: file vừa ghi xong trong UPLOAD_FOLDER.
+    Trả về filename dùng cho Media (có thể là file đã có sẵn).
+    """
+    blob = db.session.get(MediaBlob, sha256)
+
+    if blob is not None:
+        os.remove(path)
+        # Tăng bằng biểu thức SQL để không mất lượt khi nhiều request cùng lúc
+        MediaBlob.query.filter_by(sha256=sha256).update(
+            {MediaBlob.ref_count: MediaBlob.ref_count + 1}
+        )
+        return blob.filename
+
+    filename = f"{sha256}.{ext}"
+    dest = upload_path(filename)
+    os.replace(path, dest)
+    storage.uploads().put_file(filename, dest)
+
+    # Hai upload cùng nội dung mới chạy song song đều không thấy blob -> upsert thay vì
+    # INSERT (INSERT thứ hai sẽ lỗi unique sha256 -> 500)
+    db.session.execute(_upsert_blob(sha256=sha256, filename=filename, size=size, ref_count=1))
+    stored = db.session.query(MediaBlob.filename).filter_by(sha256=sha256).scalar()
+    if stored != filename:
+        # Request kia tạo blob trước với phần mở rộng khác (.jpeg / .jpg) -> dùng file của nó
+        storage.uploads().delete(filename)
+    return stored
+
+
+def _upsert_blob(**values):
+    """INSERT blob; đã có sha256 thì tăng ref_count (theo dialect, như comment_ingest)"""
+    table = MediaBlob.__table__
+    dialect = db.engine.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        return insert(table).values(**values).on_conflict_do_update(
+            index_elements=[table.c.sha256], set_={"ref_count": table.c.ref_count + 1})
+    if dialect == "mysql":
+        from sqlalchemy.dialects.mysql import insert
+        return insert(table).values(**values).on_duplicate_key_update(ref_count=table.c.ref_count + 1)
+    return table.insert().values(**values)
+
+
+def release(filename):
+    """
+    Bỏ một tham chiếu tới file. Trả về True nếu file vật lý cần xóa
+    (không thuộc blob nào, hoặc đây là tham chiếu cuối cùng).
+    """
+    blob = MediaBlob.query.filter_by(filename=filename).first()
+    if blob is None:
+        return True
+
+    MediaBlob.query.filter_by(sha256=blob.sha256).update(
+        {MediaBlob.ref_count: MediaBlob.ref_count - 1}
+    )
+    db.session.refresh(blob)
+    if blob.ref_count <= 0:
+        db.session.delete(blob)
+        return True
+    return False
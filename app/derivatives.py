@@ -0,0 +1,281 @@
+"""
+Pipeline tạo ảnh thu nhỏ (derivative) cho thư viện media.
+
+Sau khi upload, ảnh gốc được đưa vào process pool để tạo các bản rộng
+160 / 480 / 1280 px ở dạng WebP kèm JPEG dự phòng, lưu trong
+<UPLOAD_FOLDER>/variants/ (chia shard như file gốc) và ghi vào bảng media_variants. Grid media và
+danh sách bài viết dùng các URL này thay vì tải ảnh gốc nhiều MB.
+Cùng job đó tính perceptual hash (app/image_hash.py), BlurHash và màu chủ đạo
+(app/placeholders.py) lưu vào bảng media. Ảnh cũ chưa bỏ EXIF thì bước đầu của job
+ghi bản đã bỏ metadata / xoay theo Orientation sang tên file mới (app/exif_strip.py)
+để các bản thu nhỏ cũng đúng chiều.
+
+DERIVATIVE_WORKERS = 0 -> chạy ngay trong request (dùng cho test / script).
+"""
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+
+from flask import current_app
+
+from app import db, storage, image_hash, placeholders, exif_strip
+from app.models.media import Media
+from app.models.media_variant import MediaVariant
+from app.media_meta import Image, local_path
+from app.sharding import shard_rel, upload_path
+
+log = logging.getLogger(__name__)
+
+WIDTHS = (160, 480, 1280)
+FORMATS = (("webp", "webp", 80), ("jpeg", "jpg", 82))  # (format, đuôi file, quality)
+VARIANT_DIR = "variants"
+SUPPORTED_MIME = {"image/jpeg", "image/png", "image/webp", "image/bmp", "image/tiff"}
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers):
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers)
+        return _pool
+
+
+# =================================================
+# PHẦN CHẠY TRONG PROCESS CON (không dùng app / DB)
+# =================================================
+def render_variants(src_path, out_dir, stem, rel_dir=VARIANT_DIR, widths=WIDTHS):
+    """
+    Tạo các bản thu nhỏ cho một ảnh. Không phóng to ảnh nhỏ hơn width yêu cầu
+    (ảnh nhỏ chỉ có các bản <= kích thước gốc, tối thiểu một bản).
+    Trả về list dict mô tả từng file đã tạo.
+    """
+    results = []
+
+    with Image.open(src_path) as img:
+        img.load()
+        os.makedirs(out_dir, exist_ok=True)
+        if img.mode not in ("RGB", "L"):
+            # JPEG không có kênh alpha -> ghép lên nền trắng
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            rgba = img.convert("RGBA")
+            background.paste(rgba, mask=rgba.split()[-1])
+            img = background
+
+        src_w, src_h = img.size
+        targets = [w for w in widths if w <= src_w] or [min(widths)]
+
+        for width in targets:
+            width = min(width, src_w)
+            height = max(1, round(src_h * width / src_w))
+            resized = img if width == src_w else img.resize((width, height), Image.LANCZOS)
+
+            for fmt, ext, quality in FORMATS:
+                name = f"{stem}_{width}.{ext}"
+                path = os.path.join(out_dir, name)
+                if not os.path.exists(path):
+                    tmp = path + ".tmp"
+                    resized.save(tmp, format=fmt.upper(), quality=quality)
+                    os.replace(tmp, path)
+                results.append({
+                    "width": width,
+                    "height": height,
+                    "format": fmt,
+                    "filename": f"{rel_dir}/{name}",
+                    "size": os.path.getsize(path),
+                })
+    return results
+
+
+def image_features(src_path):
+    """Đặc trưng nhỏ của ảnh gốc, lưu thẳng vào dòng media"""
+    with Image.open(src_path) as img:
+        features = {"phash": image_hash.dhash(img)}
+    with Image.open(src_path) as img:  # draft() chỉ dùng được một lần mỗi lần mở
+        features.update(placeholders.placeholders(img))
+    return features
+
+
+def process_image(src_path, out_dir, stem, rel_dir=VARIANT_DIR, strip_to=None):
+    """
+    Job của pipeline: ảnh thu nhỏ + đặc trưng ảnh. strip_to: ghi bản đã bỏ metadata
+    ra đường dẫn mới (không ghi đè file gốc đã có URL) và render từ bản đó.
+    """
+    stripped = exif_strip.strip_metadata(src_path, strip_to) if strip_to else None
+    if stripped and stripped["changed"]:
+        src_path = strip_to
+    return {
+        "stripped": stripped,
+        "strip_to": strip_to,
+        "variants": render_variants(src_path, out_dir, stem, rel_dir),
+        **image_features(src_path),
+    }
+
+
+# =================================================
+# PHẦN CHẠY TRONG APP
+# =================================================
+def wants_variants(media):
+    return (
+        Image is not None
+        and media.type == "image"
+        and media.mime_type in SUPPORTED_MIME
+        and not storage.is_external(media.filename)
+    )
+
+
+def job_args(media):
+    stem = os.path.splitext(os.path.basename(media.filename))[0]
+    strip_to = None
+    if current_app.config.get("STRIP_IMAGE_METADATA", True) and exif_strip.wants_strip(media):
+        # Ảnh cũ chưa bỏ metadata: bản sạch + variant mang tên mới, URL cũ giữ nguyên bytes
+        ext = os.path.splitext(media.filename)[1]
+        stem = uuid.uuid4().hex
+        strip_to = upload_path(f"{stem}{ext}")
+    rel_dir = VARIANT_DIR
+    if current_app.config.get("UPLOAD_SHARDING"):
+        rel_dir = f"{VARIANT_DIR}/{os.path.dirname(shard_rel(stem))}"
+    out_dir = os.path.join(current_app.config["UPLOAD_FOLDER"], *rel_dir.split("/"))
+    return local_path(media.filename), out_dir, stem, rel_dir, strip_to
+
+
+def save_results(media_id, result):
+    """Ghi kết quả process_image: bảng media_variants (thay bản cũ) + đặc trưng ảnh"""
+    media = db.session.get(Media, media_id)
+    if media is None:
+        return  # media bị xóa trong lúc đang render
+    variants = result["variants"]
+    backend = storage.uploads()
+    if backend.remote:
+        # File render nằm trong cache cục bộ -> đẩy lên kho dùng chung
+        folder = current_app.config["UPLOAD_FOLDER"]
+        for r in variants:
+            backend.put_file(r["filename"], os.path.join(folder, *r["filename"].split("/")))
+    MediaVariant.query.filter_by(media_id=media_id).delete()
+    for r in variants:
+        db.session.add(MediaVariant(media_id=media_id, **r))
+
+    phash = result.get("phash")
+    if phash is not None:
+        media.phash = image_hash.to_hex(phash)
+        media.phash_0, media.phash_1, media.phash_2, media.phash_3 = image_hash.bands(phash)
+    if result.get("blurhash"):
+        media.blurhash = result["blurhash"]
+        media.dominant_color = result["dominant_color"]
+    if result.get("stripped"):
+        new_filename = os.path.basename(result["strip_to"]) if result["stripped"]["changed"] else None
+        exif_strip.save_result(media, result["stripped"], new_filename)
+    db.session.commit()
+
+
+def schedule(media):
+    """Đưa media vào pipeline (gọi sau khi đã commit để có media.id)"""
+    if not wants_variants(media):
+        return None
+
+    args = job_args(media)
+    workers = current_app.config.get("DERIVATIVE_WORKERS", 2)
+
+    if not workers:
+        try:
+            save_results(media.id, process_image(*args))
+        except Exception:
+            log.exception("Không tạo được ảnh thu nhỏ cho media %s", media.id)
+        return None
+
+    app = current_app._get_current_object()
+    media_id = media.id
+    future = _get_pool(workers).submit(process_image, *args)
+
+    def _done(fut):
+        # Callback chạy trên thread của process cha -> cần app context riêng
+        try:
+            result = fut.result()
+        except Exception:
+            log.exception("Không tạo được ảnh thu nhỏ cho media %s", media_id)
+            return
+        with app.app_context():
+            save_results(media_id, result)
+            db.session.remove()
+
+    future.add_done_callback(_done)
+    return future
+
+
+def remove_variant_files(media):
+    backend = storage.uploads()
+    for v in media.variants:
+        try:
+            backend.delete(v.filename)
+        except (OSError, storage.StorageError) as e:
+            log.warning("Không xóa được %s: %s", v.filename, e)
+
+
+# =================================================
+# SERIALIZE CHO API
+# =================================================
+def group_variants(variants):
+    """[MediaVariant] -> {"160": {"webp": url, "jpeg": url}, ...}"""
+    grouped = {}
+    for v in variants:
+        grouped.setdefault(str(v.width), {})[v.format] = v.url
+    return grouped
+
+
+def variants_by_media_ids(media_ids):
+    """Một query cho cả trang: {media_id: {...}}"""
+    if not media_ids:
+        return {}
+    rows = {}
+    for v in MediaVariant.query.filter(MediaVariant.media_id.in_(media_ids)):
+        rows.setdefault(v.media_id, []).append(v)
+    return {media_id: group_variants(rows.get(media_id, [])) for media_id in media_ids}
+
+
+def media_filename_from_url(url):
+    """URL ảnh của bài viết -> Media.filename tương ứng"""
+    if not url:
+        return None
+    if url.startswith("/uploads/"):
+        return url[len("/uploads/"):]
+    if url.startswith("/static/"):
+        return url[1:]
+    return None
+
+
+def variants_by_image_urls(urls):
+    """Một query cho cả trang bài viết: {image_url: {...}}"""
+    by_filename = {media_filename_from_url(u): u for u in urls if media_filename_from_url(u)}
+    if not by_filename:
+        return {}
+    rows = (
+        db.session.query(Media.filename, MediaVariant)
+        .join(MediaVariant, MediaVariant.media_id == Media.id)
+        .filter(Media.filename.in_(list(by_filename)))
+        .all()
+    )
+    result = {}
+    for filename, variant in rows:
+        url = by_filename[filename]
+        result.setdefault(url, {}).setdefault(str(variant.width), {})[variant.format] = variant.url
+    return result
+
+
+def placeholders_by_image_urls(urls):
+    """Một query cho cả trang bài viết: {image_url: {"blurhash", "dominant_color"}}"""
+    by_filename = {media_filename_from_url(u): u for u in urls if media_filename_from_url(u)}
+    if not by_filename:
+        return {}
+    rows = (
+        db.session.query(Media.filename, Media.blurhash, Media.dominant_color)
+        .filter(Media.filename.in_(list(by_filename)), Media.blurhash.isnot(None))
+        .all()
+    )
+    return {
+        by_filename[filename]: {"blurhash": blurhash, "dominant_color": color}
+        for filename, blurhash, color in rows
+    }
@@ -0,0 +1,88 @@
+"""
+Tiện ích chung cho cache trên đĩa có giới hạn dung lượng (LRU theo mtime).
+
+Dùng bởi resize_cache (ảnh resize theo yêu cầu) và remote_cache (video từ URL ngoài):
+- DiskUsage: theo dõi tổng dung lượng (quét thư mục một lần, sau đó cộng dồn)
+  và xóa file ít dùng nhất khi vượt giới hạn.
+- KeyedLocks: gộp các request cùng key, chỉ một thread tạo file, các thread khác chờ.
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+
+def scan_usage(folder):
+    total = 0
+    for root, _, files in os.walk(folder):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+def evict_lru(folder, max_bytes):
+    """Xóa file ít dùng nhất tới khi còn ~90% giới hạn"""
+    entries = []
+    for root, _, files in os.walk(folder):
+        for name in files:
+            path = os.path.join(root, name)
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    target = max_bytes * 0.9
+    for _, size, path in sorted(entries):
+        if total <= target:
+            break
+        try:
+            os.remove(path)
+            total -= size
+        except OSError:
+            pass
+    return total
+
+
+class DiskUsage:
+    """Tổng dung lượng một thư mục cache (tính lười lần đầu)"""
+
+    def __init__(self):
+        self.bytes = None
+        self._lock = threading.Lock()
+
+    def account(self, folder, added, max_bytes):
+        with self._lock:
+            if self.bytes is None:
+                self.bytes = scan_usage(folder)
+            else:
+                self.bytes += added
+            if self.bytes > max_bytes:
+                self.bytes = evict_lru(folder, max_bytes)
+
+
+class KeyedLocks:
+    """Một lock cho mỗi key đang được tạo"""
+
+    def __init__(self):
+        self._locks = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def hold(self, key):
+        with self._lock:
+            lock = self._locks.setdefault(key, threading.Lock())
+        with lock:
+            try:
+                yield
+            finally:
+                with self._lock:
+                    if self._locks.get(key) is lock:
+                        del self._locks[key]
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._locks
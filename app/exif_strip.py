@@ -0,0 +1,241 @@
+"""
+Bỏ metadata và chuẩn hóa hướng xoay cho ảnh upload (chạy trong job của app/derivatives.py).
+
+Ảnh chụp từ điện thoại (taobaiviet.html) mang khối EXIF lớn, ảnh thumbnail
+nhúng (APP1 / MPF) và cờ Orientation buộc trình duyệt tự xoay ảnh.
+- Orientation = 1 (hoặc không có): cắt bỏ segment / chunk metadata ở mức byte,
+  dữ liệu ảnh giữ nguyên (lossless). JPEG giữ APP0 JFIF, ICC profile, Adobe APP14;
+  PNG bỏ tEXt / zTXt / iTXt / eXIf / tIME.
+- Có cờ xoay: xoay pixel bằng Pillow rồi lưu lại; JPEG dùng lại bảng lượng tử
+  và subsampling của ảnh gốc để hạn chế mất chất lượng.
+URL /uploads/<tên file> được cache immutable nên bytes của một tên file đã công bố
+không bao giờ đổi:
+- Ảnh upload mới: register_media() bỏ metadata ngay trong request, trước khi dòng
+  Media được commit và URL trả về client.
+- Ảnh cũ (generate_derivatives.py): bản sạch được ghi sang tên file mới, Media.filename,
+  Post.image và nội dung bài viết trỏ sang tên mới; file cũ để gc_uploads.py dọn.
+Số bytes giảm được lưu ở Media.bytes_saved; blob dùng chung của MEDIA_DEDUP được bỏ qua.
+"""
+import hashlib
+import os
+import re
+from io import BytesIO
+
+from flask import current_app
+from sqlalchemy import case, func
+
+from app import db, storage
+from app.media_meta import Image
+from app.models.media import Media
+from app.models.media_blob import MediaBlob
+from app.models.post import Post
+
+STRIP_EXTS = ("jpg", "jpeg", "png")
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_DROP_CHUNKS = {b"tEXt", b"zTXt", b"iTXt", b"eXIf", b"tIME"}
+ORIENTATION_TAG = 0x0112
+
+# 0xFF trong dữ liệu nén là marker, trừ byte nhồi FF00 và restart marker FFD0-FFD7
+_JPEG_MARKER = re.compile(rb"\xff[^\x00\xd0-\xd7]")
+
+
+# =================================================
+# PHẦN CHẠY TRONG PROCESS CON (không dùng app / DB)
+# =================================================
+def _keep_jpeg_segment(marker, payload):
+    if marker == 0xFE:  # COM
+        return False
+    if marker == 0xE0:  # APP0: giữ JFIF, bỏ JFXX (thumbnail)
+        return payload.startswith(b"JFIF\x00")
+    if marker == 0xE2:  # APP2: giữ ICC profile, bỏ MPF (ảnh preview)
+        return payload.startswith(b"ICC_PROFILE\x00")
+    if marker == 0xEE:  # APP14 Adobe: cần để giải mã đúng màu CMYK / YCCK
+        return True
+    return not 0xE1 <= marker <= 0xEF  # các APPn khác: EXIF, XMP, IPTC...
+
+
+def strip_jpeg(data):
+    """Bỏ segment metadata, cắt phần sau EOI của ảnh chính (ảnh phụ MPF); lỗi -> ValueError"""
+    if not data.startswith(b"\xff\xd8"):
+        raise ValueError("Không phải JPEG")
+    out = [b"\xff\xd8"]
+    pos = 2
+    while pos + 1 < len(data):
+        if data[pos] != 0xFF:
+            raise ValueError("JPEG hỏng")
+        marker = data[pos + 1]
+        if marker == 0xFF:  # byte đệm
+            pos += 1
+            continue
+        if marker == 0xD9:  # EOI
+            out.append(b"\xff\xd9")
+            return b"".join(out)
+        if 0xD0 <= marker <= 0xD7 or marker == 0x01:  # marker không có độ dài
+            out.append(data[pos:pos + 2])
+            pos += 2
+            continue
+
+        end = pos + 2 + int.from_bytes(data[pos + 2:pos + 4], "big")
+        if end > len(data):
+            raise ValueError("JPEG bị cắt")
+        if _keep_jpeg_segment(marker, data[pos + 4:end]):
+            out.append(data[pos:end])
+        pos = end
+
+        if marker == 0xDA:  # SOS: dữ liệu nén chạy tới marker kế tiếp
+            match = _JPEG_MARKER.search(data, pos)
+            if match is None:
+                raise ValueError("JPEG bị cắt")
+            out.append(data[pos:match.start()])
+            pos = match.start()
+    raise ValueError("JPEG thiếu EOI")
+
+
+def strip_png(data):
+    """Bỏ chunk metadata dạng text / EXIF / thời gian"""
+    if not data.startswith(PNG_SIGNATURE):
+        raise ValueError("Không phải PNG")
+    out = [PNG_SIGNATURE]
+    pos = len(PNG_SIGNATURE)
+    while pos + 8 <= len(data):
+        length = int.from_bytes(data[pos:pos + 4], "big")
+        chunk_type = data[pos + 4:pos + 8]
+        end = pos + 12 + length
+        if end > len(data):
+            raise ValueError("PNG bị cắt")
+        if chunk_type not in PNG_DROP_CHUNKS:
+            out.append(data[pos:end])
+        pos = end
+        if chunk_type == b"IEND":
+            return b"".join(out)
+    raise ValueError("PNG thiếu IEND")
+
+
+def _transposed(path):
+    """Xoay pixel theo cờ Orientation, lưu lại không kèm EXIF -> bytes"""
+    from PIL import ImageOps, JpegImagePlugin
+
+    with Image.open(path) as img:
+        options = {"icc_profile": img.info.get("icc_profile")}
+        if img.format == "JPEG":
+            options.update(qtables=img.quantization,
+                           subsampling=JpegImagePlugin.get_sampling(img), optimize=True)
+        fmt = img.format
+        rotated = ImageOps.exif_transpose(img)
+        rotated.info.pop("exif", None)
+        buf = BytesIO()
+        rotated.save(buf, format=fmt, **options)
+    return buf.getvalue()
+
+
+def strip_metadata(path, dest=None):
+    """
+    Bỏ metadata + xoay ảnh theo Orientation. Có thay đổi: ghi ra dest, hoặc ghi đè
+    path nếu dest = None (chỉ dùng cho file chưa công bố URL).
+    -> {"bytes_saved", "changed", "rotated", "size", "sha256", "width", "height"}
+    Định dạng khác JPEG / PNG hoặc file hỏng: giữ nguyên (bytes_saved = 0).
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+
+    with Image.open(path) as img:
+        orientation = img.getexif().get(ORIENTATION_TAG, 1)
+        fmt = img.format
+
+    out = data
+    rotate = fmt in ("JPEG", "PNG") and orientation in range(2, 9)
+    try:
+        if rotate:
+            out = _transposed(path)
+        elif fmt == "JPEG":
+            out = strip_jpeg(data)
+        elif fmt == "PNG":
+            out = strip_png(data)
+    except (ValueError, OSError):
+        out = data
+
+    changed = out != data
+    target = dest or path
+    if changed:
+        tmp = f"{target}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(out)
+        os.replace(tmp, target)
+
+    with Image.open(target if changed else path) as img:
+        width, height = img.size
+    return {
+        "bytes_saved": len(data) - len(out),
+        "changed": changed,
+        "rotated": rotate and changed,
+        "size": len(out),
+        "sha256": hashlib.sha256(out).hexdigest(),
+        "width": width,
+        "height": height,
+    }
+
+
+# =================================================
+# PHẦN CHẠY TRONG APP
+# =================================================
+def wants_strip(media):
+    """Chỉ xử lý file upload của chính app, chưa xử lý lần nào, không phải blob dùng chung"""
+    if media.bytes_saved is not None or storage.resolve(media.filename)[0] is not storage.uploads():
+        return False
+    return MediaBlob.query.filter_by(filename=media.filename).first() is None
+
+
+def strip_upload(path, ext):
+    """
+    File vừa upload, chưa có dòng Media / URL: bỏ metadata tại chỗ.
+    -> kết quả strip_metadata, None nếu tắt / không phải JPEG, PNG / thiếu Pillow
+    """
+    if Image is None or ext not in STRIP_EXTS or not current_app.config.get("STRIP_IMAGE_METADATA", True):
+        return None
+    try:
+        return strip_metadata(path)
+    except (OSError, ValueError):
+        return None  # file hỏng: giữ nguyên, để bước đọc metadata xử lý
+
+
+def save_result(media, result, new_filename=None):
+    """
+    Ghi kết quả strip_metadata vào dòng media (chưa commit). new_filename: bản sạch của
+    ảnh cũ được ghi sang tên mới -> trỏ media + bài viết sang tên đó, đẩy lên kho dùng chung.
+    """
+    media.bytes_saved = result["bytes_saved"]
+    if not result["changed"]:
+        return
+    media.size = result["size"]
+    media.sha256 = result["sha256"]
+    media.width, media.height = result["width"], result["height"]
+    if new_filename is None:
+        return
+
+    old_url, new_url = f"/uploads/{media.filename}", f"/uploads/{new_filename}"
+    media.filename = new_filename
+    Post.query.filter(Post.image == old_url).update({Post.image: new_url}, synchronize_session=False)
+    Post.query.filter(Post.content.contains(old_url)).update(
+        {Post.content: func.replace(Post.content, old_url, new_url)}, synchronize_session=False)
+    backend = storage.uploads()
+    if backend.remote:
+        backend.put_file(new_filename, storage.local_path(new_filename))
+
+
+def savings_report():
+    """Tổng hợp dung lượng giảm được trên toàn thư viện"""
+    processed, reduced, saved, size = db.session.query(
+        func.count(Media.bytes_saved),
+        func.coalesce(func.sum(case((Media.bytes_saved > 0, 1), else_=0)), 0),
+        func.coalesce(func.sum(Media.bytes_saved), 0),
+        func.coalesce(func.sum(case((Media.bytes_saved.isnot(None), Media.size), else_=0)), 0),
+    ).one()
+    original = size + saved
+    return {
+        "processed": processed,
+        "files_reduced": reduced,
+        "bytes_saved": saved,
+        "original_bytes": original,
+        "percent_saved": round(saved * 100 / original, 1) if original else 0.0,
+    }
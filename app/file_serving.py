@@ -0,0 +1,107 @@
+"""
+Phục vụ file trong UPLOAD_FOLDER cho cả hai route /uploads/... .
+
+- Tên file upload (uuid / sha256) không bao giờ đổi nội dung -> cache vĩnh viễn
+  (Cache-Control: public, max-age=1 năm, immutable).
+- ETag mạnh lấy từ sha256 đã lưu trong bảng media; If-None-Match -> 304.
+- Hỗ trợ Range (206) để tua video.
+- MEDIA_OFFLOAD = "x-sendfile" | "x-accel": để Apache / nginx đẩy bytes thay cho
+  worker Python (nginx cần location internal trỏ tới X_ACCEL_PREFIX).
+- MEDIA_STORAGE = "s3": node không có bản cục bộ thì chuyển hướng (302) sang
+  URL presigned của object. Bản cục bộ chỉ là cache: file không còn dòng nào trong
+  DB trỏ tới (media bị xóa trên node khác) thì bỏ bản cache và trả 404.
+- SVG có thể chứa script và được phục vụ cùng origin với trang quản trị ->
+  Content-Disposition: attachment + CSP sandbox (vẫn hiển thị được trong <img>).
+"""
+import os
+
+from flask import current_app, request, abort, redirect
+from werkzeug.utils import send_file
+
+from app import db, storage
+from app.models.media import Media
+from app.models.media_blob import MediaBlob
+from app.models.media_variant import MediaVariant
+from app.media_meta import guess_mime
+from app.sharding import find_upload
+
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+
+def _stored_etag(filename):
+    """sha256 đã lưu lúc upload (None nếu là file phụ như variant)"""
+    return db.session.query(Media.sha256).filter(
+        Media.filename == filename, Media.sha256.isnot(None)
+    ).limit(1).scalar()
+
+
+def _still_stored(filename):
+    """Còn media / variant / blob nào trỏ tới file (object trên kho chung còn tồn tại)"""
+    return any(
+        db.session.query(column).filter(column == filename).limit(1).scalar() is not None
+        for column in (Media.filename, MediaVariant.filename, MediaBlob.filename)
+    )
+
+
+def _apply_cache_headers(response, etag):
+    response.cache_control.public = True
+    response.cache_control.max_age = IMMUTABLE_MAX_AGE
+    response.cache_control.immutable = True
+    if etag:
+        response.set_etag(etag)
+    return response
+
+
+def _apply_content_headers(response, filename):
+    response.headers["X-Content-Type-Options"] = "nosniff"
+    if guess_mime(filename) == "image/svg+xml":
+        response.headers["Content-Security-Policy"] = "sandbox"
+        response.headers["Content-Disposition"] = "attachment"
+    return response
+
+
+def serve_upload(filename):
+    # Không phục vụ thư mục ẩn (.partial, .resize-cache ...)
+    if any(part.startswith(".") for part in filename.replace("\\", "/").split("/")):
+        abort(404)
+
+    path = find_upload(filename)  # bố cục shard hoặc phẳng
+    backend = storage.uploads()
+    if path is not None and backend.remote and not _still_stored(filename):
+        # Node khác đã xóa object + dòng DB, chỉ còn bản cache của node này
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        abort(404)
+    if path is None:
+        if backend.remote:
+            return redirect(backend.presigned_url(filename), code=302)
+        abort(404)
+
+    etag = _stored_etag(filename)
+    offload = current_app.config.get("MEDIA_OFFLOAD")
+
+    if offload == "x-accel":
+        # nginx tự xử lý Range; ở đây chỉ cần trả 304 khi ETag khớp
+        if etag and request.if_none_match.contains(etag):
+            response = current_app.response_class(status=304)
+        else:
+            response = current_app.response_class(mimetype=guess_mime(filename))
+            prefix = current_app.config.get("X_ACCEL_PREFIX", "/_uploads/").rstrip("/")
+            # Đường dẫn vật lý (có thể nằm trong thư mục shard)
+            rel = os.path.relpath(path, current_app.config["UPLOAD_FOLDER"]).replace(os.sep, "/")
+            response.headers["X-Accel-Redirect"] = f"{prefix}/{rel}"
+        return _apply_content_headers(_apply_cache_headers(response, etag), filename)
+
+    response = send_file(
+        path,
+        request.environ,
+        mimetype=guess_mime(filename),
+        etag=etag or True,
+        max_age=IMMUTABLE_MAX_AGE,
+        conditional=True,  # xử lý If-None-Match / Range
+        use_x_sendfile=(offload == "x-sendfile"),
+        response_class=current_app.response_class,
+    )
+    return _apply_content_headers(_apply_cache_headers(response, None), filename)
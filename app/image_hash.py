@@ -0,0 +1,90 @@
+"""
+Perceptual hash (dHash 64 bit) để tìm ảnh gần trùng (cắt lại, nén lại, đổi kích thước).
+
+- dhash() chạy trong process con của pipeline ảnh (xem derivatives.process_image).
+- Hash lưu ở Media.phash (hex) kèm 4 "band" 16 bit đã đánh index (phash_0..3).
+  Tìm kiếm theo multi-index hashing: hai hash cách nhau <= d bit thì ít nhất
+  một band lệch <= d // 4 bit, nên chỉ cần tra index với các giá trị band lân
+  cận thay vì quét cả bảng.
+- Khoảng cách Hamming của cả lô ứng viên được tính bằng NumPy.
+"""
+from itertools import combinations
+
+import numpy as np
+from sqlalchemy import or_
+
+from app import db
+from app.models.media import Media
+from app.media_meta import Image
+
+HASH_SIZE = 8            # 8x8 = 64 bit
+BANDS = 4
+BAND_BITS = 64 // BANDS
+MAX_DISTANCE = BANDS * 3 - 1  # band lệch tối đa 2 bit -> số giá trị lân cận còn nhỏ
+
+
+def dhash(img):
+    """Ảnh PIL -> int 64 bit (so sánh độ sáng các điểm ảnh kề nhau theo hàng)"""
+    img.draft("L", (HASH_SIZE * 4, HASH_SIZE * 4))  # JPEG: decode ở độ phân giải thấp
+    small = img.convert("L").resize((HASH_SIZE + 1, HASH_SIZE), Image.LANCZOS)
+    pixels = np.asarray(small, dtype=np.int16)
+    bits = pixels[:, 1:] > pixels[:, :-1]
+    return int.from_bytes(np.packbits(bits.ravel()).tobytes(), "big")
+
+
+def to_hex(value):
+    return f"{value:016x}"
+
+
+def bands(value):
+    """int 64 bit -> [band_0, ..., band_3] (band_0 là 16 bit cao nhất)"""
+    mask = (1 << BAND_BITS) - 1
+    return [(value >> (BAND_BITS * (BANDS - 1 - i))) & mask for i in range(BANDS)]
+
+
+def band_neighbors(band, radius):
+    """Mọi giá trị 16 bit cách band <= radius bit"""
+    values = {band}
+    for r in range(1, radius + 1):
+        for positions in combinations(range(BAND_BITS), r):
+            flipped = band
+            for p in positions:
+                flipped ^= 1 << p
+            values.add(flipped)
+    return values
+
+
+def hamming_distances(query, hashes):
+    """Khoảng cách Hamming từ query (int) tới cả mảng hash (list hex / int) -> np.ndarray"""
+    values = np.array([int(h, 16) if isinstance(h, str) else h for h in hashes], dtype=np.uint64)
+    xor = values ^ np.uint64(query)
+    return np.unpackbits(xor.view(np.uint8)).reshape(-1, 64).sum(axis=1)
+
+
+def find_similar(media, max_distance=10, limit=20):
+    """
+    Media gần trùng với media (đã có phash) -> [(id, distance)] tăng dần theo distance.
+    Chỉ đọc các dòng có ít nhất một band nằm trong tập lân cận (qua index).
+    """
+    max_distance = max(0, min(max_distance, MAX_DISTANCE))
+    query_hash = int(media.phash, 16)
+    radius = max_distance // BANDS
+    columns = (Media.phash_0, Media.phash_1, Media.phash_2, Media.phash_3)
+
+    candidates = (
+        db.session.query(Media.id, Media.phash)
+        .filter(Media.id != media.id)
+        .filter(or_(*(
+            col.in_(band_neighbors(band, radius)) for col, band in zip(columns, bands(query_hash))
+        )))
+        .all()
+    )
+    if not candidates:
+        return []
+
+    distances = hamming_distances(query_hash, [c.phash for c in candidates])
+    order = np.argsort(distances, kind="stable")
+    return [
+        (candidates[i].id, int(distances[i]))
+        for i in order[:limit] if distances[i] <= max_distance
+    ]
@@ -0,0 +1,47 @@
+"""
+Xuất nhiều media thành một file ZIP tải về (GET /auth/api/media/export).
+
+File được đọc trực tiếp từ backend lưu trữ (local / S3) theo từng chunk và
+đóng gói bằng app.zip_stream, không tạo file tạm. Media là URL ngoài hoặc không
+còn file trong kho bị bỏ qua (đếm trong X-Skipped-Media).
+"""
+import os
+
+from app import storage
+from app.zip_stream import ZipEntry, ZipStream
+
+TYPE_FOLDERS = {"image": "images", "video": "videos"}
+
+
+def _opener(backend, key):
+    return lambda: backend.open(key)
+
+
+def build_archive(media_rows):
+    """[Media / row có id, filename, type, size, created_at] -> (ZipStream, số media bỏ qua)"""
+    entries = []
+    used = set()
+    skipped = 0
+
+    for m in media_rows:
+        backend, key = storage.resolve(m.filename)
+        if backend.external:
+            skipped += 1
+            continue
+
+        # Luôn hỏi kho: dòng có size nhưng file đã mất sẽ làm ZIP đứt giữa chừng
+        # sau khi đã trả 200 + Content-Length
+        info = backend.stat(key)
+        if info is None:
+            skipped += 1  # file không còn trong kho
+            continue
+        size = info["size"]
+
+        name = f"{TYPE_FOLDERS.get(m.type, 'other')}/{os.path.basename(key)}"
+        if name in used:  # MEDIA_DEDUP: nhiều media dùng chung một file
+            folder, base = name.rsplit("/", 1)
+            name = f"{folder}/{m.id}-{base}"
+        used.add(name)
+
+        entries.append(ZipEntry(name, _opener(backend, key), size=size, modified=m.created_at))
+    return ZipStream(entries), skipped
@@ -0,0 +1,95 @@
+"""
+Metadata của file media (dung lượng, MIME, kích thước ảnh, sha256).
+
+Được tính một lần lúc upload (hoặc bằng backfill_media.py cho dữ liệu cũ)
+và lưu vào bảng media, để list_media chỉ cần đọc DB.
+"""
+import hashlib
+import mimetypes
+
+from app import storage
+from app.probe import probe_file
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow là tùy chọn: thiếu thì bỏ qua width/height
+    Image = None
+
+CHUNK_SIZE = 64 * 1024
+
+
+def format_size(size):
+    """Định dạng dung lượng (bytes) để hiển thị"""
+    if size is None:
+        return "0 KB"
+    if size < 1024:
+        return f"{size} B"
+    elif size < 1024 * 1024:
+        return f"{size / 1024:.1f} KB"
+    else:
+        return f"{size / (1024 * 1024):.1f} MB"
+
+
+def copy_stream(stream, out=None):
+    """Đọc stream theo từng chunk (ghi sang out nếu có) -> (size, sha256)"""
+    digest = hashlib.sha256()
+    size = 0
+    while True:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        digest.update(chunk)
+        size += len(chunk)
+        if out is not None:
+            out.write(chunk)
+    return size, digest.hexdigest()
+
+
+def save_stream(stream, path):
+    """Ghi stream upload ra file, đồng thời tính size + sha256"""
+    with open(path, "wb") as f:
+        return copy_stream(stream, f)
+
+
+def hash_file(path):
+    """File đã có trên đĩa -> (size, sha256)"""
+    with open(path, "rb") as f:
+        return copy_stream(f)
+
+
+def guess_mime(filename):
+    return mimetypes.guess_type(filename)[0] or "application/octet-stream"
+
+
+def read_dimensions(path):
+    """(width, height) của ảnh, None nếu không đọc được"""
+    if Image is None:
+        return None, None
+    try:
+        with Image.open(path) as img:  # chỉ đọc header, chưa decode pixel
+            return img.size
+    except Exception:
+        return None, None
+
+
+def local_path(filename):
+    """Đường dẫn thật trên đĩa của Media.filename (None nếu là URL ngoài / không còn file)"""
+    return storage.local_path(filename)
+
+
+def fill_metadata(media, path, size=None, sha256=None):
+    """Gán metadata cho một Media từ file trên đĩa"""
+    if size is None or sha256 is None:
+        size, sha256 = hash_file(path)
+    media.size = size
+    media.sha256 = sha256
+    media.mime_type = guess_mime(path)
+
+    # Đọc header trước; chỉ dùng Pillow cho định dạng ảnh probe chưa hỗ trợ
+    info = probe_file(path)
+    if info:
+        media.width, media.height = info["width"], info["height"]
+        media.duration = info["duration"]
+    elif media.type == "image":
+        media.width, media.height = read_dimensions(path)
+    return media
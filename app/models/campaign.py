@@ -26,20 +26,25 @@ class Campaign(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def to_dict(self):
+        return Campaign.serialize(self)
+
+    @staticmethod
+    def serialize(c):
+        """Dùng chung cho object ORM và dòng projection (chỉ cần truy cập thuộc tính)"""
         return {
-            "id": self.id,
-            "name": self.name,
-            "platform": self.platform,
-            "status": self.status,
-            "budget": self.budget,
-            "spent": self.spent,
-            "reach": "{:,}".format(self.reach), # Format số: 1,000
-            "clicks": "{:,}".format(self.clicks),
-            "conversions": "{:,}".format(self.conversions),
+            "id": c.id,
+            "name": c.name,
+            "platform": c.platform,
+            "status": c.status,
+            "budget": c.budget,
+            "spent": c.spent,
+            "reach": "{:,}".format(c.reach), # Format số: 1,000
+            "clicks": "{:,}".format(c.clicks),
+            "conversions": "{:,}".format(c.conversions),
             # Format ngày: 20/11/2025
-            "start_date_display": self.start_date.strftime("%d/%m/%Y") if self.start_date else "",
-            "end_date_display": self.end_date.strftime("%d/%m/%Y") if self.end_date else "",
+            "start_date_display": c.start_date.strftime("%d/%m/%Y") if c.start_date else "",
+            "end_date_display": c.end_date.strftime("%d/%m/%Y") if c.end_date else "",
             # Raw data cho form sửa
-            "start_date": self.start_date.strftime("%Y-%m-%d") if self.start_date else "",
-            "end_date": self.end_date.strftime("%Y-%m-%d") if self.end_date else ""
+            "start_date": c.start_date.strftime("%Y-%m-%d") if c.start_date else "",
+            "end_date": c.end_date.strftime("%Y-%m-%d") if c.end_date else ""
         }
@@ -3,6 +3,12 @@ from datetime import datetime
 
 class Comment(db.Model):
     __tablename__ = 'comments'
+    __table_args__ = (
+        # "Bình luận của bài viết X" (lọc thêm trạng thái, sắp theo thời gian) dùng index, không quét bảng
+        db.Index("ix_comments_post_status_created", "post_id", "status", "created_at"),
+        # Nhập từ file export (app/comment_ingest.py): mỗi bình luận của nền tảng chỉ một dòng
+        db.Index("uq_comments_source_external", "source", "external_id", unique=True),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     
@@ -14,26 +20,42 @@ class Comment(db.Model):
     
     # Nguồn bình luận (Website, Facebook, Zalo...)
     source = db.Column(db.String(50), default="Website")
+    external_id = db.Column(db.String(128), nullable=True)  # id bình luận trên nền tảng nguồn
     
     # Nội dung & Bài viết liên quan
     content = db.Column(db.Text, nullable=False)
-    post_title = db.Column(db.String(255)) # Lưu tên bài viết (hoặc dùng Relationship nếu muốn chặt chẽ)
+    post_id = db.Column(db.Integer, db.ForeignKey('posts.id', ondelete='SET NULL'), nullable=True)
+    post_title = db.Column(db.String(255)) # Tên bài viết lúc bình luận (hiển thị); liên kết thật là post_id
     
     # Trạng thái: pending, approved, rejected
     status = db.Column(db.String(20), default="pending") 
 
+    # Bộ lọc spam (app/spam_filter.py): P(spam) lúc chấm, và trạng thái có do bộ lọc tự đặt không
+    # (bình luận tự duyệt / tự từ chối không dùng làm dữ liệu học)
+    spam_score = db.Column(db.Float, nullable=True)
+    auto_moderated = db.Column(db.Boolean, default=False)
+
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def to_dict(self):
+        return Comment.serialize(self)
+
+    @staticmethod
+    def serialize(c):
+        """Dùng chung cho object ORM và dòng projection (chỉ cần truy cập thuộc tính)"""
         return {
-            "id": self.id,
-            "author_name": self.author_name,
-            "author_email": self.author_email,
-            "avatar_text": self.avatar_text,
-            "avatar_bg": self.avatar_bg,
-            "source": self.source,
-            "content": self.content,
-            "post_title": self.post_title,
-            "status": self.status,
-            "created_at": self.created_at.strftime("%d/%m/%Y %H:%M")
+            "id": c.id,
+            "author_name": c.author_name,
+            "author_email": c.author_email,
+            "avatar_text": c.avatar_text,
+            "avatar_bg": c.avatar_bg,
+            "source": c.source,
+            "external_id": c.external_id,
+            "content": c.content,
+            "post_id": c.post_id,
+            "post_title": c.post_title,
+            "status": c.status,
+            "spam_score": c.spam_score,
+            "auto_moderated": bool(c.auto_moderated),
+            "created_at": c.created_at.strftime("%d/%m/%Y %H:%M")
         }
@@ -5,8 +5,45 @@ class Media(db.Model):
     __tablename__ = "media"
     
     id = db.Column(db.Integer, primary_key=True)
-    filename = db.Column(db.String(255), nullable=False)
+    filename = db.Column(db.String(255), nullable=False, index=True)
     type = db.Column(db.String(20))  # image | video
     created_at = db.Column(db.DateTime, default=db.func.now())
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True, index=True)  # người upload
+
+    # Metadata lưu lúc upload (xem app/media_meta.py) -> list_media không cần stat file
+    size = db.Column(db.BigInteger)          # bytes
+    mime_type = db.Column(db.String(100))
+    width = db.Column(db.Integer)            # pixel
+    height = db.Column(db.Integer)
+    duration = db.Column(db.Float)           # giây (video)
+    sha256 = db.Column(db.String(64))
+
+    # Bytes giảm được khi bỏ EXIF / xoay ảnh theo Orientation (xem app/exif_strip.py), None = chưa xử lý
+    bytes_saved = db.Column(db.BigInteger)
+
+    # Media là URL ngoài: thời điểm lấy metadata gần nhất (TTL, xem app/remote_meta.py)
+    remote_checked_at = db.Column(db.DateTime)
+
+    # Placeholder cho grid trong lúc ảnh thật đang tải (xem app/placeholders.py)
+    blurhash = db.Column(db.String(64))
+    dominant_color = db.Column(db.String(7))   # "#rrggbb"
+
+    # Perceptual hash (dHash) + 4 band 16 bit để tra ảnh gần trùng (xem app/image_hash.py)
+    phash = db.Column(db.String(16))
+    phash_0 = db.Column(db.Integer, index=True)
+    phash_1 = db.Column(db.Integer, index=True)
+    phash_2 = db.Column(db.Integer, index=True)
+    phash_3 = db.Column(db.Integer, index=True)
+
+    # Ảnh thu nhỏ WebP / JPEG (xem app/derivatives.py)
+    variants = db.relationship('MediaVariant', backref='media', lazy='select',
+                               cascade='all, delete-orphan')
+
+    __table_args__ = (
+        # Trang thư viện: WHERE type = ? ORDER BY id DESC (phân trang theo id)
+        db.Index("ix_media_type_id", "type", "id"),
+        # Lọc theo khoảng ngày upload
+        db.Index("ix_media_created_at", "created_at"),
+    )
 
 
@@ -0,0 +1,16 @@
+from app import db
+from datetime import datetime
+
+class MediaBlob(db.Model):
+    """
+    File vật lý trong chế độ lưu trữ theo nội dung (MEDIA_DEDUP).
+    Nhiều dòng Media có cùng sha256 dùng chung một blob; file chỉ bị xóa
+    khi ref_count về 0.
+    """
+    __tablename__ = "media_blobs"
+
+    sha256 = db.Column(db.String(64), primary_key=True)
+    filename = db.Column(db.String(255), nullable=False, unique=True)
+    size = db.Column(db.BigInteger)
+    ref_count = db.Column(db.Integer, nullable=False, default=0)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -0,0 +1,21 @@
+from app import db
+
+class MediaVariant(db.Model):
+    """Bản thu nhỏ (derivative) của một ảnh: mỗi cặp (width, format) một dòng"""
+    __tablename__ = "media_variants"
+    __table_args__ = (
+        db.UniqueConstraint("media_id", "width", "format", name="uq_media_variant"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    media_id = db.Column(db.Integer, db.ForeignKey("media.id", ondelete="CASCADE"),
+                         nullable=False, index=True)
+    width = db.Column(db.Integer, nullable=False)       # 160 | 480 | 1280
+    height = db.Column(db.Integer)
+    format = db.Column(db.String(10), nullable=False)   # webp | jpeg
+    filename = db.Column(db.String(255), nullable=False, index=True)  # tương đối với UPLOAD_FOLDER
+    size = db.Column(db.BigInteger)
+
+    @property
+    def url(self):
+        return f"/uploads/{self.filename}"
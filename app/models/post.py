@@ -3,6 +3,13 @@ from datetime import datetime
 
 class Post(db.Model):
     __tablename__ = "posts"
+    __table_args__ = (
+        # Phục vụ phân trang keyset (created_at, id) có / không lọc status
+        db.Index("ix_posts_status_created_id", "status", "created_at", "id"),
+        db.Index("ix_posts_created_id", "created_at", "id"),
+        # gc_uploads.py kiểm tra file upload còn được bài viết dùng không
+        db.Index("ix_posts_image", "image"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
@@ -19,14 +26,20 @@ class Post(db.Model):
 
     is_deleted = db.Column(db.Boolean, default=False)
 
+    # Đếm sẵn (cập nhật cùng transaction với thao tác ghi bình luận) -> danh sách bài viết không cần JOIN
+    comment_count = db.Column(db.Integer, default=0)          # mọi bình luận của bài
+    pending_comment_count = db.Column(db.Integer, default=0)  # trong đó đang chờ duyệt
+
+    # Gán từ Python (như các model khác): SQLite lưu cùng định dạng có micro giây với
+    # giá trị bind của cursor phân trang; NOW() của SQLite chỉ lưu tới giây
     created_at = db.Column(
         db.DateTime,
-        default=db.func.now()
+        default=datetime.utcnow
     )
     updated_at = db.Column(
         db.DateTime,
-        default=db.func.now(),
-        onupdate=db.func.now()
+        default=datetime.utcnow,
+        onupdate=datetime.utcnow
     )
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
 
@@ -0,0 +1,13 @@
+from app import db
+
+class StatusCounter(db.Model):
+    """
+    Số dòng theo trạng thái của bảng comments / campaigns (xem app/status_counters.py).
+    Được cộng / trừ trong cùng transaction với thao tác ghi, nên trang thống kê
+    chỉ cần đọc vài dòng theo khóa chính thay vì COUNT(*) cả bảng.
+    """
+    __tablename__ = "status_counters"
+
+    scope = db.Column(db.String(20), primary_key=True)   # comments | campaigns
+    status = db.Column(db.String(20), primary_key=True)
+    count = db.Column(db.BigInteger, nullable=False, default=0)
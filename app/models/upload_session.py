@@ -0,0 +1,25 @@
+from app import db
+from datetime import datetime
+
+class UploadSession(db.Model):
+    """Phiên upload resumable (kiểu tus) cho file video lớn"""
+    __tablename__ = "upload_sessions"
+
+    id = db.Column(db.String(32), primary_key=True)   # uuid4().hex
+    filename = db.Column(db.String(255))               # tên gốc phía client
+    ext = db.Column(db.String(10), nullable=False)
+    type = db.Column(db.String(20))                    # image | video
+    size = db.Column(db.BigInteger, nullable=False)    # tổng số bytes sẽ nhận
+    offset = db.Column(db.BigInteger, default=0)       # số bytes đã ghi
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "filename": self.filename,
+            "size": self.size,
+            "offset": self.offset,
+        }
@@ -0,0 +1,87 @@
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, or_
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+class CursorError(ValueError):
+    """Cursor gửi lên không hợp lệ"""
+
+
+def parse_limit(value, default=DEFAULT_LIMIT, maximum=MAX_LIMIT):
+    """Đọc tham số limit từ query string, giới hạn trong [1, maximum]"""
+    if value in (None, ""):
+        return default
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise CursorError("limit không hợp lệ")
+    return max(1, min(limit, maximum))
+
+
+def encode_cursor(created_at, row_id):
+    """Mã hóa vị trí (created_at, id) của dòng cuối trang thành chuỗi cursor"""
+    raw = json.dumps([created_at.isoformat() if created_at else None, row_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Giải mã cursor -> (created_at, id)"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        created_at = datetime.fromisoformat(created_at) if created_at else None
+        return created_at, int(row_id)
+    except (ValueError, TypeError):
+        raise CursorError("cursor không hợp lệ")
+
+
+def keyset_page(query, created_col, id_col, limit, cursor=None):
+    """
+    Phân trang keyset theo (created_at DESC, id DESC).
+    Chi phí mỗi trang không phụ thuộc vào vị trí trang (không dùng OFFSET).
+    Trả về (rows, next_cursor).
+    """
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        if created_at is None:
+            query = query.filter(created_col.is_(None), id_col < row_id)
+        else:
+            query = query.filter(or_(
+                created_col < created_at,
+                and_(created_col == created_at, id_col < row_id),
+                created_col.is_(None),
+            ))
+
+    # Lấy dư 1 dòng để biết còn trang sau hay không
+    rows = query.order_by(created_col.desc(), id_col.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.created_at, last.id)
+    return rows, next_cursor
+
+
+def id_page(query, id_col, limit, cursor=None):
+    """
+    Phân trang keyset chỉ theo id DESC (bảng có id tăng dần theo thời gian
+    tạo, ví dụ media). Dùng được index ghép (cột lọc, id).
+    Trả về (rows, next_cursor).
+    """
+    if cursor:
+        _, row_id = decode_cursor(cursor)
+        query = query.filter(id_col < row_id)
+
+    rows = query.order_by(id_col.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(None, rows[-1].id)
+    return rows, next_cursor
@@ -0,0 +1,93 @@
+"""
+Placeholder chất lượng thấp cho grid media / danh sách bài viết.
+
+- BlurHash (https://blurha.sh): chuỗi ~30 ký tự, UI giải mã thành ảnh mờ
+  để tô ô ngay trong lúc ảnh thật đang lazy-load.
+- Màu chủ đạo dạng "#rrggbb" cho nền ô khi client không giải mã BlurHash.
+
+Tính trong process con của pipeline ảnh (derivatives.process_image), trên bản
+thu nhỏ 32x32 nên gần như không tốn thời gian so với việc render variants.
+"""
+import math
+
+import numpy as np
+
+from app.media_meta import Image
+
+COMPONENTS = (4, 3)  # (x, y)
+SAMPLE_SIZE = 32
+_BASE83 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+
+
+def _encode83(value, length):
+    return "".join(_BASE83[(value // 83 ** (length - 1 - i)) % 83] for i in range(length))
+
+
+def _srgb_to_linear(values):
+    v = values / 255.0
+    return np.where(v <= 0.04045, v / 12.92, ((v + 0.055) / 1.055) ** 2.4)
+
+
+def _linear_to_srgb(value):
+    v = max(0.0, min(1.0, value))
+    if v <= 0.0031308:
+        return int(v * 12.92 * 255 + 0.5)
+    return int((1.055 * v ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+def _sign_pow(value, exp):
+    return math.copysign(abs(value) ** exp, value)
+
+
+def _sample(img):
+    img.draft("RGB", (SAMPLE_SIZE * 2, SAMPLE_SIZE * 2))  # JPEG: decode ở độ phân giải thấp
+    return np.asarray(img.convert("RGB").resize((SAMPLE_SIZE, SAMPLE_SIZE), Image.BILINEAR),
+                      dtype=np.float64)
+
+
+def blurhash(pixels, components=COMPONENTS):
+    """Mảng RGB (h, w, 3) giá trị 0..255 -> chuỗi BlurHash"""
+    nx, ny = components
+    height, width = pixels.shape[:2]
+    linear = _srgb_to_linear(pixels)
+
+    cos_x = np.cos(np.pi * np.outer(np.arange(nx), np.arange(width)) / width)    # (nx, w)
+    cos_y = np.cos(np.pi * np.outer(np.arange(ny), np.arange(height)) / height)  # (ny, h)
+    factors = np.einsum("jy,ix,yxc->jic", cos_y, cos_x, linear) / (width * height)
+    factors[1:, :, :] *= 2
+    factors[0, 1:, :] *= 2
+    factors = factors.reshape(-1, 3)  # thứ tự j rồi i như thuật toán gốc
+
+    dc, ac = factors[0], factors[1:]
+    result = _encode83((nx - 1) + (ny - 1) * 9, 1)
+
+    if len(ac):
+        quantised_max = int(max(0, min(82, math.floor(np.abs(ac).max() * 166 - 0.5))))
+        maximum = (quantised_max + 1) / 166
+        result += _encode83(quantised_max, 1)
+    else:
+        maximum = 1
+        result += _encode83(0, 1)
+
+    r, g, b = (_linear_to_srgb(c) for c in dc)
+    result += _encode83((r << 16) + (g << 8) + b, 4)
+
+    for color in ac:
+        q = [int(max(0, min(18, math.floor(_sign_pow(c / maximum, 0.5) * 9 + 9.5)))) for c in color]
+        result += _encode83(q[0] * 19 * 19 + q[1] * 19 + q[2], 2)
+    return result
+
+
+def dominant_color(pixels):
+    """Màu phổ biến nhất (gom theo ô màu 4 bit / kênh) -> "#rrggbb" """
+    flat = pixels.reshape(-1, 3).astype(np.int64)
+    bins = (flat[:, 0] >> 4) * 256 + (flat[:, 1] >> 4) * 16 + (flat[:, 2] >> 4)
+    top = np.bincount(bins).argmax()
+    r, g, b = flat[bins == top].mean(axis=0).round().astype(int)
+    return f"#{r:02x}{g:02x}{b:02x}"
+
+
+def placeholders(img):
+    """Ảnh PIL -> {"blurhash": ..., "dominant_color": ...}"""
+    pixels = _sample(img)
+    return {"blurhash": blurhash(pixels), "dominant_color": dominant_color(pixels)}
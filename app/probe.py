@@ -0,0 +1,186 @@
+"""
+Đọc kích thước ảnh / thời lượng video chỉ từ header, không decode file.
+
+- PNG: chunk IHDR (24 bytes đầu)
+- JPEG: quét marker tới SOFn
+- GIF: logical screen descriptor
+- WebP: VP8 / VP8L / VP8X
+- MP4/MOV: duyệt box cấp cao nhất, seek qua mdat tới moov rồi đọc mvhd
+  (timescale, duration) và tkhd (width, height của track video)
+
+Chỉ đọc vài KB đầu (JPEG) hoặc seek thẳng tới box cần thiết (MP4).
+"""
+import struct
+
+HEAD_BYTES = 64 * 1024  # JPEG có EXIF lớn: SOF thường nằm trong 64 KB đầu
+
+CONTAINER_BOXES = {b"moov", b"trak", b"mdia", b"minf", b"stbl", b"edts"}
+
+
+class ProbeResult(dict):
+    """dict có sẵn các key width / height / duration / format"""
+
+    def __init__(self, fmt=None, width=None, height=None, duration=None):
+        super().__init__(format=fmt, width=width, height=height, duration=duration)
+
+
+# =================================================
+# ẢNH
+# =================================================
+def _png(head):
+    if len(head) >= 24 and head[12:16] == b"IHDR":
+        w, h = struct.unpack(">II", head[16:24])
+        return ProbeResult("png", w, h)
+
+
+def _gif(head):
+    if len(head) >= 10:
+        w, h = struct.unpack("<HH", head[6:10])
+        return ProbeResult("gif", w, h)
+
+
+def _webp(head):
+    chunk = head[12:16]
+    if chunk == b"VP8 " and len(head) >= 30:
+        w, h = struct.unpack("<HH", head[26:30])
+        return ProbeResult("webp", w & 0x3FFF, h & 0x3FFF)
+    if chunk == b"VP8L" and len(head) >= 25:
+        bits = int.from_bytes(head[21:25], "little")
+        return ProbeResult("webp", (bits & 0x3FFF) + 1, ((bits >> 14) & 0x3FFF) + 1)
+    if chunk == b"VP8X" and len(head) >= 30:
+        w = int.from_bytes(head[24:27], "little") + 1
+        h = int.from_bytes(head[27:30], "little") + 1
+        return ProbeResult("webp", w, h)
+
+
+SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
+
+def _jpeg(f, head):
+    pos = 2
+    while True:
+        # Đọc thêm nếu marker nằm ngoài phần head đã có
+        if pos + 9 > len(head):
+            more = f.read(HEAD_BYTES)
+            if not more:
+                return None
+            head += more
+            continue
+        if head[pos] != 0xFF:
+            return None
+        marker = head[pos + 1]
+        if marker == 0xFF:  # byte đệm
+            pos += 1
+            continue
+        if marker in (0xD8, 0x01) or 0xD0 <= marker <= 0xD7:
+            pos += 2
+            continue
+        if marker in SOF_MARKERS:
+            h, w = struct.unpack(">HH", head[pos + 5:pos + 9])
+            return ProbeResult("jpeg", w, h)
+        if marker == 0xD9:
+            return None
+        length = struct.unpack(">H", head[pos + 2:pos + 4])[0]
+        pos += 2 + length
+
+
+# =================================================
+# VIDEO (ISO BMFF: mp4 / mov / m4v)
+# =================================================
+def _boxes(f, start, end):
+    """Duyệt các box trong [start, end): yield (type, vị trí payload, kích thước payload)"""
+    pos = start
+    while end is None or pos + 8 <= end:
+        f.seek(pos)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        size, box_type = struct.unpack(">I4s", header)
+        header_len = 8
+        if size == 1:  # largesize 64-bit
+            size = struct.unpack(">Q", f.read(8))[0]
+            header_len = 16
+        elif size == 0:  # box kéo dài tới hết file
+            f.seek(0, 2)
+            size = f.tell() - pos
+        if size < header_len:
+            return
+        yield box_type, pos + header_len, size - header_len
+        pos += size
+
+
+def _mvhd(f, pos):
+    f.seek(pos)
+    version = f.read(1)[0]
+    f.read(3)
+    if version == 1:
+        f.read(16)
+        timescale, duration = struct.unpack(">IQ", f.read(12))
+    else:
+        f.read(8)
+        timescale, duration = struct.unpack(">II", f.read(8))
+    return duration / timescale if timescale else None
+
+
+def _tkhd(f, pos):
+    f.seek(pos)
+    version = f.read(1)[0]
+    # version 0: 3 bytes flags + 80 bytes trước width; version 1: + 12 bytes
+    f.seek(pos + (88 if version == 1 else 76))
+    w, h = struct.unpack(">II", f.read(8))
+    return w >> 16, h >> 16  # số fixed-point 16.16
+
+
+def _mp4(f):
+    result = ProbeResult("mp4")
+    for box_type, pos, size in _boxes(f, 0, None):
+        if box_type == b"ftyp":
+            f.seek(pos)
+            if f.read(4) == b"qt  ":
+                result["format"] = "mov"
+        elif box_type == b"moov":
+            _walk_moov(f, pos, pos + size, result)
+            return result
+        # mdat (dữ liệu video) được bỏ qua bằng seek, không đọc
+    return result if result["duration"] is not None else None
+
+
+def _walk_moov(f, start, end, result):
+    for box_type, pos, size in _boxes(f, start, end):
+        if box_type == b"mvhd":
+            result["duration"] = _mvhd(f, pos)
+        elif box_type == b"tkhd" and not result["width"]:
+            w, h = _tkhd(f, pos)
+            if w and h:  # track audio có width = height = 0
+                result["width"], result["height"] = w, h
+        elif box_type in CONTAINER_BOXES:
+            _walk_moov(f, pos, pos + size, result)
+
+
+# =================================================
+# API
+# =================================================
+def probe_stream(f):
+    """f: file mở ở chế độ rb, seek được"""
+    head = f.read(32)
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return _png(head)
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return _gif(head)
+    if head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return _webp(head)
+    if head[:2] == b"\xff\xd8":
+        return _jpeg(f, head + f.read(HEAD_BYTES))
+    if head[4:8] in (b"ftyp", b"moov", b"mdat", b"wide", b"free"):
+        f.seek(0)
+        return _mp4(f)
+    return None
+
+
+def probe_file(path):
+    """Trả ProbeResult hoặc None nếu không nhận dạng được / file lỗi"""
+    try:
+        with open(path, "rb") as f:
+            return probe_stream(f)
+    except (OSError, struct.error, IndexError):
+        return None
@@ -0,0 +1,79 @@
+"""
+Projection cho các API danh sách.
+
+db.session.query(<cột>) trả về Row (tuple nhẹ): không đưa vào identity map,
+không theo dõi thay đổi và không tải các cột TEXT mà trang danh sách không dùng
+(ví dụ Post.content). Mỗi hàm *_list_query() đi kèm một hàm serialize dòng.
+"""
+from app import db
+from app.models.post import Post
+from app.models.comment import Comment
+from app.models.campaign import Campaign
+from app.models.media import Media
+
+# ========================
+# POSTS
+# ========================
+POST_LIST_COLUMNS = (
+    Post.id, Post.title, Post.status, Post.publish_at,
+    Post.image, Post.category, Post.author, Post.created_at,
+    Post.comment_count, Post.pending_comment_count,
+)
+
+def post_list_query():
+    return db.session.query(*POST_LIST_COLUMNS)
+
+def serialize_post_row(p):
+    return {
+        "id": p.id,
+        "title": p.title,
+        "status": p.status,
+        "publish_at": p.publish_at.strftime("%d/%m/%Y") if p.publish_at else None,
+        "image": p.image,
+        "category": p.category,
+        "author": p.author,
+        "comment_count": p.comment_count or 0,
+        "pending_comment_count": p.pending_comment_count or 0,
+    }
+
+# ========================
+# COMMENTS (trang duyệt bình luận có hiển thị nội dung)
+# ========================
+COMMENT_LIST_COLUMNS = (
+    Comment.id, Comment.author_name, Comment.author_email,
+    Comment.avatar_text, Comment.avatar_bg, Comment.source, Comment.external_id,
+    Comment.content, Comment.post_id, Comment.post_title, Comment.status,
+    Comment.spam_score, Comment.auto_moderated, Comment.created_at,
+)
+
+def comment_list_query():
+    return db.session.query(*COMMENT_LIST_COLUMNS)
+
+serialize_comment_row = Comment.serialize
+
+# ========================
+# CAMPAIGNS
+# ========================
+CAMPAIGN_LIST_COLUMNS = (
+    Campaign.id, Campaign.name, Campaign.platform, Campaign.status,
+    Campaign.budget, Campaign.spent, Campaign.reach, Campaign.clicks,
+    Campaign.conversions, Campaign.start_date, Campaign.end_date,
+)
+
+def campaign_list_query():
+    return db.session.query(*CAMPAIGN_LIST_COLUMNS)
+
+serialize_campaign_row = Campaign.serialize
+
+# ========================
+# MEDIA
+# ========================
+MEDIA_LIST_COLUMNS = (
+    Media.id, Media.filename, Media.type, Media.created_at, Media.user_id,
+    Media.size, Media.mime_type, Media.width, Media.height,
+    Media.duration, Media.sha256, Media.blurhash, Media.dominant_color,
+    Media.remote_checked_at, Media.bytes_saved,
+)
+
+def media_list_query():
+    return db.session.query(*MEDIA_LIST_COLUMNS)
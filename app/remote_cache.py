@@ -0,0 +1,137 @@
+"""
+Cache đọc-qua (read-through) cho media là URL ngoài (video Cloudinary...), bật bằng REMOTE_CACHE.
+
+GET /remote/<media id>:
+- Lần đầu: tải file từ host gốc về <UPLOAD_FOLDER>/.remote-cache (stream từng
+  chunk), các lần sau phục vụ thẳng từ đĩa, hỗ trợ Range để tua video.
+- Nhiều request đầu tiên cùng lúc cho một file chỉ tạo MỘT lần tải từ host
+  gốc; các request còn lại chờ file tải xong.
+- Cache giới hạn dung lượng (REMOTE_CACHE_MAX_BYTES), xóa theo LRU như resize_cache.
+- File quá lớn (hơn nửa cache) hoặc host gốc lỗi -> chuyển hướng về URL gốc.
+
+Chỉ nhận id của dòng media (không nhận URL tùy ý) nên không thành open proxy.
+"""
+import hashlib
+import os
+import threading
+from urllib.error import URLError
+from urllib.parse import urlsplit
+from urllib.request import Request, urlopen
+
+from flask import current_app, abort, redirect, send_file
+
+from app import db, storage
+from app.disk_cache import DiskUsage, KeyedLocks
+from app.media_meta import CHUNK_SIZE, guess_mime
+from app.models.media import Media
+
+CACHE_DIR = ".remote-cache"
+USER_AGENT = "hotel-media-webapp/remote-cache"
+
+_inflight = KeyedLocks()  # đường dẫn cache -> lock của thread đang tải
+_usage = DiskUsage()
+
+
+class FetchError(Exception):
+    """Không tải được (host lỗi / timeout) hoặc file quá lớn để cache"""
+
+
+def enabled():
+    return bool(current_app.config.get("REMOTE_CACHE"))
+
+
+def media_url(media_id, filename):
+    """URL cho client: đi qua cache nếu là URL ngoài và REMOTE_CACHE bật"""
+    if enabled() and storage.is_external(filename):
+        return f"/remote/{media_id}"
+    return storage.public_url(filename)
+
+
+def cache_folder():
+    folder = current_app.config.get("REMOTE_CACHE_FOLDER") or os.path.join(
+        current_app.config["UPLOAD_FOLDER"], CACHE_DIR)
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def _cache_path(url):
+    key = hashlib.sha1(url.encode()).hexdigest()
+    ext = os.path.splitext(urlsplit(url).path)[1][:10]
+    return os.path.join(cache_folder(), key[:2], f"{key}{ext}")
+
+
+def _max_bytes():
+    return current_app.config.get("REMOTE_CACHE_MAX_BYTES", 2 * 1024 ** 3)
+
+
+def _download(url, dest):
+    limit = _max_bytes() // 2
+    timeout = current_app.config.get("REMOTE_CACHE_TIMEOUT", 30)
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp = f"{dest}.{threading.get_ident()}.tmp"
+    try:
+        with urlopen(Request(url, headers={"User-Agent": USER_AGENT}), timeout=timeout) as res:
+            length = res.headers.get("Content-Length")
+            if length is not None and int(length) > limit:
+                raise FetchError("File quá lớn để cache")
+            size = 0
+            with open(tmp, "wb") as f:
+                while True:
+                    chunk = res.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    size += len(chunk)
+                    if size > limit:
+                        raise FetchError("File quá lớn để cache")
+                    f.write(chunk)
+        os.replace(tmp, dest)
+        return size
+    except (URLError, OSError) as e:
+        raise FetchError(str(e)) from e
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+
+
+def cached_path(url):
+    """Đường dẫn bản cache của url (tải về nếu chưa có); lỗi -> FetchError"""
+    dest = _cache_path(url)
+    try:
+        os.utime(dest)  # cập nhật thứ tự LRU
+        return dest
+    except FileNotFoundError:
+        pass
+
+    # Gộp request: chỉ thread giữ lock của key mới tải từ host gốc
+    with _inflight.hold(dest):
+        if not os.path.exists(dest):
+            size = _download(url, dest)
+            _usage.account(cache_folder(), size, _max_bytes())
+    return dest
+
+
+def serve(media_id):
+    media = db.session.get(Media, media_id)
+    if media is None or not storage.is_external(media.filename):
+        abort(404)
+    if not enabled():
+        return redirect(media.filename)
+
+    for _ in range(2):
+        try:
+            path = cached_path(media.filename)
+        except FetchError as e:
+            current_app.logger.warning("Không cache được %s: %s", media.filename, e)
+            return redirect(media.filename)
+
+        try:
+            return send_file(
+                path,
+                mimetype=media.mime_type or guess_mime(urlsplit(media.filename).path),
+                conditional=True,  # Range / If-None-Match
+                max_age=current_app.config.get("REMOTE_CACHE_MAX_AGE", 24 * 3600),
+            )
+        except FileNotFoundError:
+            # Bản cache bị xóa (LRU) giữa lúc kiểm tra và mở file -> tải lại
+            continue
+    return redirect(media.filename)
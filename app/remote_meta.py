@@ -0,0 +1,261 @@
+"""
+Metadata cho media là URL ngoài (video Cloudinary trong seed_media.py...).
+
+- Không gọi host ngoài lúc list_media: kết quả (size, MIME, width/height,
+  duration) được lưu vào chính dòng media, kèm remote_checked_at làm TTL.
+- Job nền (hoặc refresh_remote_media.py) lấy các dòng hết hạn, gửi request
+  song song có giới hạn (REMOTE_META_WORKERS) và timeout (REMOTE_META_TIMEOUT).
+- Mỗi URL chỉ tải vài block bằng ranged GET: RangeReader giả lập file seek
+  được để app.probe đọc header (MP4 có moov ở cuối cũng chỉ tốn thêm 1 request).
+  Server không hỗ trợ Range / chặn GET -> chỉ lấy size + MIME bằng HEAD.
+"""
+import logging
+import re
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from flask import current_app
+from sqlalchemy import or_
+
+from app import db
+from app.models.media import Media
+from app.probe import probe_stream
+
+log = logging.getLogger(__name__)
+
+BLOCK_SIZE = 64 * 1024
+MAX_REQUESTS = 6          # số ranged GET tối đa cho một URL
+USER_AGENT = "hotel-media-webapp/remote-meta"
+_CONTENT_RANGE = re.compile(r"bytes (\d+)-(\d+)/(\d+|\*)")
+
+_running = threading.Lock()  # chỉ một job nền mỗi process
+
+
+class RemoteError(Exception):
+    """Không lấy được metadata (timeout, HTTP lỗi, server không hỗ trợ Range)"""
+
+
+class NoRangeSupport(RemoteError):
+    """Server bỏ qua Range hoặc chặn GET -> chuyển sang HEAD"""
+
+
+class RangeReader:
+    """File chỉ đọc, seek được, đọc dữ liệu bằng HTTP Range theo block"""
+
+    def __init__(self, url, timeout=5.0, block_size=BLOCK_SIZE, max_requests=MAX_REQUESTS):
+        self.url = url
+        self.timeout = timeout
+        self.block_size = block_size
+        self.max_requests = max_requests
+        self.requests = 0
+        self.size = None
+        self.mime_type = None
+        self._pos = 0
+        self._blocks = {}  # chỉ số block -> bytes (tối đa vài block)
+
+    def _fetch(self, index):
+        if self.requests >= self.max_requests:
+            raise RemoteError("Quá số request cho một URL")
+        self.requests += 1
+        start = index * self.block_size
+        req = Request(self.url, headers={
+            "Range": f"bytes={start}-{start + self.block_size - 1}",
+            "User-Agent": USER_AGENT,
+        })
+        try:
+            with urlopen(req, timeout=self.timeout) as res:
+                self.mime_type = self.mime_type or res.headers.get_content_type()
+                if res.status == 206:
+                    match = _CONTENT_RANGE.match(res.headers.get("Content-Range", ""))
+                    if match and match.group(3) != "*":
+                        self.size = int(match.group(3))
+                    return res.read(self.block_size)
+                # 200: server bỏ qua Range -> chỉ chấp nhận nếu cả file nằm gọn trong 1 block
+                length = res.headers.get("Content-Length")
+                if start == 0 and length is not None and int(length) <= self.block_size:
+                    self.size = int(length)
+                    return res.read(self.block_size)
+                if length is not None:
+                    self.size = int(length)
+                raise NoRangeSupport("Server không hỗ trợ Range")
+        except HTTPError as e:
+            if e.code == 416:  # đọc quá cuối file
+                return b""
+            if e.code in (403, 405, 501):
+                raise NoRangeSupport(f"HTTP {e.code}") from e
+            raise RemoteError(f"HTTP {e.code}") from e
+        except (URLError, OSError) as e:
+            raise RemoteError(str(e)) from e
+
+    def _block(self, index):
+        if index not in self._blocks:
+            if len(self._blocks) >= 4:
+                self._blocks.pop(next(iter(self._blocks)))
+            self._blocks[index] = self._fetch(index)
+        return self._blocks[index]
+
+    def seek(self, offset, whence=0):
+        if whence == 2:
+            if self.size is None:
+                self._block(0)
+            offset += self.size or 0
+        elif whence == 1:
+            offset += self._pos
+        self._pos = max(0, offset)
+        return self._pos
+
+    def tell(self):
+        return self._pos
+
+    def read(self, n=-1):
+        if n is None or n < 0:
+            n = self.block_size
+        out = b""
+        while n > 0:
+            if self.size is not None and self._pos >= self.size:
+                break
+            index, skip = divmod(self._pos, self.block_size)
+            data = self._block(index)[skip:skip + n]
+            if not data:
+                break
+            out += data
+            self._pos += len(data)
+            n -= len(data)
+        return out
+
+
+def _head(url, timeout):
+    req = Request(url, method="HEAD", headers={"User-Agent": USER_AGENT})
+    try:
+        with urlopen(req, timeout=timeout) as res:
+            length = res.headers.get("Content-Length")
+            return {
+                "size": int(length) if length is not None else None,
+                "mime_type": res.headers.get_content_type(),
+            }
+    except HTTPError as e:
+        raise RemoteError(f"HTTP {e.code}") from e
+    except (URLError, OSError) as e:
+        raise RemoteError(str(e)) from e
+
+
+def fetch_metadata(url, timeout=5.0):
+    """URL -> {"size", "mime_type", "width", "height", "duration"}; lỗi -> RemoteError"""
+    reader = RangeReader(url, timeout)
+    meta = {"size": None, "mime_type": None, "width": None, "height": None, "duration": None}
+    try:
+        info = probe_stream(reader)
+        if info:
+            meta.update(width=info["width"], height=info["height"], duration=info["duration"])
+    except NoRangeSupport:
+        if reader.size is None:
+            # GET bị chặn -> ít nhất lấy size + MIME bằng HEAD
+            meta.update(_head(url, timeout))
+            return meta
+    except RemoteError:
+        if reader.size is None:
+            raise  # timeout / 404 ... ngay từ block đầu
+    except (struct.error, IndexError, ValueError):
+        pass  # header hỏng: vẫn giữ size + MIME
+    meta["size"] = reader.size
+    meta["mime_type"] = reader.mime_type
+    return meta
+
+
+# =================================================
+# CACHE TRONG DB
+# =================================================
+def stale_query(now=None):
+    """Media URL ngoài chưa có metadata hoặc đã quá TTL"""
+    now = now or datetime.utcnow()
+    cutoff = now - timedelta(seconds=current_app.config.get("REMOTE_META_TTL", 24 * 3600))
+    return Media.query.filter(
+        or_(Media.filename.like("http://%"), Media.filename.like("https://%")),
+        or_(Media.remote_checked_at.is_(None), Media.remote_checked_at < cutoff),
+    )
+
+
+def is_stale(checked_at, now=None):
+    if checked_at is None:
+        return True
+    ttl = current_app.config.get("REMOTE_META_TTL", 24 * 3600)
+    return (now or datetime.utcnow()) - checked_at > timedelta(seconds=ttl)
+
+
+def _safe_fetch(url, timeout):
+    try:
+        return fetch_metadata(url, timeout)
+    except RemoteError as e:
+        log.warning("Không lấy được metadata %s: %s", url, e)
+        return None
+
+
+def refresh(media_list):
+    """Lấy metadata cho các Media (song song, có giới hạn) và lưu vào DB -> (ok, failed)"""
+    config = current_app.config
+    workers = config.get("REMOTE_META_WORKERS", 4)
+    timeout = config.get("REMOTE_META_TIMEOUT", 5.0)
+    ttl = config.get("REMOTE_META_TTL", 24 * 3600)
+    retry = config.get("REMOTE_META_RETRY", 600)
+
+    urls = [m.filename for m in media_list]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(lambda u: _safe_fetch(u, timeout), urls))
+
+    now = datetime.utcnow()
+    ok = failed = 0
+    for media, meta in zip(media_list, results):
+        if meta is None:
+            # Lỗi: lưu như đã kiểm tra nhưng để hết hạn sớm (thử lại sau REMOTE_META_RETRY giây)
+            media.remote_checked_at = now - timedelta(seconds=max(0, ttl - retry))
+            failed += 1
+            continue
+        for key, value in meta.items():
+            if value is not None:
+                setattr(media, key, value)
+        media.remote_checked_at = now
+        ok += 1
+    db.session.commit()
+    return ok, failed
+
+
+def refresh_stale(batch_size=200):
+    """Làm mới toàn bộ media URL ngoài đã hết hạn, theo lô -> (ok, failed)"""
+    total_ok = total_failed = 0
+    last_id = 0
+    started = datetime.utcnow()
+    while True:
+        batch = (stale_query(started).filter(Media.id > last_id)
+                 .order_by(Media.id).limit(batch_size).all())
+        if not batch:
+            return total_ok, total_failed
+        last_id = batch[-1].id
+        ok, failed = refresh(batch)
+        total_ok += ok
+        total_failed += failed
+
+
+def schedule_refresh():
+    """Chạy refresh_stale ở thread nền (bỏ qua nếu đang có job chạy hoặc bị tắt)"""
+    if not current_app.config.get("REMOTE_META_BACKGROUND", True):
+        return False
+    if not _running.acquire(blocking=False):
+        return False
+    app = current_app._get_current_object()
+
+    def _run():
+        try:
+            with app.app_context():
+                refresh_stale()
+                db.session.remove()
+        except Exception:
+            log.exception("Job metadata URL ngoài bị lỗi")
+        finally:
+            _running.release()
+
+    threading.Thread(target=_run, name="remote-meta", daemon=True).start()
+    return True
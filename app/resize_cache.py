@@ -0,0 +1,95 @@
+"""
+Resize ảnh theo yêu cầu cho /uploads/<w>x<h>/<filename> (kiểu imgproxy).
+
+- Lần đầu: decode + resize (giữ tỉ lệ, nằm gọn trong w x h) rồi lưu vào cache
+  trên đĩa. Các lần sau trả thẳng file trong cache, không decode.
+- Cache giới hạn dung lượng (RESIZE_CACHE_MAX_BYTES), xóa theo LRU dựa trên
+  mtime (mỗi lần hit sẽ "chạm" lại file).
+- Nhiều request cùng lúc cho cùng một kích thước chưa có trong cache được gộp
+  lại: chỉ một thread resize, các thread khác chờ kết quả.
+"""
+import hashlib
+import os
+import threading
+
+from flask import current_app
+
+from app.media_meta import Image
+from app import storage
+from app.disk_cache import DiskUsage, KeyedLocks
+
+CACHE_DIR = ".resize-cache"
+FORMATS = {"jpg": "JPEG", "jpeg": "JPEG", "png": "PNG", "webp": "WEBP"}
+
+_inflight = KeyedLocks()  # đường dẫn cache -> lock của thread đang resize
+_usage = DiskUsage()      # tổng dung lượng cache (tính lười lần đầu)
+
+
+class ResizeError(Exception):
+    """Kích thước / định dạng không hỗ trợ"""
+
+
+def cache_folder():
+    folder = current_app.config.get("RESIZE_CACHE_FOLDER") or os.path.join(
+        current_app.config["UPLOAD_FOLDER"], CACHE_DIR)
+    os.makedirs(folder, exist_ok=True)
+    return folder
+
+
+def _cache_path(width, height, filename):
+    ext = filename.rsplit(".", 1)[-1].lower()
+    key = hashlib.sha1(f"{width}x{height}/{filename}".encode()).hexdigest()
+    # Chia thư mục con theo 2 ký tự đầu để thư mục cache không quá lớn
+    return os.path.join(cache_folder(), key[:2], f"{key}.{ext}")
+
+
+def _render(src, dest, width, height, fmt):
+    with Image.open(src) as img:
+        img.draft(img.mode, (width or img.width, height or img.height))  # JPEG: decode ở độ phân giải thấp
+        img.thumbnail((width or img.width, height or img.height), Image.LANCZOS)
+        if fmt == "JPEG" and img.mode not in ("RGB", "L"):
+            img = img.convert("RGB")
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        tmp = f"{dest}.{threading.get_ident()}.tmp"
+        img.save(tmp, format=fmt, quality=85)
+        os.replace(tmp, dest)
+
+
+def _account(added):
+    max_bytes = current_app.config.get("RESIZE_CACHE_MAX_BYTES", 512 * 1024 * 1024)
+    _usage.account(cache_folder(), added, max_bytes)
+
+
+def resized_path(filename, width, height):
+    """
+    Trả về đường dẫn file đã resize (tạo nếu chưa có).
+    Trả None nếu file gốc không tồn tại.
+    """
+    if Image is None:
+        raise ResizeError("Chưa cài Pillow")
+
+    max_dim = current_app.config.get("RESIZE_MAX_DIMENSION", 2048)
+    if not (0 <= width <= max_dim and 0 <= height <= max_dim) or not (width or height):
+        raise ResizeError("Kích thước không hợp lệ")
+
+    fmt = FORMATS.get(filename.rsplit(".", 1)[-1].lower())
+    if fmt is None:
+        raise ResizeError("Định dạng không hỗ trợ resize")
+
+    src = storage.uploads().local_path(filename)
+    if src is None:
+        return None
+
+    dest = _cache_path(width, height, filename)
+    try:
+        os.utime(dest)  # cập nhật thứ tự LRU
+        return dest
+    except FileNotFoundError:
+        pass
+
+    # Gộp request: chỉ thread giữ lock của key mới được resize
+    with _inflight.hold(dest):
+        if not os.path.exists(dest):
+            _render(src, dest, width, height, fmt)
+            _account(os.path.getsize(dest))
+    return dest
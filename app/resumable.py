@@ -0,0 +1,167 @@
+"""
+Upload resumable (tương tự giao thức tus).
+
+Mỗi phiên ghi dữ liệu vào <UPLOAD_FOLDER>/.partial/<id>.part. Các chunk PATCH
+được ghi thẳng xuống đĩa, sha256 được cập nhật dần; khi hoàn tất file được
+os.replace() (atomic, cùng filesystem) vào UPLOAD_FOLDER.
+
+Trạng thái sha256 giữ trong bộ nhớ của worker. Nếu chunk tiếp theo rơi vào
+worker khác (hoặc server khởi động lại) thì hash được dựng lại một lần bằng
+cách đọc phần file đã nhận. Hash của phiên bỏ dở quá HASHER_IDLE_SECONDS bị
+bỏ khỏi bộ nhớ (lần PATCH sau sẽ dựng lại từ file).
+
+Hai PATCH cùng phiên (client retry, hai worker) chạy tuần tự nhờ locked():
+lock trong process + flock trên file .part; kiểm tra offset, ghi file, cập nhật
+hash và commit offset đều nằm trong lock.
+"""
+import hashlib
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app
+
+try:
+    import fcntl
+except ImportError:  # Windows: chỉ có lock trong process
+    fcntl = None
+
+from app.media_meta import CHUNK_SIZE
+
+PARTIAL_DIR = ".partial"
+
+HASHER_IDLE_SECONDS = 3600
+
+_hashers = {}  # upload_id -> (offset, sha256 object, lần dùng cuối)
+_hashers_lock = threading.Lock()
+_session_locks = {}  # upload_id -> [lock, số request đang giữ / chờ]
+
+
+class UploadConflict(Exception):
+    """Offset client gửi không khớp với offset đã lưu"""
+
+
+class UploadTooLarge(Exception):
+    """Client gửi nhiều bytes hơn kích thước đã khai báo"""
+
+
+class UploadGone(Exception):
+    """Phiên đã được finalize / hủy bởi request khác trong lúc chờ lock"""
+
+
+def partial_path(upload_id):
+    folder = os.path.join(current_app.config["UPLOAD_FOLDER"], PARTIAL_DIR)
+    os.makedirs(folder, exist_ok=True)
+    return os.path.join(folder, f"{upload_id}.part")
+
+
+def _store_hasher(upload_id, offset, digest):
+    """Lưu hash của phiên, đồng thời bỏ hash của các phiên bỏ dở quá lâu"""
+    now = time.monotonic()
+    with _hashers_lock:
+        _hashers[upload_id] = (offset, digest, now)
+        stale = [k for k, (_, _, used) in _hashers.items() if now - used > HASHER_IDLE_SECONDS]
+        for key in stale:
+            del _hashers[key]
+
+
+@contextmanager
+def locked(upload_id):
+    """Giữ phiên upload độc quyền (giữa các thread và giữa các worker)"""
+    with _hashers_lock:
+        entry = _session_locks.setdefault(upload_id, [threading.Lock(), 0])
+        entry[1] += 1
+    path = partial_path(upload_id)
+    try:
+        with entry[0]:
+            try:
+                f = open(path, "rb")
+            except FileNotFoundError:
+                raise UploadGone(upload_id) from None
+            with f:
+                if fcntl is not None:
+                    fcntl.flock(f, fcntl.LOCK_EX)
+                # Worker giữ lock trước có thể đã đổi tên / xóa file .part
+                if not os.path.exists(path):
+                    raise UploadGone(upload_id)
+                yield
+    finally:
+        with _hashers_lock:
+            entry[1] -= 1
+            if not entry[1]:
+                del _session_locks[upload_id]
+
+
+def create_partial(upload_id):
+    open(partial_path(upload_id), "wb").close()
+    _store_hasher(upload_id, 0, hashlib.sha256())
+
+
+def _hasher_at(upload_id, offset):
+    """Lấy sha256 đang ở đúng offset; dựng lại từ file nếu cần"""
+    with _hashers_lock:
+        cached = _hashers.pop(upload_id, None)
+    if cached and cached[0] == offset:
+        return cached[1]
+
+    digest = hashlib.sha256()
+    remaining = offset
+    with open(partial_path(upload_id), "rb") as f:
+        while remaining:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+    return digest
+
+
+def append_chunk(session, client_offset, stream):
+    """
+    Ghi dữ liệu từ stream vào file tạm bắt đầu tại client_offset.
+    Trả về offset mới. Không giữ cả chunk trong bộ nhớ.
+    Gọi trong locked(session.id), với session.offset vừa đọc lại từ DB.
+    """
+    if client_offset != session.offset:
+        raise UploadConflict(session.offset)
+
+    path = partial_path(session.id)
+    digest = _hasher_at(session.id, session.offset)
+    offset = session.offset
+
+    try:
+        with open(path, "r+b") as f:
+            f.seek(offset)
+            f.truncate()  # bỏ phần dư của lần PATCH bị ngắt trước đó
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                if offset + len(chunk) > session.size:
+                    raise UploadTooLarge(session.size)
+                f.write(chunk)
+                digest.update(chunk)
+                offset += len(chunk)
+    finally:
+        # Luôn lưu lại tiến độ đã ghi được (kể cả khi kết nối bị ngắt giữa chừng)
+        _store_hasher(session.id, offset, digest)
+        session.offset = offset
+
+    return offset
+
+
+def finalize(session, dest_path):
+    """Chuyển file tạm vào UPLOAD_FOLDER (atomic) -> sha256 hex"""
+    digest = _hasher_at(session.id, session.offset)
+    os.replace(partial_path(session.id), dest_path)
+    return digest.hexdigest()
+
+
+def discard(upload_id):
+    with _hashers_lock:
+        _hashers.pop(upload_id, None)
+    try:
+        os.remove(partial_path(upload_id))
+    except FileNotFoundError:
+        pass
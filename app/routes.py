@@ -1,7 +1,7 @@
 from flask import (
     Blueprint, render_template, request,
     redirect, session, url_for, jsonify,
-    send_from_directory
+    current_app, stream_with_context, abort
 )
 from flask_login import (
     login_user, logout_user,
@@ -13,28 +13,70 @@ from app.models.post import Post
 from app.models.comment import Comment
 from app.models.campaign import Campaign
 from app.models.media import Media
+from app.models.upload_session import UploadSession
+from app import (
+    resumable, dedup, derivatives, storage, image_hash, media_export,
+    remote_meta, remote_cache, upload_stream, exif_strip, comment_moderation,
+    status_counters, spam_filter, comment_ingest,
+)
+from app.pagination import CursorError, parse_limit, keyset_page, id_page
+from app.media_meta import format_size, fill_metadata
+from app.file_serving import serve_upload
+from app.sharding import upload_path
+from app.projections import (
+    post_list_query, serialize_post_row,
+    comment_list_query, serialize_comment_row,
+    campaign_list_query, serialize_campaign_row,
+    media_list_query
+)
 import os, uuid
-from datetime import datetime
+from datetime import datetime, timedelta
 from werkzeug.utils import secure_filename
 
 auth = Blueprint("auth", __name__)
-UPLOAD_FOLDER = "uploads"
 
 # =================================================
 # HELPER FUNCTIONS
 # =================================================
-def get_file_size(path):
-    """Tính dung lượng file để hiển thị"""
-    try:
-        size = os.path.getsize(path)
-        if size < 1024:
-            return f"{size} B"
-        elif size < 1024 * 1024:
-            return f"{size / 1024:.1f} KB"
-        else:
-            return f"{size / (1024 * 1024):.1f} MB"
-    except:
-        return "0 KB"
+def upload_folder():
+    """Thư mục upload lấy từ config của app (mặc định <cwd>/uploads)"""
+    return current_app.config["UPLOAD_FOLDER"]
+
+VIDEO_EXTS = ["mp4", "mov", "avi", "webm"]
+
+# Ảnh chưa có BlurHash / màu chủ đạo (chưa xử lý xong, URL ngoài, video)
+EMPTY_PLACEHOLDER = {"blurhash": None, "dominant_color": None}
+
+def media_type_for(ext):
+    """Phân loại image / video theo phần mở rộng"""
+    return "video" if ext in VIDEO_EXTS else "image"
+
+def register_media(path, ext, size, sha256):
+    """
+    Tạo dòng Media cho file vừa ghi vào UPLOAD_FOLDER (chưa commit) và đưa
+    file vào backend lưu trữ (MEDIA_STORAGE).
+    Chế độ MEDIA_DEDUP: file trùng nội dung dùng chung một blob.
+    """
+    media = Media(
+        filename=os.path.basename(path),
+        type=media_type_for(ext),
+        user_id=current_user.id if current_user.is_authenticated else None
+    )
+    # Bỏ EXIF / xoay ảnh trước khi URL được công bố (URL upload là immutable)
+    stripped = exif_strip.strip_upload(path, ext)
+    if stripped:
+        media.bytes_saved = stripped["bytes_saved"]
+        size, sha256 = stripped["size"], stripped["sha256"]
+    # Đọc metadata từ file vừa ghi (trước khi dedup có thể xóa nó)
+    fill_metadata(media, path, size=size, sha256=sha256)
+
+    if current_app.config.get("MEDIA_DEDUP"):
+        media.filename = dedup.store_upload(path, ext, size, sha256)
+    else:
+        storage.uploads().put_file(media.filename, path)
+
+    db.session.add(media)
+    return media
 
 def parse_date(date_str):
     """Chuyển đổi ngày từ chuỗi sang object datetime"""
@@ -274,6 +316,8 @@ def get_post(id):
         "status": post.status,
         "publish_at": post.publish_at.strftime("%d/%m/%Y") if post.publish_at else None,
         "image": post.image,
+        "image_variants": derivatives.variants_by_image_urls([post.image]).get(post.image, {}),
+        **derivatives.placeholders_by_image_urls([post.image]).get(post.image, EMPTY_PLACEHOLDER),
         "author": post.author
     })
 
@@ -283,6 +327,10 @@ def update_post(id):
     post = Post.query.get_or_404(id)
     data = request.json
 
+    if data.get("title") and data["title"] != post.title:
+        # Tên bài hiển thị cạnh bình luận đi theo tiêu đề mới
+        Comment.query.filter_by(post_id=post.id).update(
+            {Comment.post_title: data["title"]}, synchronize_session=False)
     post.title = data.get("title", post.title)
     post.content = data.get("content", post.content)
     post.category = data.get("category", post.category)
@@ -305,6 +353,8 @@ def update_post(id):
 @login_required
 def delete_post(id):
     post = Post.query.get_or_404(id)
+    # Bình luận giữ lại (post_title vẫn còn), chỉ bỏ liên kết (SQLite không tự ON DELETE SET NULL)
+    Comment.query.filter_by(post_id=post.id).update({Comment.post_id: None}, synchronize_session=False)
     # Xóa trực tiếp khỏi DB (hoặc dùng soft delete nếu muốn)
     db.session.delete(post)
     db.session.commit()
@@ -314,25 +364,38 @@ def delete_post(id):
 @login_required
 def list_posts():
     status = request.args.get("status")
-    query = Post.query # Nếu có cột is_deleted thì thêm .filter_by(is_deleted=False)
+    query = post_list_query() # Nếu có cột is_deleted thì thêm .filter(Post.is_deleted == False)
 
     if status:
-        query = query.filter_by(status=status)
-
-    posts = query.order_by(Post.created_at.desc()).all()
-
-    return jsonify([
-        {
-            "id": p.id,
-            "title": p.title,
-            "status": p.status,
-            "publish_at": p.publish_at.strftime("%d/%m/%Y") if p.publish_at else None,
-            "image": p.image,
-            "category": p.category,
-            "author": p.author
-        }
-        for p in posts
-    ])
+        query = query.filter(Post.status == status)
+
+    # Có limit / cursor -> phân trang keyset, trả về {"items", "next_cursor"}
+    paginated = "limit" in request.args or "cursor" in request.args
+    if paginated:
+        try:
+            limit = parse_limit(request.args.get("limit"))
+            posts, next_cursor = keyset_page(
+                query, Post.created_at, Post.id, limit,
+                cursor=request.args.get("cursor"),
+            )
+        except CursorError as e:
+            return jsonify({"error": str(e)}), 400
+    else:
+        posts = query.order_by(Post.created_at.desc(), Post.id.desc()).all()
+
+    items = [serialize_post_row(p) for p in posts]
+
+    # Ảnh thu nhỏ theo từng kích thước + placeholder cho card bài viết (1 query mỗi loại cho cả trang)
+    image_urls = {p["image"] for p in items}
+    variants = derivatives.variants_by_image_urls(image_urls)
+    placeholders = derivatives.placeholders_by_image_urls(image_urls)
+    for item in items:
+        item["image_variants"] = variants.get(item["image"], {})
+        item.update(placeholders.get(item["image"], EMPTY_PLACEHOLDER))
+
+    if paginated:
+        return jsonify({"items": items, "next_cursor": next_cursor})
+    return jsonify(items)
 
 # =================================================
 # API MEDIA & UPLOAD (THƯ VIỆN ẢNH)
@@ -343,75 +406,350 @@ def list_posts():
 @auth.route("/api/upload-thumbnail", methods=["POST"])
 @login_required
 def upload_thumbnail():
-    if "file" not in request.files:
-        return jsonify({"error": "No file"}), 400
+    os.makedirs(upload_folder(), exist_ok=True)
 
-    file = request.files["file"]
-    if file.filename == "":
-        return jsonify({"error": "Empty filename"}), 400
-
-    os.makedirs(UPLOAD_FOLDER, exist_ok=True)
-
-    # Xử lý tên file và lưu
-    ext = file.filename.rsplit(".", 1)[1].lower() if "." in file.filename else "jpg"
-    filename = f"{uuid.uuid4().hex}.{ext}"
-    path = os.path.join(UPLOAD_FOLDER, filename)
-    file.save(path)
+    # Parse body theo stream (ghi từng chunk, tính luôn size + sha256):
+    # sai magic bytes / quá giới hạn dung lượng -> dừng ngay, không đọc hết body
+    try:
+        path, ext, size, sha256 = upload_stream.receive_file(
+            lambda ext: upload_path(f"{uuid.uuid4().hex}.{ext}"))
+    except upload_stream.UploadRejected as e:
+        return jsonify({"error": str(e)}), e.status
+    filename = os.path.basename(path)
 
     # === [QUAN TRỌNG] Lưu vào Database Media ===
-    media_type = "video" if ext in ["mp4", "mov", "avi", "webm"] else "image"
-    media = Media(filename=filename, type=media_type)
-    db.session.add(media)
-    db.session.commit()
+    try:
+        media = register_media(path, ext, size, sha256)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        # File vừa ghi chưa có dòng DB nào trỏ tới -> xóa luôn để không thành file mồ côi
+        if not current_app.config.get("MEDIA_DEDUP"):
+            try:
+                storage.uploads().delete(filename)
+            except (OSError, storage.StorageError) as e:
+                current_app.logger.warning("Không xóa được %s: %s", filename, e)
+        raise
     # ===========================================
 
+    # Tạo ảnh thu nhỏ WebP/JPEG ở process pool (không chặn request)
+    derivatives.schedule(media)
+
     return jsonify({
-        "url": f"/uploads/{filename}",
+        "url": f"/uploads/{media.filename}",
         "media_id": media.id
     })
 
 # 2. API Lấy danh sách Media (Cho trang Thư viện)
+def filter_media(query, args):
+    """
+    Bộ lọc cho list_media:
+    type, from / to (ngày upload, dd/mm/yyyy hoặc yyyy-mm-dd, tính cả ngày "to"),
+    uploader (user id), min_size / max_size (bytes). Sai định dạng -> ValueError.
+    """
+    if args.get("type"):
+        query = query.filter(Media.type == args["type"])
+
+    for name in ("from", "to"):
+        if args.get(name) and parse_date(args[name]) is None:
+            raise ValueError(f"{name} không hợp lệ")
+    if args.get("from"):
+        query = query.filter(Media.created_at >= parse_date(args["from"]))
+    if args.get("to"):
+        query = query.filter(Media.created_at < parse_date(args["to"]) + timedelta(days=1))
+
+    if args.get("uploader"):
+        query = query.filter(Media.user_id == int(args["uploader"]))
+    if args.get("min_size"):
+        query = query.filter(Media.size >= int(args["min_size"]))
+    if args.get("max_size"):
+        query = query.filter(Media.size <= int(args["max_size"]))
+    return query
+
 @auth.route("/api/media", methods=["GET"])
 @login_required
 def list_media():
-    media_type = request.args.get("type")
-    query = Media.query
-    if media_type: query = query.filter_by(type=media_type)
-    media_list = query.order_by(Media.id.desc()).all()
+    try:
+        query = filter_media(media_list_query(), request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Có limit / cursor -> phân trang keyset theo id, trả về {"items", "next_cursor"}
+    paginated = "limit" in request.args or "cursor" in request.args
+    if paginated:
+        try:
+            limit = parse_limit(request.args.get("limit"))
+            media_list, next_cursor = id_page(query, Media.id, limit,
+                                              cursor=request.args.get("cursor"))
+        except CursorError as e:
+            return jsonify({"error": str(e)}), 400
+    else:
+        media_list = query.order_by(Media.id.desc()).all()
+    variants = derivatives.variants_by_media_ids([m.id for m in media_list])
+
+    # URL ngoài chưa có / hết hạn metadata -> lấy ở thread nền, lần sau mới có
+    if any(storage.is_external(m.filename) and remote_meta.is_stale(m.remote_checked_at)
+           for m in media_list):
+        remote_meta.schedule_refresh()
     
     results = []
     for m in media_list:
-        
-        if m.filename.startswith("http"):
-            
-            url = m.filename
-            size_str = "Online"
-        elif m.filename.startswith("static/"):
-           
-            url = f"/{m.filename}"
-        
-            real_path = os.path.join(os.getcwd(), "app", m.filename)
-            size_str = get_file_size(real_path)
-        else:
-            url = f"/uploads/{m.filename}"
-            real_path = os.path.join(UPLOAD_FOLDER, m.filename)
-            size_str = get_file_size(real_path)
-
+        # Chỉ đọc metadata đã lưu trong DB, không stat file
         results.append({
             "id": m.id,
             "filename": m.filename,
             "type": m.type,
-            "url": url, 
+            "url": remote_cache.media_url(m.id, m.filename),
             "created_at": m.created_at.strftime("%d/%m/%Y"),
-            "size": size_str
+            "size": "Online" if m.size is None and storage.is_external(m.filename) else format_size(m.size),
+            "size_bytes": m.size,
+            "mime_type": m.mime_type,
+            "width": m.width,
+            "height": m.height,
+            "duration": m.duration,
+            "sha256": m.sha256,
+            "uploader_id": m.user_id,
+            "blurhash": m.blurhash,
+            "dominant_color": m.dominant_color,
+            "bytes_saved": m.bytes_saved,
+            "variants": variants.get(m.id, {})
         })
+
+    if paginated:
+        return jsonify({"items": results, "next_cursor": next_cursor})
     return jsonify(results)
 
+# Tải nhiều media thành một file ZIP (stream, không file tạm)
+#   ?ids=1,2,3  hoặc bộ lọc như list_media (type, from, to, uploader, min_size, max_size)
+@auth.route("/api/media/export", methods=["GET"])
+@login_required
+def export_media():
+    try:
+        query = filter_media(media_list_query(), request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    if request.args.get("ids"):
+        try:
+            ids = [int(i) for i in request.args["ids"].split(",") if i.strip()]
+        except ValueError:
+            return jsonify({"error": "ids không hợp lệ"}), 400
+        query = query.filter(Media.id.in_(ids))
+
+    archive, skipped = media_export.build_archive(query.order_by(Media.id).all())
+    if not archive.entries:
+        return jsonify({"error": "Không có file nào để xuất"}), 404
+
+    response = current_app.response_class(
+        stream_with_context(iter(archive)),
+        mimetype="application/zip",
+        direct_passthrough=True
+    )
+    filename = f"media-{datetime.now():%Y%m%d-%H%M%S}.zip"
+    response.headers["Content-Disposition"] = f'attachment; filename="{filename}"'
+    response.headers["X-Skipped-Media"] = str(skipped)  # URL ngoài / file không còn
+    length = archive.content_length()
+    if length is not None:
+        response.content_length = length  # ngược lại: chunked transfer
+    return response
+
+# Tổng dung lượng giảm được nhờ bỏ EXIF / ảnh nhúng (app/exif_strip.py)
+@auth.route("/api/media/metadata-savings", methods=["GET"])
+@login_required
+def metadata_savings():
+    return jsonify(exif_strip.savings_report())
+
+# Ảnh gần trùng (perceptual hash), ?max_distance=10 (bit, tối đa 11) &limit=20
+@auth.route("/api/media/<int:id>/similar", methods=["GET"])
+@login_required
+def similar_media(id):
+    media = Media.query.get_or_404(id)
+    if not media.phash:
+        return jsonify({"error": "Ảnh chưa được tính perceptual hash"}), 409
+    try:
+        max_distance = int(request.args.get("max_distance", 10))
+        limit = parse_limit(request.args.get("limit"))
+    except (ValueError, CursorError):
+        return jsonify({"error": "Tham số không hợp lệ"}), 400
+
+    matches = image_hash.find_similar(media, max_distance, limit)
+    rows = {m.id: m for m in media_list_query().filter(Media.id.in_([i for i, _ in matches]))}
+    return jsonify([{
+        "id": media_id,
+        "filename": rows[media_id].filename,
+        "type": rows[media_id].type,
+        "url": storage.public_url(rows[media_id].filename),
+        "width": rows[media_id].width,
+        "height": rows[media_id].height,
+        "distance": distance
+    } for media_id, distance in matches])
+
 @auth.route("/api/media/upload", methods=["POST"])
 @login_required
 def upload_media_library():
     return upload_thumbnail() 
 
+# 3. Upload resumable cho video lớn (giao thức kiểu tus)
+#    POST   /api/uploads                 {filename, size}  -> tạo phiên
+#    HEAD   /api/uploads/<id>            -> header Upload-Offset
+#    PATCH  /api/uploads/<id>            header Upload-Offset + body bytes
+#    POST   /api/uploads/<id>/finalize   -> chuyển vào UPLOAD_FOLDER + tạo Media
+#    DELETE /api/uploads/<id>            -> hủy phiên
+def _offset_headers(session):
+    return {
+        "Upload-Offset": str(session.offset),
+        "Upload-Length": str(session.size),
+        "Cache-Control": "no-store"
+    }
+
+def _client_offset():
+    """Offset bắt đầu của chunk: header Upload-Offset hoặc Content-Range"""
+    if "Upload-Offset" in request.headers:
+        return int(request.headers["Upload-Offset"])
+    content_range = request.headers.get("Content-Range", "")
+    # Dạng: bytes <start>-<end>/<total>
+    if content_range.startswith("bytes "):
+        return int(content_range[6:].split("-", 1)[0])
+    raise ValueError("Thiếu Upload-Offset")
+
+@auth.route("/api/uploads", methods=["POST"])
+@login_required
+def create_upload():
+    data = request.json or {}
+    name = data.get("filename") or ""
+    try:
+        size = int(data.get("size"))
+    except (TypeError, ValueError):
+        return jsonify({"error": "Thiếu kích thước file"}), 400
+    if size <= 0:
+        return jsonify({"error": "Kích thước file không hợp lệ"}), 400
+
+    ext = name.rsplit(".", 1)[1].lower() if "." in name else "mp4"
+    try:
+        upload_stream.check_declared(ext, size)
+    except upload_stream.UploadRejected as e:
+        return jsonify({"error": str(e)}), e.status
+    session_obj = UploadSession(
+        id=uuid.uuid4().hex,
+        filename=secure_filename(name) or None,
+        ext=ext,
+        type=media_type_for(ext),
+        size=size,
+        offset=0,
+        user_id=current_user.id
+    )
+    resumable.create_partial(session_obj.id)
+    db.session.add(session_obj)
+    db.session.commit()
+
+    headers = _offset_headers(session_obj)
+    headers["Location"] = url_for("auth.upload_status", upload_id=session_obj.id)
+    return jsonify(session_obj.to_dict()), 201, headers
+
+def _own_upload_session(upload_id):
+    """Phiên upload của chính người dùng hiện tại; phiên của người khác -> 404 như không tồn tại"""
+    session_obj = UploadSession.query.get_or_404(upload_id)
+    if session_obj.user_id != current_user.id:
+        abort(404)
+    return session_obj
+
+@auth.route("/api/uploads/<upload_id>", methods=["HEAD", "GET"])
+@login_required
+def upload_status(upload_id):
+    session_obj = _own_upload_session(upload_id)
+    return jsonify(session_obj.to_dict()), 200, _offset_headers(session_obj)
+
+@auth.route("/api/uploads/<upload_id>", methods=["PATCH"])
+@login_required
+def upload_chunk(upload_id):
+    session_obj = _own_upload_session(upload_id)
+    try:
+        client_offset = _client_offset()
+    except ValueError:
+        return jsonify({"error": "Thiếu hoặc sai Upload-Offset"}), 400
+
+    # Kiểm tra offset -> ghi -> commit offset trong cùng một lock: PATCH song song
+    # của cùng phiên không thể cùng qua bước kiểm tra offset
+    try:
+        with resumable.locked(session_obj.id):
+            db.session.refresh(session_obj)
+            try:
+                resumable.append_chunk(session_obj, client_offset, request.stream)
+            except resumable.UploadConflict:
+                return jsonify({"error": "Offset không khớp", **session_obj.to_dict()}), 409, _offset_headers(session_obj)
+            except resumable.UploadTooLarge:
+                db.session.commit()
+                return jsonify({"error": "Vượt quá kích thước đã khai báo"}), 413, _offset_headers(session_obj)
+            except Exception:
+                # Kết nối bị ngắt giữa chừng: vẫn lưu phần đã ghi để client resume
+                db.session.commit()
+                raise
+
+            db.session.commit()
+    except resumable.UploadGone:
+        return jsonify({"error": "Phiên upload đã kết thúc"}), 404
+    return "", 204, _offset_headers(session_obj)
+
+@auth.route("/api/uploads/<upload_id>/finalize", methods=["POST"])
+@login_required
+def finalize_upload(upload_id):
+    session_obj = _own_upload_session(upload_id)
+    try:
+        with resumable.locked(session_obj.id):
+            db.session.refresh(session_obj)
+            return _finalize_locked(session_obj)
+    except resumable.UploadGone:
+        return jsonify({"error": "Phiên upload đã kết thúc"}), 404
+
+
+def _finalize_locked(session_obj):
+    if session_obj.offset != session_obj.size:
+        return jsonify({"error": "Upload chưa hoàn tất", **session_obj.to_dict()}), 409
+
+    # Magic bytes phải khớp phần mở rộng đã khai báo (như upload-thumbnail)
+    try:
+        upload_stream.check_file(resumable.partial_path(session_obj.id), session_obj.ext)
+    except upload_stream.UploadRejected as e:
+        resumable.discard(session_obj.id)
+        db.session.delete(session_obj)
+        db.session.commit()
+        return jsonify({"error": str(e)}), e.status
+
+    filename = f"{uuid.uuid4().hex}.{session_obj.ext}"
+    path = upload_path(filename)
+    sha256 = resumable.finalize(session_obj, path)
+
+    try:
+        media = register_media(path, session_obj.ext, session_obj.size, sha256)
+        db.session.delete(session_obj)
+        db.session.commit()
+    except Exception:
+        # Không để lại file đã ghép xong mà không có Media; phiên cũng không dùng lại được
+        db.session.rollback()
+        if os.path.exists(path):
+            os.remove(path)
+        db.session.delete(session_obj)
+        db.session.commit()
+        raise
+    derivatives.schedule(media)
+
+    return jsonify({
+        "url": f"/uploads/{media.filename}",
+        "media_id": media.id
+    })
+
+@auth.route("/api/uploads/<upload_id>", methods=["DELETE"])
+@login_required
+def abort_upload(upload_id):
+    session_obj = _own_upload_session(upload_id)
+    try:
+        with resumable.locked(session_obj.id):
+            resumable.discard(session_obj.id)
+            db.session.delete(session_obj)
+            db.session.commit()
+    except resumable.UploadGone:
+        return jsonify({"error": "Phiên upload đã kết thúc"}), 404
+    return jsonify({"message": "Đã hủy upload"})
+
 # 4. API Xóa Media
 @auth.route("/api/media/<int:id>", methods=["DELETE"])
 @login_required
@@ -419,11 +757,15 @@ def delete_media(id):
     media = Media.query.get_or_404(id)
     
     
-    if not media.filename.startswith("http"):
+    # File dùng chung (MEDIA_DEDUP) chỉ bị xóa khi hết tham chiếu.
+    # Backend tự bỏ qua URL ngoài / ảnh mẫu trong static/
+    if dedup.release(media.filename):
         try:
-            os.remove(os.path.join(UPLOAD_FOLDER, media.filename))
-        except:
-            pass # File không tồn tại thì bỏ qua
+            storage.delete(media.filename)
+        except (OSError, storage.StorageError) as e:
+            # Không xóa được thì để gc_uploads.py dọn sau, nhưng phải ghi log
+            current_app.logger.warning("Không xóa được %s: %s", media.filename, e)
+        derivatives.remove_variant_files(media)
             
     db.session.delete(media)
     db.session.commit()
@@ -432,7 +774,7 @@ def delete_media(id):
 # 5. Route phục vụ file ảnh 
 @auth.route("/uploads/<filename>")
 def uploaded_file(filename):
-    return send_from_directory(UPLOAD_FOLDER, filename)
+    return serve_upload(filename)
 
 # --- Thêm vào routes.py ---
 from app.models.campaign import Campaign
@@ -442,24 +784,25 @@ from app.models.campaign import Campaign
 @login_required
 def list_campaigns():
     status = request.args.get("status")
-    query = Campaign.query
+    query = campaign_list_query()
     
     if status and status != 'all':
-        query = query.filter_by(status=status)
+        query = query.filter(Campaign.status == status)
         
     # Sắp xếp active lên đầu, sau đó mới nhất
     campaigns = query.order_by(Campaign.status.asc(), Campaign.created_at.desc()).all()
-    return jsonify([c.to_dict() for c in campaigns])
+    return jsonify([serialize_campaign_row(c) for c in campaigns])
 
 # 2. Thống kê số lượng
 @auth.route("/api/campaigns/stats", methods=["GET"])
 @login_required
 def get_campaign_stats():
+    counts = status_counters.counts("campaigns")
     return jsonify({
-        "total": Campaign.query.count(),
-        "active": Campaign.query.filter_by(status='active').count(),
-        "paused": Campaign.query.filter_by(status='paused').count(),
-        "scheduled": Campaign.query.filter_by(status='scheduled').count()
+        "total": counts["total"],
+        "active": counts["active"],
+        "paused": counts["paused"],
+        "scheduled": counts["scheduled"]
     })
 
 # 3. Lấy chi tiết 1 chiến dịch (để hiện lên form sửa)
@@ -478,6 +821,7 @@ def update_campaign(id):
     
     # Cập nhật trạng thái (nếu có gửi lên)
     if 'status' in data:
+        status_counters.moved("campaigns", c.status, data['status'])
         c.status = data['status']
         
     # Cập nhật thông tin (nếu có gửi lên)
@@ -496,6 +840,7 @@ def update_campaign(id):
 @login_required
 def delete_campaign(id):
     c = Campaign.query.get_or_404(id)
+    status_counters.deleted("campaigns", c.status)
     db.session.delete(c)
     db.session.commit()
     return jsonify({"message": "Đã xóa chiến dịch"})
@@ -608,24 +953,34 @@ def update_user(id):
 @login_required
 def list_comments():
     status = request.args.get("status")
-    query = Comment.query
-    
+    query = comment_list_query()
     
+    # ?post_id= : bình luận của một bài (index post_id, status, created_at)
+    if request.args.get("post_id"):
+        try:
+            query = query.filter(Comment.post_id == int(request.args["post_id"]))
+        except ValueError:
+            return jsonify({"error": "post_id không hợp lệ"}), 400
     if status and status != 'all':
-        query = query.filter_by(status=status)
+        query = query.filter(Comment.status == status)
     
     
+    # ?sort=spam_score: hàng chờ duyệt, bình luận nghi spam nhất lên đầu
+    if request.args.get("sort") == "spam_score":
+        query = query.order_by(Comment.spam_score.is_(None), Comment.spam_score.desc())
     comments = query.order_by(Comment.created_at.desc()).all()
     
     
-    return jsonify([c.to_dict() for c in comments])
+    return jsonify([serialize_comment_row(c) for c in comments])
 
 
 @auth.route("/api/comments/<int:id>/approve", methods=["PUT"])
 @login_required
 def approve_comment(id):
     c = Comment.query.get_or_404(id)
+    status_counters.comment_moved(c, "approved")
     c.status = "approved"
+    c.auto_moderated = False  # quyết định của người duyệt -> dùng được để học
     db.session.commit()
     return jsonify({"message": "Đã duyệt"})
 
@@ -634,7 +989,9 @@ def approve_comment(id):
 @login_required
 def reject_comment(id):
     c = Comment.query.get_or_404(id)
+    status_counters.comment_moved(c, "rejected")
     c.status = "rejected"
+    c.auto_moderated = False  # quyết định của người duyệt -> dùng được để học
     db.session.commit()
     return jsonify({"message": "Đã từ chối"})
 
@@ -643,23 +1000,97 @@ def reject_comment(id):
 @login_required
 def delete_comment_api(id):
     c = Comment.query.get_or_404(id)
+    status_counters.comment_deleted(c)
     db.session.delete(c) 
     db.session.commit()
     return jsonify({"message": "Đã xóa vĩnh viễn"})
 
+# Duyệt hàng loạt trong một transaction:
+#   {"action": "approve" | "reject" | "delete", "ids": [1, 2, ...]}
+#   {"action": ..., "filter": {"source", "post_id", "post_title", "from", "to", "status"}}
+# (ids và filter dùng chung được) -> số dòng theo trạng thái trước khi đổi
+def comment_criteria(args):
+    """Bộ lọc cho duyệt hàng loạt -> list điều kiện SQL; sai định dạng -> ValueError"""
+    criteria = []
+    if args.get("source"):
+        criteria.append(Comment.source == args["source"])
+    if args.get("status"):
+        criteria.append(Comment.status == args["status"])
+    if args.get("post_title"):
+        criteria.append(Comment.post_title == args["post_title"])
+    if args.get("post_id") is not None:
+        criteria.append(Comment.post_id == int(args["post_id"]))
+
+    for name in ("from", "to"):
+        if args.get(name) and parse_date(args[name]) is None:
+            raise ValueError(f"{name} không hợp lệ")
+    if args.get("from"):
+        criteria.append(Comment.created_at >= parse_date(args["from"]))
+    if args.get("to"):
+        criteria.append(Comment.created_at < parse_date(args["to"]) + timedelta(days=1))
+    return criteria
+
+@auth.route("/api/comments/bulk", methods=["POST"])
+@login_required
+def bulk_moderate_comments():
+    data = request.get_json(silent=True) or {}
+    if data.get("action") not in comment_moderation.ACTIONS:
+        return jsonify({"error": "action phải là approve, reject hoặc delete"}), 400
+    try:
+        criteria = comment_criteria(data.get("filter") or {})
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Tham số không hợp lệ: {e}"}), 400
+    ids = data.get("ids")
+    # Chuỗi "12" không được hiểu thành id 1 và 2; bool cũng là int trong Python
+    if ids is not None and not (isinstance(ids, list)
+                                and all(isinstance(i, int) and not isinstance(i, bool) for i in ids)):
+        return jsonify({"error": "ids phải là mảng số nguyên"}), 400
+
+    # Không cho phép vô tình áp dụng lên toàn bộ bình luận
+    if not criteria and ids is None:
+        return jsonify({"error": "Cần ids hoặc filter"}), 400
+
+    return jsonify(comment_moderation.moderate(data["action"], criteria, ids))
+
+# Nhập bình luận từ file export của nền tảng, body là chính file (đọc theo stream):
+#   POST /api/comments/import?source=Facebook&format=ndjson|csv
+#   (format suy ra từ Content-Type nếu bỏ trống; source bỏ trống = trường source của từng dòng)
+@auth.route("/api/comments/import", methods=["POST"])
+@login_required
+def import_comments():
+    fmt = request.args.get("format") or comment_ingest.detect_format(content_type=request.content_type)
+    if fmt not in comment_ingest.FORMATS:
+        return jsonify({"error": "format phải là ndjson hoặc csv"}), 400
+    summary = comment_ingest.import_stream(
+        request.stream, fmt, source=request.args.get("source"),
+        triage=request.args.get("triage") != "0",
+    )
+    return jsonify(summary)
+
+# Chấm điểm spam các bình luận pending chưa chấm (theo lô nhỏ):
+# tự duyệt / tự từ chối theo ngưỡng, còn lại chờ người duyệt
+@auth.route("/api/comments/triage", methods=["POST"])
+@login_required
+def triage_comments():
+    data = request.get_json(silent=True) or {}
+    try:
+        limit = int(data["limit"]) if data.get("limit") is not None else None
+    except (TypeError, ValueError):
+        return jsonify({"error": "limit không hợp lệ"}), 400
+    summary = spam_filter.triage_pending(limit=limit, rescore=bool(data.get("rescore")))
+    if summary is None:
+        return jsonify({"error": "Bộ lọc spam chưa bật hoặc chưa có model (python train_spam_filter.py)"}), 409
+    return jsonify(summary)
+
 @auth.route("/api/comments/stats", methods=["GET"])
 @login_required
 def get_comment_stats():
-    
-    total = Comment.query.count()
-    pending = Comment.query.filter_by(status='pending').count()
-    approved = Comment.query.filter_by(status='approved').count()
-    rejected = Comment.query.filter_by(status='rejected').count()
-    
+    # Đọc bảng đếm (cập nhật cùng transaction với thao tác ghi), không COUNT(*) cả bảng
+    counts = status_counters.counts("comments")
     return jsonify({
-        "total": total,
-        "pending": pending,
-        "approved": approved,
-        "rejected": rejected
+        "total": counts["total"],
+        "pending": counts["pending"],
+        "approved": counts["approved"],
+        "rejected": counts["rejected"]
     })
 
@@ -0,0 +1,54 @@
+"""
+Bố cục thư mục upload chia shard theo hash: uploads/ab/cd/abcd....jpg
+
+URL public vẫn là /uploads/<tên file> và Media.filename vẫn lưu tên phẳng;
+chỉ vị trí vật lý trên đĩa thay đổi. Khi đọc, thử vị trí shard trước rồi tới
+vị trí phẳng cũ, nên cả hai bố cục cùng dùng được trong lúc
+migrate_upload_layout.py đang chuyển file.
+"""
+import hashlib
+import os
+import re
+
+from flask import current_app
+from werkzeug.security import safe_join
+
+_HEX_PREFIX = re.compile(r"^[0-9a-f]{4}")
+
+
+def shard_rel(name):
+    """'abcd1234.jpg' -> 'ab/cd/abcd1234.jpg' (tên không phải hex thì băm sha1)"""
+    key = name.lower() if _HEX_PREFIX.match(name.lower()) else hashlib.sha1(name.encode()).hexdigest()
+    return f"{key[:2]}/{key[2:4]}/{name}"
+
+
+def is_shardable(name):
+    """Chỉ file nằm ngay trong UPLOAD_FOLDER (không phải variants/...) mới được shard"""
+    return "/" not in name and "\\" not in name and not name.startswith(".")
+
+
+def upload_path(name, folder=None):
+    """Đường dẫn để GHI file mới (tạo thư mục shard nếu cần)"""
+    folder = folder or current_app.config["UPLOAD_FOLDER"]
+    if current_app.config.get("UPLOAD_SHARDING") and is_shardable(name):
+        path = os.path.join(folder, *shard_rel(name).split("/"))
+    else:
+        path = os.path.join(folder, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def find_upload(name, folder=None):
+    """Đường dẫn file đang có trên đĩa (shard hoặc phẳng), None nếu không thấy"""
+    folder = folder or current_app.config["UPLOAD_FOLDER"]
+    flat = safe_join(folder, name)
+    if flat is None:
+        return None
+    if not is_shardable(name):
+        return flat if os.path.isfile(flat) else None
+
+    sharded = safe_join(folder, shard_rel(name))
+    for path in (sharded, flat, sharded):  # kiểm lại shard: file có thể vừa bị migrate
+        if os.path.isfile(path):
+            return path
+    return None
@@ -0,0 +1,327 @@
+"""
+Lọc bình luận spam ngay trong process: Naive Bayes đa thức trên n-gram ký tự băm.
+
+- Đặc trưng: n-gram ký tự 2..5 của nội dung đã chuẩn hóa (NFKC, chữ thường,
+  chữ số -> 0, gộp khoảng trắng) và nguồn bình luận, băm vào 2^HASH_BITS ô.
+  Cả lô được nối thành một mảng mã ký tự rồi băm bằng NumPy, không lặp từng n-gram;
+  điểm của lô = np.bincount(văn bản, trọng số[ô]) -> không dựng ma trận đặc trưng.
+- Học từ quyết định duyệt / từ chối của người kiểm duyệt (bỏ qua dòng do chính bộ
+  lọc tự xử lý) bằng train_spam_filter.py; model lưu ra file .npz, process đang chạy
+  tự nạp lại khi file đổi.
+- triage_pending() chấm bình luận pending theo lô nhỏ (SPAM_BATCH_SIZE):
+  P(spam) >= SPAM_REJECT_THRESHOLD -> tự từ chối, <= SPAM_APPROVE_THRESHOLD -> tự
+  duyệt, còn lại giữ pending cho người duyệt (spam_score để sắp xếp hàng chờ).
+"""
+import os
+import re
+import threading
+import unicodedata
+import zlib
+from datetime import datetime
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import bindparam
+
+from app import db, status_counters
+from app.models.comment import Comment
+
+HASH_BITS = 18
+NGRAM_SIZES = (2, 3, 4, 5)
+ALPHA = 0.1             # làm trơn Laplace (Lidstone)
+TRAIN_CHUNK = 5000      # số bình luận mỗi lô khi học / đánh giá
+HOLDOUT_MOD = 10        # đánh giá: giữ lại bình luận có id % 10 == 0
+
+_PRIME = np.uint64(0x100000001B3)
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+_DIGITS = re.compile(r"\d")
+
+_cache = {"path": None, "mtime": None, "model": None}
+_cache_lock = threading.Lock()
+
+
+class SpamFilterError(Exception):
+    """Không học được model (thiếu dữ liệu) / file model hỏng"""
+
+
+def normalize(text):
+    text = unicodedata.normalize("NFKC", text or "").casefold()
+    return " ".join(_DIGITS.sub("0", text).split())
+
+
+def featurize(texts, sources=None, bits=HASH_BITS):
+    """
+    -> (doc, bucket): hai mảng cùng độ dài, mỗi phần tử là một lần xuất hiện
+    của đặc trưng bucket trong văn bản thứ doc.
+    """
+    # Mỗi văn bản có khoảng trắng hai đầu (n-gram đầu / cuối từ), ngăn cách bằng \0
+    joined = "\0".join(f" {normalize(t)} " for t in texts)
+    codes = np.frombuffer(joined.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    # seps[i] = số ký tự \0 trước vị trí i = chỉ số văn bản chứa vị trí i
+    seps = np.concatenate(([0], np.cumsum(codes == 0)))
+    shift = np.uint64(64 - bits)
+
+    docs, buckets = [], []
+    for n in NGRAM_SIZES:
+        count = len(codes) - n + 1
+        if count <= 0:
+            continue
+        h = np.full(count, n, dtype=np.uint64)
+        for k in range(n):
+            h = h * _PRIME + codes[k:k + count]  # tràn uint64 = mod 2^64
+        valid = seps[n:n + count] == seps[:count]  # n-gram không vắt qua hai văn bản
+        docs.append(seps[:count][valid])
+        buckets.append((h[valid] * _MIX) >> shift)
+
+    if sources is not None:
+        mask = (1 << bits) - 1
+        docs.append(np.arange(len(texts)))
+        buckets.append(np.array([zlib.crc32(f"source:{normalize(s)}".encode()) & mask for s in sources],
+                                dtype=np.uint64))
+    return np.concatenate(docs).astype(np.intp), np.concatenate(buckets).astype(np.intp)
+
+
+class SpamModel:
+    """Trọng số log P(ô | spam) - log P(ô | hợp lệ) + log tỉ lệ tiên nghiệm"""
+
+    def __init__(self, weights, prior, counts=(0, 0), trained_at=None):
+        self.weights = weights
+        self.prior = float(prior)
+        self.counts = tuple(int(n) for n in counts)  # (hợp lệ, spam) dùng để học
+        self.trained_at = trained_at
+        self.bits = int(weights.size).bit_length() - 1
+
+    def log_odds(self, texts, sources=None):
+        doc, bucket = featurize(texts, sources, self.bits)
+        evidence = np.bincount(doc, weights=self.weights[bucket], minlength=len(texts))
+        # Các n-gram bậc 2..5 chồng lên nhau: mỗi ký tự bị đếm ~len(NGRAM_SIZES) lần,
+        # chia lại để xác suất bớt cực đoan và ngưỡng định tuyến có ý nghĩa
+        return self.prior + evidence / len(NGRAM_SIZES)
+
+    def predict(self, texts, sources=None):
+        """-> mảng P(spam) cho từng văn bản"""
+        return 1.0 / (1.0 + np.exp(-np.clip(self.log_odds(texts, sources), -50, 50)))
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.tmp.npz"
+        np.savez(tmp, weights=self.weights, prior=self.prior, counts=np.array(self.counts),
+                 trained_at=np.array(self.trained_at or ""))
+        os.replace(tmp, path)  # process đang chạy không đọc phải file dở
+
+    @classmethod
+    def load(cls, path):
+        try:
+            with np.load(path) as data:
+                return cls(data["weights"], data["prior"], data["counts"], str(data["trained_at"]) or None)
+        except (OSError, KeyError, ValueError) as e:
+            raise SpamFilterError(f"Không đọc được model {path}: {e}")
+
+
+def train(rows, bits=HASH_BITS, alpha=ALPHA, chunk=TRAIN_CHUNK):
+    """rows: iterable (nội dung, nguồn, là spam) -> SpamModel; đọc theo lô, bộ nhớ cố định"""
+    size = 1 << bits
+    counts = np.zeros((2, size))
+    docs = np.zeros(2, dtype=np.int64)
+    for batch in _chunks(rows, chunk):
+        texts, sources, labels = zip(*batch)
+        labels = np.asarray(labels, dtype=bool)
+        doc, bucket = featurize(texts, sources, bits)
+        spam = labels[doc]
+        counts[0] += np.bincount(bucket[~spam], minlength=size)
+        counts[1] += np.bincount(bucket[spam], minlength=size)
+        docs += (len(labels) - labels.sum(), labels.sum())
+
+    if docs.min() == 0:
+        raise SpamFilterError("Cần cả bình luận đã duyệt và đã từ chối để học")
+    log_p = np.log(counts + alpha) - np.log(counts.sum(axis=1, keepdims=True) + alpha * size)
+    return SpamModel((log_p[1] - log_p[0]).astype(np.float32), np.log(docs[1] / docs[0]), docs,
+                     datetime.utcnow().isoformat(timespec="seconds"))
+
+
+def _chunks(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ========================
+# Dữ liệu học / model của app
+# ========================
+def model_path():
+    return current_app.config.get("SPAM_MODEL_PATH") or os.path.join(current_app.instance_path, "spam_model.npz")
+
+
+def thresholds():
+    return current_app.config["SPAM_APPROVE_THRESHOLD"], current_app.config["SPAM_REJECT_THRESHOLD"]
+
+
+def current_model():
+    """Model đang dùng (nạp lại khi file đổi) hoặc None nếu tắt / chưa học"""
+    if not current_app.config.get("SPAM_FILTER"):
+        return None
+    path = model_path()
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    with _cache_lock:
+        if (_cache["path"], _cache["mtime"]) != (path, mtime):
+            _cache.update(path=path, mtime=mtime, model=SpamModel.load(path))
+        return _cache["model"]
+
+
+def labelled_rows(holdout=None):
+    """
+    (nội dung, nguồn, là spam) từ quyết định của người duyệt, đọc theo lô.
+    holdout=True: chỉ phần giữ lại để đánh giá; False: phần còn lại; None: tất cả.
+    """
+    query = (db.session.query(Comment.content, Comment.source, Comment.status)
+             .filter(Comment.status.in_(("approved", "rejected")), Comment.auto_moderated.isnot(True)))
+    if holdout is not None:
+        held = Comment.id % HOLDOUT_MOD == 0
+        query = query.filter(held if holdout else ~held)
+    for content, source, status in query.order_by(Comment.id).yield_per(TRAIN_CHUNK):
+        yield content, source, status == "rejected"
+
+
+def evaluate(model, rows, approve_below, reject_above):
+    """Định tuyến các dòng đã có nhãn như triage -> số lượng từng nhánh và số lần sai"""
+    report = {"comments": 0, "auto_approved": 0, "spam_approved": 0,
+              "auto_rejected": 0, "ham_rejected": 0, "review": 0}
+    for batch in _chunks(rows, TRAIN_CHUNK):
+        texts, sources, labels = zip(*batch)
+        labels = np.asarray(labels, dtype=bool)
+        scores = model.predict(texts, sources)
+        approve, reject = scores <= approve_below, scores >= reject_above
+        report["comments"] += len(labels)
+        report["auto_approved"] += int(approve.sum())
+        report["spam_approved"] += int((approve & labels).sum())
+        report["auto_rejected"] += int(reject.sum())
+        report["ham_rejected"] += int((reject & ~labels).sum())
+        report["review"] += int((~approve & ~reject).sum())
+    return report
+
+
+def retrain(evaluate_holdout=False):
+    """
+    Học lại từ toàn bộ quyết định của người duyệt và ghi file model.
+    evaluate_holdout: học thử trên 90% trước, đánh giá trên 10% giữ lại.
+    -> {"ham", "spam", "path", "evaluation"?}
+    """
+    minimum = current_app.config["SPAM_MIN_EXAMPLES"]
+    result = {}
+    if evaluate_holdout:
+        trial = train(labelled_rows(holdout=False))
+        result["evaluation"] = evaluate(trial, labelled_rows(holdout=True), *thresholds())
+
+    model = train(labelled_rows())
+    if min(model.counts) < minimum:
+        raise SpamFilterError(f"Cần ít nhất {minimum} bình luận mỗi loại "
+                              f"(có {model.counts[0]} đã duyệt, {model.counts[1]} đã từ chối)")
+    path = model_path()
+    model.save(path)
+    result.update(ham=model.counts[0], spam=model.counts[1], path=path)
+    return result
+
+
+# ========================
+# Định tuyến bình luận mới
+# ========================
+def _route(ids, status):
+    """
+    Chuyển các bình luận còn pending trong ids sang status -> [(id, post_id)] của
+    những dòng thực sự đổi (dòng người duyệt vừa xử lý / đã xóa bị bỏ qua)
+    """
+    comments = Comment.__table__
+    matched = (comments.c.id.in_(ids), comments.c.status == "pending")
+    stmt = comments.update().where(*matched).values(status=status, auto_moderated=True)
+    if db.engine.dialect.update_returning:
+        return db.session.execute(stmt.returning(comments.c.id, comments.c.post_id)).all()
+    # MySQL: không có UPDATE ... RETURNING -> khóa dòng trước rồi cập nhật đúng các dòng đó
+    rows = db.session.execute(
+        db.select(comments.c.id, comments.c.post_id).where(*matched).with_for_update()).all()
+    if rows:
+        db.session.execute(stmt.where(comments.c.id.in_([r.id for r in rows])))
+    return rows
+
+
+def triage(rows, model):
+    """
+    Chấm điểm + định tuyến một lô bình luận pending (cần id, content, source)
+    trong transaction hiện tại, chưa commit -> {"approved", "rejected", "review"}.
+    Bộ đếm chỉ tính các dòng UPDATE thực sự đổi trạng thái.
+    """
+    if not rows:
+        return {"approved": 0, "rejected": 0, "review": 0}
+    approve_below, reject_above = thresholds()
+    scores = model.predict([r.content for r in rows], [r.source for r in rows])
+
+    params, buckets = [], {"approved": [], "rejected": []}
+    for row, score in zip(rows, scores.tolist()):
+        status = "rejected" if score >= reject_above else "approved" if score <= approve_below else "pending"
+        params.append({"cid": row.id, "new_status": status, "score": score})
+        if status != "pending":
+            buckets[status].append(row.id)
+
+    review = len(params) - len(buckets["approved"]) - len(buckets["rejected"])
+    summary, deltas, per_post = {"approved": 0, "rejected": 0, "review": review}, {}, {}
+    for status, ids in buckets.items():
+        moved = _route(ids, status) if ids else []
+        summary[status] = len(moved)
+        if moved:
+            deltas[status] = len(moved)
+            deltas["pending"] = deltas.get("pending", 0) - len(moved)
+        for _, post_id in moved:
+            if post_id is not None:
+                total, pending = per_post.get(post_id, (0, 0))
+                per_post[post_id] = (total, pending - 1)
+
+    # Điểm chỉ ghi cho dòng đang ở đúng trạng thái vừa định tuyến (review: vẫn pending)
+    comments = Comment.__table__
+    db.session.execute(
+        comments.update()
+        .where(comments.c.id == bindparam("cid"), comments.c.status == bindparam("new_status"))
+        .values(spam_score=bindparam("score")),
+        params,
+    )
+
+    status_counters.adjust("comments", deltas)
+    status_counters.adjust_posts(per_post)
+    return summary
+
+
+def triage_pending(limit=None, rescore=False):
+    """
+    Chấm các bình luận pending chưa có điểm (rescore: cả bình luận đang chờ người
+    duyệt) theo lô SPAM_BATCH_SIZE, commit từng lô -> tổng kết, None nếu chưa có model
+    """
+    model = current_model()
+    if model is None:
+        return None
+    batch_size = current_app.config["SPAM_BATCH_SIZE"]
+    summary = {"approved": 0, "rejected": 0, "review": 0}
+    last_id, done = 0, 0
+    while limit is None or done < limit:
+        query = (db.session.query(Comment.id, Comment.content, Comment.source, Comment.post_id)
+                 .filter(Comment.status == "pending", Comment.id > last_id))
+        if not rescore:
+            query = query.filter(Comment.spam_score.is_(None))
+        size = batch_size if limit is None else min(batch_size, limit - done)
+        rows = query.order_by(Comment.id).limit(size).all()
+        if not rows:
+            break
+        try:
+            for key, n in triage(rows, model).items():
+                summary[key] += n
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        last_id, done = rows[-1].id, done + len(rows)
+    return summary
@@ -0,0 +1,164 @@
+"""
+Bộ đếm theo trạng thái cho bình luận và chiến dịch (bảng status_counters).
+
+- Mọi thao tác ghi (tạo, duyệt, từ chối, xóa, đổi trạng thái chiến dịch, duyệt
+  hàng loạt) gọi moved() / adjust() trước khi commit -> bộ đếm đổi cùng transaction.
+- /api/comments/stats và /api/campaigns/stats chỉ đọc vài dòng theo khóa chính.
+- reconcile() đếm lại bằng GROUP BY và sửa sai lệch (reconcile_counters.py,
+  hoặc sau khi nhập dữ liệu bằng script ghi thẳng vào bảng).
+- Bình luận còn được đếm theo bài viết (Post.comment_count / pending_comment_count):
+  comment_moved() / comment_created() / comment_deleted() đổi cả hai loại bộ đếm.
+"""
+from sqlalchemy import bindparam, func
+
+from app import db
+from app.models.campaign import Campaign
+from app.models.comment import Comment
+from app.models.post import Post
+from app.models.status_counter import StatusCounter
+
+# scope -> (model, các trạng thái luôn có dòng đếm)
+SCOPES = {
+    "comments": (Comment, ("pending", "approved", "rejected")),
+    "campaigns": (Campaign, ("active", "paused", "scheduled", "completed")),
+}
+
+
+def _key(status):
+    return status or "none"
+
+
+def adjust(scope, deltas):
+    """Cộng {trạng thái: số thay đổi} vào bộ đếm trong transaction hiện tại (chưa commit)"""
+    for status, delta in deltas.items():
+        if not delta:
+            continue
+        updated = StatusCounter.query.filter_by(scope=scope, status=_key(status)).update(
+            {StatusCounter.count: StatusCounter.count + delta}, synchronize_session=False)
+        if not updated:
+            # Trạng thái mới chưa có dòng đếm (các trạng thái quen thuộc đã được tạo sẵn)
+            db.session.add(StatusCounter(scope=scope, status=_key(status), count=delta))
+            db.session.flush()
+
+
+def moved(scope, old_status, new_status):
+    """Một dòng đổi trạng thái"""
+    if old_status != new_status:
+        adjust(scope, {old_status: -1, new_status: 1})
+
+
+def created(scope, status):
+    adjust(scope, {status: 1})
+
+
+def deleted(scope, status):
+    adjust(scope, {status: -1})
+
+
+def adjust_posts(deltas):
+    """Cộng {post_id: (số bình luận, số đang chờ duyệt)} vào Post trong transaction hiện tại"""
+    params = [{"pid": post_id, "total": total, "pending": pending}
+              for post_id, (total, pending) in deltas.items()
+              if post_id is not None and (total or pending)]
+    if not params:
+        return
+    posts = Post.__table__
+    # Cột thêm bằng upgrade_schema() có thể còn NULL trên DB cũ -> coalesce
+    db.session.execute(
+        posts.update().where(posts.c.id == bindparam("pid")).values(
+            comment_count=func.coalesce(posts.c.comment_count, 0) + bindparam("total"),
+            pending_comment_count=func.coalesce(posts.c.pending_comment_count, 0) + bindparam("pending"),
+        ),
+        params,
+    )
+
+
+def _pending(status):
+    return 1 if status == "pending" else 0
+
+
+def comment_moved(comment, new_status):
+    """Bình luận đổi trạng thái (gọi trước khi gán comment.status)"""
+    moved("comments", comment.status, new_status)
+    if comment.post_id is not None:
+        adjust_posts({comment.post_id: (0, _pending(new_status) - _pending(comment.status))})
+
+
+def comment_created(comment):
+    created("comments", comment.status)
+    adjust_posts({comment.post_id: (1, _pending(comment.status))})
+
+
+def comment_deleted(comment):
+    deleted("comments", comment.status)
+    adjust_posts({comment.post_id: (-1, -_pending(comment.status))})
+
+
+def counts(scope):
+    """{trạng thái: số dòng} + "total" (đọc bảng đếm, không quét bảng gốc)"""
+    result = dict(db.session.query(StatusCounter.status, StatusCounter.count).filter_by(scope=scope))
+    for status in SCOPES[scope][1]:
+        result.setdefault(status, 0)
+    result["total"] = sum(result.values())
+    return result
+
+
+def reconcile(scopes=None):
+    """Đếm lại bằng GROUP BY, ghi đè bộ đếm -> {scope: {trạng thái: (cũ, mới)}} cho dòng bị lệch"""
+    drift = {}
+    for scope in scopes or SCOPES:
+        model, known = SCOPES[scope]
+        actual = {_key(status): n for status, n in
+                  db.session.query(model.status, func.count(model.id)).group_by(model.status)}
+        rows = {row.status: row for row in StatusCounter.query.filter_by(scope=scope)}
+        for status in set(known) | set(actual) | set(rows):
+            new = actual.get(status, 0)
+            row = rows.get(status)
+            if row is None:
+                row = StatusCounter(scope=scope, status=status, count=0)
+                db.session.add(row)
+            if row.count != new:
+                drift.setdefault(scope, {})[status] = (row.count, new)
+                row.count = new
+        if scope == "comments":
+            posts = _recount_posts()
+            if posts:
+                drift["posts"] = posts
+    db.session.commit()
+    return drift
+
+
+def _recount_posts():
+    """Đếm lại bình luận theo bài viết -> {post_id: ((cũ), (mới))} cho bài bị lệch (chưa commit)"""
+    actual = {}
+    rows = (db.session.query(Comment.post_id, Comment.status, func.count(Comment.id))
+            .filter(Comment.post_id.isnot(None)).group_by(Comment.post_id, Comment.status))
+    for post_id, status, n in rows:
+        total, pending = actual.get(post_id, (0, 0))
+        actual[post_id] = (total + n, pending + n * _pending(status))
+
+    drift = {}
+    for post_id, total, pending in db.session.query(
+            Post.id, Post.comment_count, Post.pending_comment_count):
+        new = actual.get(post_id, (0, 0))
+        if (total, pending) != new:
+            drift[post_id] = ((total, pending), new)
+    if drift:
+        posts = Post.__table__
+        db.session.execute(
+            posts.update().where(posts.c.id == bindparam("pid")).values(
+                comment_count=bindparam("total"), pending_comment_count=bindparam("pending")),
+            [{"pid": post_id, "total": new[0], "pending": new[1]} for post_id, (_, new) in drift.items()],
+        )
+    return drift
+
+
+def initialize():
+    """Lần đầu chạy trên DB đã có dữ liệu: dựng bộ đếm từ bảng gốc"""
+    existing = {scope for (scope,) in db.session.query(StatusCounter.scope).distinct()}
+    missing = [scope for scope in SCOPES if scope not in existing]
+    # Cột đếm theo bài viết vừa được upgrade_schema() thêm vào (còn NULL)
+    if "comments" not in missing and db.session.query(Post.id).filter(Post.comment_count.is_(None)).first():
+        missing.append("comments")
+    if missing:
+        reconcile(missing)
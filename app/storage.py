@@ -0,0 +1,415 @@
+"""
+Lớp lưu trữ media dùng chung cho upload, phục vụ file, xóa và pipeline ảnh.
+
+Media.filename có ba dạng, mỗi dạng ứng với một backend (xem resolve()):
+- "http(s)://..."      -> ExternalStorage (URL ngoài, chỉ đọc)
+- "static/images/..."  -> StaticStorage (ảnh mẫu trong thư mục static, chỉ đọc)
+- "<uuid>.jpg", "variants/..." -> backend upload cấu hình bằng MEDIA_STORAGE:
+    "local" : LocalStorage, file nằm trong UPLOAD_FOLDER (bố cục shard)
+    "s3"    : S3Storage, object trong bucket S3 / MinIO; UPLOAD_FOLDER chỉ còn là
+              cache cục bộ nên nhiều node dùng chung media mà không cần NFS.
+
+Mọi backend có cùng các hàm: put / put_file / open / stat / delete / url /
+presigned_url / local_path. S3Storage chỉ dùng thư viện chuẩn (http.client,
+chữ ký AWS SigV4) nên không cần boto3.
+"""
+import hashlib
+import hmac
+import http.client
+import mimetypes
+import os
+import shutil
+from datetime import datetime, timezone
+from urllib.parse import quote, urlsplit
+
+from flask import current_app
+from werkzeug.security import safe_join
+
+from app.sharding import upload_path, find_upload
+
+CHUNK_SIZE = 64 * 1024
+UNSIGNED_PAYLOAD = "UNSIGNED-PAYLOAD"
+
+
+class StorageError(Exception):
+    """Backend lưu trữ trả lỗi (ví dụ S3 trả HTTP 5xx)"""
+
+
+# =================================================
+# CHỮ KÝ AWS SIGV4 (dùng cho S3 và các dịch vụ tương thích)
+# =================================================
+def _hmac(key, msg):
+    return hmac.new(key, msg.encode(), hashlib.sha256).digest()
+
+
+def signing_key(secret_key, date, region, service="s3"):
+    key = _hmac(f"AWS4{secret_key}".encode(), date)
+    key = _hmac(key, region)
+    key = _hmac(key, service)
+    return _hmac(key, "aws4_request")
+
+
+def _uri_encode(value, safe="-_.~"):
+    return quote(str(value), safe=safe)
+
+
+def canonical_query(params):
+    return "&".join(
+        f"{_uri_encode(k)}={_uri_encode(v)}" for k, v in sorted(params.items())
+    )
+
+
+def sign(secret_key, region, amz_date, method, path, params, headers, payload_hash):
+    """
+    Ký một request. path phải đã được URI-encode; headers là các header được ký.
+    Trả về (signature, signed_headers, scope).
+    """
+    lowered = {k.lower(): " ".join(str(v).split()) for k, v in headers.items()}
+    names = sorted(lowered)
+    canonical = "\n".join([
+        method,
+        path,
+        canonical_query(params),
+        "".join(f"{n}:{lowered[n]}\n" for n in names),
+        ";".join(names),
+        payload_hash,
+    ])
+    scope = f"{amz_date[:8]}/{region}/s3/aws4_request"
+    string_to_sign = "\n".join([
+        "AWS4-HMAC-SHA256", amz_date, scope,
+        hashlib.sha256(canonical.encode()).hexdigest(),
+    ])
+    key = signing_key(secret_key, amz_date[:8], region)
+    signature = hmac.new(key, string_to_sign.encode(), hashlib.sha256).hexdigest()
+    return signature, ";".join(names), scope
+
+
+def presign(access_key, secret_key, region, host, path, expires, amz_date, method="GET"):
+    """Query string đã ký cho URL tạm thời (chỉ ký header host)"""
+    params = {
+        "X-Amz-Algorithm": "AWS4-HMAC-SHA256",
+        "X-Amz-Credential": f"{access_key}/{amz_date[:8]}/{region}/s3/aws4_request",
+        "X-Amz-Date": amz_date,
+        "X-Amz-Expires": str(int(expires)),
+        "X-Amz-SignedHeaders": "host",
+    }
+    signature, _, _ = sign(secret_key, region, amz_date, method, path, params,
+                           {"host": host}, UNSIGNED_PAYLOAD)
+    return f"{canonical_query(params)}&X-Amz-Signature={signature}"
+
+
+def _amz_now():
+    return datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%SZ")
+
+
+# =================================================
+# BACKEND
+# =================================================
+class LocalStorage:
+    """File trong UPLOAD_FOLDER (bố cục shard, đọc được cả bố cục phẳng cũ)"""
+
+    remote = False
+    external = False
+
+    def __init__(self, folder=None):
+        self._folder = folder
+
+    @property
+    def folder(self):
+        return self._folder or current_app.config["UPLOAD_FOLDER"]
+
+    def put(self, key, fileobj, size=None):
+        path = upload_path(key, self.folder)
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            shutil.copyfileobj(fileobj, f, CHUNK_SIZE)
+        os.replace(tmp, path)
+
+    def put_file(self, key, path):
+        """Đưa file đã ghi xong vào kho (thường path đã là upload_path(key))"""
+        dest = upload_path(key, self.folder)
+        if os.path.abspath(path) != os.path.abspath(dest):
+            os.replace(path, dest)
+
+    def open(self, key):
+        path = self.local_path(key)
+        if path is None:
+            raise FileNotFoundError(key)
+        return open(path, "rb")
+
+    def stat(self, key):
+        path = self.local_path(key)
+        if path is None:
+            return None
+        return {"size": os.path.getsize(path), "etag": None}
+
+    def delete(self, key):
+        path = self.local_path(key)
+        if path is None:
+            return False
+        os.remove(path)
+        return True
+
+    def url(self, key):
+        return f"/uploads/{key}"
+
+    def presigned_url(self, key, expires=None):
+        return self.url(key)  # file cục bộ do app tự phục vụ
+
+    def local_path(self, key):
+        return find_upload(key, self.folder)
+
+
+class StaticStorage(LocalStorage):
+    """Ảnh mẫu trong thư mục static của app (chỉ đọc)"""
+
+    @property
+    def folder(self):
+        return self._folder or current_app.static_folder
+
+    def put(self, key, fileobj, size=None):
+        raise StorageError("static/ là thư mục chỉ đọc")
+
+    put_file = put
+
+    def delete(self, key):
+        return False
+
+    def url(self, key):
+        return f"/static/{key}"
+
+    def local_path(self, key):
+        path = safe_join(self.folder, key)
+        return path if path and os.path.isfile(path) else None
+
+
+class ExternalStorage:
+    """Media là URL ngoài: không có bytes trong kho của mình"""
+
+    remote = True
+    external = True
+
+    def put(self, key, fileobj, size=None):
+        raise StorageError("Không ghi được vào URL ngoài")
+
+    put_file = put
+
+    def open(self, key):
+        raise FileNotFoundError(key)
+
+    def stat(self, key):
+        return None
+
+    def delete(self, key):
+        return False
+
+    def url(self, key):
+        return key
+
+    def presigned_url(self, key, expires=None):
+        return key
+
+    def local_path(self, key):
+        return None
+
+
+class S3Storage:
+    """
+    Object trong bucket S3 / MinIO / Ceph (địa chỉ kiểu path: <endpoint>/<bucket>/<key>).
+
+    cache_folder (mặc định UPLOAD_FOLDER) giữ bản sao cục bộ: file vừa upload
+    ở lại đó, file chưa có thì local_path() tải về một lần cho pipeline ảnh,
+    resize và backfill dùng.
+    """
+
+    remote = True
+    external = False
+
+    def __init__(self, endpoint, bucket, access_key, secret_key, region="us-east-1",
+                 cache_folder=None, timeout=30, presign_expires=3600):
+        parts = urlsplit(endpoint)
+        self.endpoint = f"{parts.scheme}://{parts.netloc}"
+        self.host = parts.netloc
+        self._conn_class = (http.client.HTTPSConnection if parts.scheme == "https"
+                            else http.client.HTTPConnection)
+        self.bucket = bucket
+        self.access_key = access_key
+        self.secret_key = secret_key
+        self.region = region
+        self.timeout = timeout
+        self.presign_expires = presign_expires
+        self._cache_folder = cache_folder
+
+    @property
+    def cache_folder(self):
+        return self._cache_folder or current_app.config["UPLOAD_FOLDER"]
+
+    def _path(self, key):
+        return "/" + _uri_encode(f"{self.bucket}/{key}", safe="-_.~/")
+
+    def _request(self, method, key, body=None, headers=None):
+        amz_date = _amz_now()
+        path = self._path(key)
+        signed = {"host": self.host, "x-amz-date": amz_date,
+                  "x-amz-content-sha256": UNSIGNED_PAYLOAD}
+        signature, signed_names, scope = sign(
+            self.secret_key, self.region, amz_date, method, path, {}, signed, UNSIGNED_PAYLOAD)
+
+        all_headers = dict(headers or {})
+        all_headers.update(signed)
+        all_headers["Authorization"] = (
+            f"AWS4-HMAC-SHA256 Credential={self.access_key}/{scope}, "
+            f"SignedHeaders={signed_names}, Signature={signature}"
+        )
+        conn = self._conn_class(self.host, timeout=self.timeout)
+        try:
+            conn.request(method, path, body=body, headers=all_headers)
+            response = conn.getresponse()
+        except OSError as e:
+            conn.close()
+            raise StorageError(f"S3 {method} {key}: {e}") from e
+        return response
+
+    def _check(self, response, method, key, allow=()):
+        if response.status < 300 or response.status in allow:
+            return response.status
+        detail = response.read(512)
+        response.close()
+        raise StorageError(f"S3 {method} {key}: HTTP {response.status} {detail[:200]!r}")
+
+    def put(self, key, fileobj, size=None):
+        if size is None:
+            # S3 cần Content-Length: đo bằng seek (file upload luôn seek được)
+            start = fileobj.tell()
+            fileobj.seek(0, os.SEEK_END)
+            size = fileobj.tell() - start
+            fileobj.seek(start)
+        response = self._request("PUT", key, body=fileobj, headers={
+            "Content-Length": str(size),
+            "Content-Type": mimetypes.guess_type(key)[0] or "application/octet-stream",
+        })
+        self._check(response, "PUT", key)
+        response.read()
+        response.close()
+
+    def put_file(self, key, path):
+        """Upload file; bản trên đĩa được giữ lại làm cache cục bộ"""
+        with open(path, "rb") as f:
+            self.put(key, f, os.path.getsize(path))
+
+    def open(self, key):
+        cached = find_upload(key, self.cache_folder)
+        if cached:
+            return open(cached, "rb")
+        response = self._request("GET", key)
+        if self._check(response, "GET", key, allow=(404,)) == 404:
+            response.close()
+            raise FileNotFoundError(key)
+        return response
+
+    def stat(self, key):
+        response = self._request("HEAD", key)
+        status = self._check(response, "HEAD", key, allow=(404,))
+        response.read()
+        response.close()
+        if status == 404:
+            return None
+        return {
+            "size": int(response.getheader("Content-Length", 0)),
+            "etag": (response.getheader("ETag") or "").strip('"') or None,
+        }
+
+    def delete(self, key):
+        response = self._request("DELETE", key)
+        self._check(response, "DELETE", key, allow=(404,))
+        response.read()
+        response.close()
+        cached = find_upload(key, self.cache_folder)
+        if cached:
+            os.remove(cached)
+        return True
+
+    def url(self, key):
+        return f"/uploads/{key}"  # URL ổn định; /uploads/ chuyển hướng sang presigned_url
+
+    def presigned_url(self, key, expires=None):
+        path = self._path(key)
+        query = presign(self.access_key, self.secret_key, self.region, self.host, path,
+                        expires or self.presign_expires, _amz_now())
+        return f"{self.endpoint}{path}?{query}"
+
+    def local_path(self, key):
+        """Bản cục bộ của object (tải về cache nếu chưa có), None nếu không tồn tại"""
+        if safe_join(self.cache_folder, key) is None:
+            return None  # key kiểu "../.." không được ghi ra ngoài cache
+        cached = find_upload(key, self.cache_folder)
+        if cached:
+            return cached
+        try:
+            source = self.open(key)
+        except FileNotFoundError:
+            return None
+        dest = upload_path(key, self.cache_folder)
+        tmp = f"{dest}.{os.getpid()}.tmp"
+        try:
+            with source, open(tmp, "wb") as f:
+                shutil.copyfileobj(source, f, CHUNK_SIZE)
+            os.replace(tmp, dest)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+        return dest
+
+
+# =================================================
+# CHỌN BACKEND THEO Media.filename
+# =================================================
+_static = StaticStorage()
+_external = ExternalStorage()
+
+
+def uploads():
+    """Backend cho file upload, tạo một lần mỗi app theo MEDIA_STORAGE"""
+    backend = current_app.extensions.get("media_storage")
+    if backend is None:
+        config = current_app.config
+        if config.get("MEDIA_STORAGE") == "s3":
+            backend = S3Storage(
+                config["S3_ENDPOINT"], config["S3_BUCKET"],
+                config["S3_ACCESS_KEY"], config["S3_SECRET_KEY"],
+                region=config.get("S3_REGION", "us-east-1"),
+                timeout=config.get("S3_TIMEOUT", 30),
+                presign_expires=config.get("S3_PRESIGN_EXPIRES", 3600),
+            )
+        else:
+            backend = LocalStorage()
+        current_app.extensions["media_storage"] = backend
+    return backend
+
+
+def resolve(filename):
+    """Media.filename -> (backend, key trong backend đó)"""
+    if filename.startswith(("http://", "https://")):
+        return _external, filename
+    if filename.startswith("static/"):
+        return _static, filename[len("static/"):]
+    return uploads(), filename
+
+
+def public_url(filename):
+    backend, key = resolve(filename)
+    return backend.url(key)
+
+
+def local_path(filename):
+    backend, key = resolve(filename)
+    return backend.local_path(key)
+
+
+def delete(filename):
+    backend, key = resolve(filename)
+    return backend.delete(key)
+
+
+def is_external(filename):
+    return resolve(filename)[0].external
@@ -0,0 +1,215 @@
+"""
+Nhận file upload multipart theo stream, kiểm tra nội dung ngay từ chunk đầu.
+
+upload_thumbnail không dùng request.files (Werkzeug ghi hết body ra file tạm
+trước khi view chạy) mà tự parse body bằng MultipartDecoder:
+- phần mở rộng không được hỗ trợ -> từ chối ngay khi đọc header của part;
+- magic bytes ở đầu file không khớp phần mở rộng -> từ chối sau SNIFF_BYTES đầu;
+- vượt giới hạn theo loại (UPLOAD_MAX_IMAGE_BYTES / UPLOAD_MAX_VIDEO_BYTES)
+  -> dừng ghi, xóa phần đã ghi.
+Bị từ chối thì phần body còn lại không được đọc tiếp. Upload resumable dùng cùng
+danh sách / giới hạn: check_declared() lúc tạo phiên, check_file() lúc finalize.
+"""
+import hashlib
+import os
+
+from flask import current_app, request
+from werkzeug.http import parse_options_header
+from werkzeug.sansio.multipart import Data, Epilogue, Field, File, MultipartDecoder, NeedData
+
+from app.media_meta import CHUNK_SIZE, format_size
+
+SNIFF_BYTES = 4096            # đủ cho header SVG có XML prolog / comment
+FORM_BUFFER_BYTES = 1024 * 1024
+
+# Phần mở rộng -> (loại media, các kiểu nội dung chấp nhận)
+ALLOWED_TYPES = {
+    "jpg": ("image", {"jpeg"}),
+    "jpeg": ("image", {"jpeg"}),
+    "png": ("image", {"png"}),
+    "gif": ("image", {"gif"}),
+    "webp": ("image", {"webp"}),
+    "bmp": ("image", {"bmp"}),
+    "tif": ("image", {"tiff"}),
+    "tiff": ("image", {"tiff"}),
+    "avif": ("image", {"heif"}),
+    "heic": ("image", {"heif"}),
+    "svg": ("image", {"svg"}),
+    "mp4": ("video", {"mp4"}),
+    "mov": ("video", {"mp4", "quicktime"}),
+    "avi": ("video", {"avi"}),
+    "webm": ("video", {"webm"}),
+}
+
+# File không có phần mở rộng -> lấy theo nội dung
+KIND_EXTS = {
+    "jpeg": "jpg", "png": "png", "gif": "gif", "webp": "webp", "bmp": "bmp",
+    "tiff": "tiff", "heif": "heic", "svg": "svg", "mp4": "mp4",
+    "quicktime": "mov", "avi": "avi", "webm": "webm",
+}
+
+HEIF_BRANDS = {b"avif", b"avis", b"heic", b"heix", b"mif1", b"msf1"}
+QUICKTIME_ATOMS = {b"moov", b"mdat", b"wide", b"free", b"skip", b"pnot"}
+
+
+class UploadRejected(Exception):
+    """Upload bị từ chối; status là mã HTTP trả cho client"""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+
+def sniff(head):
+    """Kiểu nội dung theo magic bytes ở đầu file (None nếu không nhận ra)"""
+    if head.startswith(b"\xff\xd8\xff"):
+        return "jpeg"
+    if head.startswith(b"\x89PNG\r\n\x1a\n"):
+        return "png"
+    if head[:6] in (b"GIF87a", b"GIF89a"):
+        return "gif"
+    if head[:4] == b"RIFF":
+        return {b"WEBP": "webp", b"AVI ": "avi"}.get(head[8:12])
+    if head[:4] in (b"II*\x00", b"MM\x00*"):
+        return "tiff"
+    if head.startswith(b"\x1a\x45\xdf\xa3"):  # EBML (WebM / Matroska)
+        return "webm"
+    if head[4:8] == b"ftyp":
+        return "heif" if head[8:12] in HEIF_BRANDS else "mp4"
+    if head[4:8] in QUICKTIME_ATOMS:  # .mov cũ không có ftyp
+        return "quicktime"
+    if head.startswith(b"BM"):
+        return "bmp"
+    text = head.lstrip(b"\xef\xbb\xbf \t\r\n").lower()
+    if text.startswith(b"<") and b"<svg" in text:
+        return "svg"
+    return None
+
+
+def max_bytes(media_type):
+    return current_app.config[f"UPLOAD_MAX_{media_type.upper()}_BYTES"]
+
+
+def check_declared(ext, size):
+    """Upload resumable: phần mở rộng + kích thước khai báo lúc tạo phiên -> loại media"""
+    if ext not in ALLOWED_TYPES:
+        raise UploadRejected("Định dạng file không được hỗ trợ", 415)
+    media_type = ALLOWED_TYPES[ext][0]
+    if size > max_bytes(media_type):
+        raise UploadRejected(f"File vượt quá giới hạn {format_size(max_bytes(media_type))}", 413)
+    return media_type
+
+
+def check_file(path, ext):
+    """File đã nhận đủ (upload resumable): magic bytes phải khớp phần mở rộng"""
+    with open(path, "rb") as f:
+        kind = sniff(f.read(SNIFF_BYTES))
+    if ext not in ALLOWED_TYPES or kind not in ALLOWED_TYPES[ext][1]:
+        raise UploadRejected(f"Nội dung file không khớp định dạng .{ext}", 415)
+
+
+class _Receiver:
+    """Ghi part file: giữ SNIFF_BYTES đầu trong bộ nhớ, kiểm tra xong mới mở file"""
+
+    def __init__(self, filename, path_for):
+        if not filename:
+            raise UploadRejected("Empty filename")
+        self.ext = filename.rsplit(".", 1)[1].lower() if "." in filename else None
+        if self.ext is not None and self.ext not in ALLOWED_TYPES:
+            raise UploadRejected("Định dạng file không được hỗ trợ", 415)
+        self.path_for = path_for
+        self.head = bytearray()
+        self.file = None
+        self.path = None
+        self.size = 0
+        self.digest = hashlib.sha256()
+
+    def feed(self, data):
+        if self.file is not None:
+            self._write(data)
+            return
+        self.head += data
+        if len(self.head) >= SNIFF_BYTES:
+            self._open()
+
+    def _open(self):
+        kind = sniff(bytes(self.head[:SNIFF_BYTES]))
+        if self.ext is None:
+            self.ext = KIND_EXTS.get(kind)
+            if self.ext is None:
+                raise UploadRejected("Định dạng file không được hỗ trợ", 415)
+        media_type, kinds = ALLOWED_TYPES[self.ext]
+        if kind not in kinds:
+            raise UploadRejected(f"Nội dung file không khớp định dạng .{self.ext}", 415)
+
+        self.limit = max_bytes(media_type)
+        self.path = self.path_for(self.ext)
+        self.file = open(self.path, "wb")
+        head, self.head = bytes(self.head), None
+        self._write(head)
+
+    def _write(self, data):
+        self.size += len(data)
+        if self.size > self.limit:
+            raise UploadRejected(f"File vượt quá giới hạn {format_size(self.limit)}", 413)
+        self.digest.update(data)
+        self.file.write(data)
+
+    def finish(self):
+        if self.file is None:  # file nhỏ hơn SNIFF_BYTES
+            self._open()
+        self.file.close()
+        return self.path, self.ext, self.size, self.digest.hexdigest()
+
+    def abort(self):
+        if self.file is not None:
+            self.file.close()
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+def receive_file(path_for, field="file"):
+    """
+    Đọc part `field` của request multipart hiện tại và ghi ra path_for(ext)
+    -> (path, ext, size, sha256). Lỗi -> UploadRejected (không để lại file).
+    """
+    mimetype, options = parse_options_header(request.headers.get("Content-Type", ""))
+    boundary = options.get("boundary")
+    if mimetype != "multipart/form-data" or not boundary:
+        raise UploadRejected("No file")
+
+    # Body lớn hơn mọi giới hạn -> từ chối trước khi đọc byte nào
+    ceiling = max(max_bytes("image"), max_bytes("video"))
+    if request.content_length and request.content_length > ceiling + FORM_BUFFER_BYTES:
+        raise UploadRejected(f"File vượt quá giới hạn {format_size(ceiling)}", 413)
+
+    decoder = MultipartDecoder(boundary.encode(), max_form_memory_size=FORM_BUFFER_BYTES)
+    stream = request.stream
+    receiver = None
+    current = None  # receiver nếu part đang đọc là part file cần nhận
+    try:
+        while True:
+            try:
+                event = decoder.next_event()
+            except ValueError:
+                raise UploadRejected("Dữ liệu multipart không hợp lệ")
+
+            if isinstance(event, NeedData):
+                decoder.receive_data(stream.read(CHUNK_SIZE) or None)
+            elif isinstance(event, File) and event.name == field and receiver is None:
+                receiver = current = _Receiver(event.filename, path_for)
+            elif isinstance(event, (File, Field)):
+                current = None
+            elif isinstance(event, Data) and current is not None:
+                current.feed(event.data)
+                if not event.more_data:
+                    # Đã đủ file: không cần đọc các part còn lại
+                    return current.finish()
+            elif isinstance(event, Epilogue):
+                raise UploadRejected("No file")
+    except Exception:
+        if receiver is not None:
+            receiver.abort()
+        raise
@@ -0,0 +1,162 @@
+"""
+Tạo file ZIP theo kiểu stream (không file tạm, bộ nhớ không phụ thuộc số / cỡ file).
+
+- Mỗi entry dùng data descriptor (cờ bit 3): CRC32 và kích thước được ghi
+  SAU dữ liệu nên có thể đọc file nguồn đúng một lần, từng chunk.
+- ZIP_STORED cho định dạng đã nén sẵn (JPEG, PNG, MP4...), ZIP_DEFLATED cho phần còn lại.
+- Khi mọi entry đều là STORED và biết trước kích thước thì tính được tổng số
+  bytes trước khi gửi (content_length()) -> trả Content-Length; ngược lại
+  content_length() là None và response đi theo chunked transfer.
+- Tự chuyển sang ZIP64 cho file / archive >= 4 GB.
+"""
+import struct
+import zlib
+from datetime import datetime
+
+CHUNK_SIZE = 64 * 1024
+
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+STORED_EXTS = {
+    "jpg", "jpeg", "png", "gif", "webp", "avif", "heic",
+    "mp4", "mov", "m4v", "webm", "avi", "mkv", "mp3", "m4a",
+    "zip", "gz", "7z", "rar", "pdf",
+}
+
+_LIMIT = 0xFFFFFFFF
+_FLAGS = 0x08 | 0x800  # data descriptor + tên file UTF-8
+
+
+def method_for(name):
+    ext = name.rsplit(".", 1)[-1].lower() if "." in name else ""
+    return ZIP_STORED if ext in STORED_EXTS else ZIP_DEFLATED
+
+
+def _dos_time(dt):
+    dt = dt or datetime.now()
+    if dt.year < 1980:
+        dt = datetime(1980, 1, 1)
+    return ((dt.hour << 11) | (dt.minute << 5) | (dt.second // 2),
+            ((dt.year - 1980) << 9) | (dt.month << 5) | dt.day)
+
+
+class ZipEntry:
+    def __init__(self, name, opener, size=None, modified=None, method=None):
+        self.name = name
+        self.encoded_name = name.encode("utf-8")
+        self.opener = opener          # hàm không tham số -> file-like đọc được
+        self.size = size              # kích thước gốc (None nếu chưa biết)
+        self.method = method_for(name) if method is None else method
+        self.time, self.date = _dos_time(modified)
+        # Chỉ biết trước khi STORED + có size; file >= 4GB hoặc không rõ size -> ZIP64
+        self.zip64 = size is None or size >= _LIMIT
+        self.crc = 0
+        self.compressed_size = 0
+        self.offset = 0
+
+    def local_header(self):
+        extra = struct.pack("<HHQQ", 0x0001, 16, 0, 0) if self.zip64 else b""
+        sizes = _LIMIT if self.zip64 else 0
+        return struct.pack(
+            "<IHHHHHIIIHH", 0x04034B50, 45 if self.zip64 else 20, _FLAGS, self.method,
+            self.time, self.date, 0, sizes, sizes, len(self.encoded_name), len(extra),
+        ) + self.encoded_name + extra
+
+    def data_descriptor(self):
+        if self.zip64:
+            return struct.pack("<IIQQ", 0x08074B50, self.crc, self.compressed_size, self.size)
+        return struct.pack("<IIII", 0x08074B50, self.crc, self.compressed_size, self.size)
+
+    def central_header(self):
+        fields = []
+        size = self.size
+        compressed = self.compressed_size
+        offset = self.offset
+        if self.zip64 or size >= _LIMIT or compressed >= _LIMIT:
+            fields += [size, compressed]
+            size = compressed = _LIMIT
+        if offset >= _LIMIT:
+            fields.append(offset)
+            offset = _LIMIT
+        extra = struct.pack(f"<HH{len(fields)}Q", 0x0001, 8 * len(fields), *fields) if fields else b""
+        return struct.pack(
+            "<IHHHHHHIIIHHHHHII", 0x02014B50, 45, 45 if extra else 20, _FLAGS, self.method,
+            self.time, self.date, self.crc, compressed, size,
+            len(self.encoded_name), len(extra), 0, 0, 0, 0, offset,
+        ) + self.encoded_name + extra
+
+
+def _end_records(count, cd_offset, cd_size):
+    records = b""
+    if count >= 0xFFFF or cd_offset >= _LIMIT or cd_size >= _LIMIT:
+        zip64_offset = cd_offset + cd_size
+        records += struct.pack("<IQHHIIQQQQ", 0x06064B50, 44, 45, 45, 0, 0,
+                               count, count, cd_size, cd_offset)
+        records += struct.pack("<IIQI", 0x07064B50, 0, zip64_offset, 1)
+        count, cd_offset, cd_size = min(count, 0xFFFF), min(cd_offset, _LIMIT), min(cd_size, _LIMIT)
+    return records + struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, count, count, cd_size, cd_offset, 0)
+
+
+class ZipStream:
+    """Iterable các chunk bytes của file ZIP"""
+
+    def __init__(self, entries):
+        self.entries = list(entries)
+
+    def content_length(self):
+        """Tổng số bytes nếu tính được trước (mọi entry STORED, biết size), ngược lại None"""
+        if any(e.method != ZIP_STORED or e.size is None for e in self.entries):
+            return None
+        offset = 0
+        for e in self.entries:
+            e.offset = offset
+            e.compressed_size = e.size
+            offset += len(e.local_header()) + e.size + len(e.data_descriptor())
+        cd_size = sum(len(e.central_header()) for e in self.entries)
+        return offset + cd_size + len(_end_records(len(self.entries), offset, cd_size))
+
+    def _entry_data(self, entry):
+        compressor = zlib.compressobj(6, zlib.DEFLATED, -15) if entry.method == ZIP_DEFLATED else None
+        crc = size = compressed = 0
+        with entry.opener() as src:
+            while True:
+                chunk = src.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                crc = zlib.crc32(chunk, crc)
+                size += len(chunk)
+                if compressor:
+                    chunk = compressor.compress(chunk)
+                compressed += len(chunk)
+                if chunk:
+                    yield chunk
+        if compressor:
+            tail = compressor.flush()
+            compressed += len(tail)
+            yield tail
+
+        if entry.size is not None and size != entry.size:
+            # Content-Length đã gửi sẽ sai -> ngắt response thay vì trả file hỏng
+            raise IOError(f"{entry.name}: kích thước đổi từ {entry.size} thành {size}")
+        entry.crc, entry.size, entry.compressed_size = crc, size, compressed
+
+    def __iter__(self):
+        offset = 0
+        for entry in self.entries:
+            entry.offset = offset
+            header = entry.local_header()
+            yield header
+            offset += len(header)
+            for chunk in self._entry_data(entry):
+                offset += len(chunk)
+                yield chunk
+            descriptor = entry.data_descriptor()
+            yield descriptor
+            offset += len(descriptor)
+
+        cd_size = 0
+        for entry in self.entries:
+            header = entry.central_header()
+            cd_size += len(header)
+            yield header
+        yield _end_records(len(self.entries), offset, cd_size)
@@ -0,0 +1,57 @@
+"""
+BACKFILL METADATA CHO MEDIA CŨ
+
+Tính size / MIME / width / height / sha256 cho các dòng media chưa có metadata
+(file trong uploads/ và static/images). Xử lý theo lô để không giữ cả bảng
+trong bộ nhớ.
+
+Chạy:  python backfill_media.py [--batch 200] [--force]
+"""
+import argparse
+
+from app import create_app, db, storage
+from app.models.media import Media
+from app.media_meta import fill_metadata, local_path
+
+
+def backfill(batch_size=200, force=False):
+    updated = missing = 0
+    last_id = 0
+
+    while True:
+        query = Media.query.filter(Media.id > last_id)
+        if not force:
+            query = query.filter(Media.size.is_(None))
+        batch = query.order_by(Media.id).limit(batch_size).all()
+        if not batch:
+            break
+
+        for media in batch:
+            last_id = media.id
+            if storage.is_external(media.filename):
+                continue  # URL ngoài (Cloudinary...) -> không có file cục bộ
+            path = local_path(media.filename)
+            if path is None:
+                missing += 1
+                print(f"⚠️  Không tìm thấy file: {media.filename}")
+                continue
+            fill_metadata(media, path)
+            updated += 1
+
+        db.session.commit()
+        db.session.expunge_all()
+
+    return updated, missing
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch", type=int, default=200)
+    parser.add_argument("--force", action="store_true", help="Tính lại cả dòng đã có metadata")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        updated, missing = backfill(args.batch, args.force)
+
+    print(f"✅ Đã cập nhật metadata cho {updated} media ({missing} file không tồn tại)")
@@ -0,0 +1,78 @@
+"""
+BENCHMARK: NHẬP BÌNH LUẬN THEO LÔ (dòng / phút, bộ nhớ đỉnh)
+
+Sinh file NDJSON giả (kiểu export Facebook) rồi nhập bằng app.comment_ingest
+vào SQLite in-memory với nhiều cỡ lô; lần nhập thứ hai cùng file đo nhánh chống trùng.
+Mục tiêu: >= 100k bình luận / phút, bộ nhớ không tăng theo kích thước file.
+
+Chạy:  python benchmarks/bench_comment_ingest.py [--comments 200000] [--batch 500 5000 20000]
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.comment_ingest import import_stream
+
+WORDS = "phòng đẹp view hồ bơi buffet sáng ngon nhân viên thân thiện giá hợp lý sẽ quay lại".split()
+
+
+def write_export(path, n, seed=1):
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(n):
+            f.write(json.dumps({
+                "id": f"{rng.randrange(10 ** 9)}_{i}",
+                "message": " ".join(rng.choices(WORDS, k=rng.randint(3, 25))),
+                "from": {"name": f"Khách {rng.randrange(5000)}"},
+                "created_time": f"2025-11-{1 + i % 28:02d}T{i % 24:02d}:00:00+0000",
+            }, ensure_ascii=False) + "\n")
+
+
+def run(path, batch):
+    app = create_app('testing')
+    with app.app_context():
+        results = []
+        for _ in range(2):  # lần 2: toàn bộ là bản trùng
+            tracemalloc.start()
+            start = time.perf_counter()
+            with open(path, "rb") as stream:
+                summary = import_stream(stream, "ndjson", "Facebook", batch, triage=False)
+            elapsed = time.perf_counter() - start
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results.append((summary, elapsed, peak))
+        db.session.remove()
+        db.drop_all()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--comments", type=int, default=200_000)
+    parser.add_argument("--batch", type=int, nargs="+", default=[500, 5000, 20000])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "facebook.ndjson")
+        write_export(path, args.comments)
+        print(f"File: {args.comments} bình luận, {os.path.getsize(path) / 1e6:.1f} MB\n")
+
+        print(f"{'batch':>6} | {'lần':>4} | {'thêm':>8} | {'trùng':>8} | {'dòng/phút':>11} | {'peak MB':>8}")
+        print("-" * 62)
+        for batch in args.batch:
+            for run_no, (summary, elapsed, peak) in enumerate(run(path, batch), 1):
+                rate = summary["read"] / elapsed * 60
+                print(f"{batch:>6} | {run_no:>4} | {summary['inserted']:>8} | {summary['duplicates']:>8} | "
+                      f"{rate:>11,.0f} | {peak / 1e6:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+BENCHMARK: ORM vs PROJECTION cho API danh sách bài viết
+
+So sánh thời gian + bộ nhớ đỉnh khi dựng danh sách bài viết:
+  - ORM:        Post.query.all() + tự build dict (tải cả cột content)
+  - Projection: post_list_query().all() + serialize_post_row
+
+Chạy:  python benchmarks/bench_list_projection.py [--rows 10000 100000]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models.post import Post
+from app.projections import post_list_query, serialize_post_row
+
+CONTENT = "Nội dung bài viết giới thiệu khách sạn. " * 50  # ~2 KB mỗi bài
+
+
+def seed(n):
+    db.session.query(Post).delete()
+    base = datetime(2025, 1, 1)
+    rows = [
+        {
+            "title": f"Bài viết {i}",
+            "content": CONTENT,
+            "author": "Admin",
+            "status": "published",
+            "category": "phong",
+            "image": "/static/images/phong1.png",
+            "created_at": base + timedelta(seconds=i),
+        }
+        for i in range(n)
+    ]
+    db.session.execute(Post.__table__.insert(), rows)
+    db.session.commit()
+
+
+def orm_path():
+    return [
+        {
+            "id": p.id,
+            "title": p.title,
+            "status": p.status,
+            "publish_at": p.publish_at.strftime("%d/%m/%Y") if p.publish_at else None,
+            "image": p.image,
+            "category": p.category,
+            "author": p.author
+        }
+        for p in Post.query.order_by(Post.created_at.desc()).all()
+    ]
+
+
+def projected_path():
+    rows = post_list_query().order_by(Post.created_at.desc()).all()
+    return [serialize_post_row(p) for p in rows]
+
+
+def measure(fn):
+    db.session.expunge_all()
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    db.session.expunge_all()
+    return len(result), elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    app = create_app('testing')
+    with app.app_context():
+        print(f"{'rows':>8} | {'path':<10} | {'time (s)':>9} | {'peak MB':>8}")
+        print("-" * 46)
+        for n in args.rows:
+            seed(n)
+            for name, fn in (("orm", orm_path), ("projected", projected_path)):
+                count, elapsed, peak = measure(fn)
+                assert count == n
+                print(f"{n:>8} | {name:<10} | {elapsed:>9.3f} | {peak / 1e6:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""
+BENCHMARK: ĐỌC HEADER vs DECODE TOÀN BỘ
+
+So sánh app.probe.probe_file (chỉ đọc header) với Pillow Image.open().load()
+(decode toàn bộ pixel) trên các file ảnh trong uploads/ và static/images.
+
+Chạy:  python benchmarks/bench_probe.py [thư mục ...] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.probe import probe_file
+from PIL import Image
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+DEFAULT_DIRS = [os.path.join(ROOT, "uploads"), os.path.join(ROOT, "static", "images")]
+
+
+def corpus(dirs):
+    for folder in dirs:
+        for root, _, files in os.walk(folder):
+            for name in sorted(files):
+                path = os.path.join(root, name)
+                if probe_file(path):
+                    yield path
+
+
+def full_decode(path):
+    with Image.open(path) as img:
+        img.load()
+        return img.size
+
+
+def header_probe(path):
+    info = probe_file(path)
+    return info["width"], info["height"]
+
+
+def measure(fn, files, repeat):
+    tracemalloc.start()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for path in files:
+            fn(path)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("dirs", nargs="*", default=DEFAULT_DIRS)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    files = list(corpus(args.dirs))
+    total = sum(os.path.getsize(p) for p in files)
+    print(f"Corpus: {len(files)} file, {total / 1e6:.1f} MB, lặp {args.repeat} lần\n")
+
+    mismatched = [p for p in files if header_probe(p) != full_decode(p)]
+    if mismatched:
+        print(f"⚠️  {len(mismatched)} file probe khác Pillow: {mismatched[:5]}")
+
+    print(f"{'method':<12} | {'time (s)':>9} | {'ms/file':>8} | {'peak MB':>8}")
+    print("-" * 46)
+    for name, fn in (("decode", full_decode), ("probe", header_probe)):
+        elapsed, peak = measure(fn, files, args.repeat)
+        per_file = elapsed * 1000 / max(1, len(files) * args.repeat)
+        print(f"{name:<12} | {elapsed:>9.3f} | {per_file:>8.3f} | {peak / 1e6:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
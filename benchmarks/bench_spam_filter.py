@@ -0,0 +1,109 @@
+"""
+BENCHMARK: THÔNG LƯỢNG BỘ LỌC SPAM (bình luận / giây)
+
+Sinh bộ bình luận giả (hợp lệ / spam kiểu TikTok, Zalo), học model rồi đo:
+  1. chấm điểm thuần (featurize + Naive Bayes) theo từng cỡ lô;
+  2. triage_pending() đầu-cuối trên SQLite in-memory (đọc lô, chấm, UPDATE, bộ đếm).
+
+Chạy:  python benchmarks/bench_spam_filter.py [--comments 50000] [--batch 1 32 256 1024]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.spam_filter import train
+
+HAM = [
+    "Phòng sạch sẽ, nhân viên {adj}, sẽ quay lại lần sau.",
+    "Buffet sáng {adj}, view hồ bơi rất đẹp.",
+    "Cho mình hỏi giá phòng Deluxe cuối tuần {n} người?",
+    "Dịch vụ spa {adj}, cảm ơn khách sạn!",
+    "Lễ tân hỗ trợ nhiệt tình, check-in nhanh. {adj} lắm.",
+]
+SPAM = [
+    "Kiếm {n} triệu/ngày tại nhà, inbox zalo 09{n}{n} ngay!!!",
+    "Click here to win free money www.{w}.com",
+    "Follow tiktok @{w} nhận quà {n}k, link bio",
+    "Vay tiền nhanh không thế chấp, liên hệ {n}{n}{n}",
+    "Bán acc giá rẻ, sỉ lẻ đủ loại, ib {w}",
+]
+SOURCES = ["Website", "Facebook", "Zalo", "Tiktok", "Youtube"]
+ADJS = ["tuyệt vời", "thân thiện", "ngon", "ổn áp", "chuyên nghiệp"]
+
+
+def corpus(n, seed=1):
+    rng = random.Random(seed)
+    for _ in range(n):
+        spam = rng.random() < 0.3
+        template = rng.choice(SPAM if spam else HAM)
+        text = template.format(adj=rng.choice(ADJS), n=rng.randint(1, 999),
+                               w="".join(rng.choices("abcdefghijklmnop", k=6)))
+        yield text, rng.choice(SOURCES[2:] if spam else SOURCES), spam
+
+
+def bench_model(model, texts, sources, batch):
+    start = time.perf_counter()
+    for i in range(0, len(texts), batch):
+        model.predict(texts[i:i + batch], sources[i:i + batch])
+    return len(texts) / (time.perf_counter() - start)
+
+
+def bench_triage(model_path, rows, batch):
+    from app import create_app, db, spam_filter
+    from app.models.comment import Comment
+
+    app = create_app('testing')
+    app.config['SPAM_BATCH_SIZE'] = batch
+    app.config['SPAM_MODEL_PATH'] = model_path
+    with app.app_context():
+        db.session.bulk_insert_mappings(Comment, [
+            {"author_name": "Khách", "content": text, "source": source, "status": "pending"}
+            for text, source, _ in rows])
+        db.session.commit()
+        spam_filter.current_model()  # nạp model trước khi đo
+        start = time.perf_counter()
+        summary = spam_filter.triage_pending()
+        elapsed = time.perf_counter() - start
+        db.session.remove()
+        db.drop_all()
+    return len(rows) / elapsed, summary
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--comments", type=int, default=50_000)
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 32, 256, 1024])
+    args = parser.parse_args()
+
+    rows = list(corpus(args.comments))
+    start = time.perf_counter()
+    model = train(corpus(args.comments, seed=2))
+    print(f"Học {args.comments} bình luận: {time.perf_counter() - start:.2f}s\n")
+
+    texts = [text for text, _, _ in rows]
+    sources = [source for _, source, _ in rows]
+    scores = model.predict(texts, sources)
+    labels = [spam for _, _, spam in rows]
+    accuracy = sum((s >= 0.5) == spam for s, spam in zip(scores.tolist(), labels)) / len(rows)
+    print(f"Độ chính xác (ngưỡng 0.5): {accuracy:.2%}\n")
+
+    print(f"{'batch':>6} | {'chấm điểm (cmt/s)':>18} | {'triage DB (cmt/s)':>18}")
+    print("-" * 50)
+    with tempfile.TemporaryDirectory() as tmp:
+        model_path = os.path.join(tmp, "spam_model.npz")
+        model.save(model_path)
+        for batch in args.batch:
+            # lô 1 rất chậm -> chỉ đo 5000 bình luận đầu
+            sample = min(len(texts), 5000) if batch == 1 else len(texts)
+            model_rate = bench_model(model, texts[:sample], sources[:sample], batch)
+            triage_rate, _ = bench_triage(model_path, rows[:sample], batch)
+            print(f"{batch:>6} | {model_rate:>18,.0f} | {triage_rate:>18,.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,103 @@
+"""
+GỘP FILE TRÙNG NỘI DUNG TRONG uploads/ (chạy một lần)
+
+Nhóm các media cục bộ theo sha256, giữ lại một file cho mỗi nhóm, trỏ mọi
+dòng Media (và Post.image) về file đó, xóa các bản sao và tạo MediaBlob với
+ref_count tương ứng. In ra số bytes thu hồi được.
+
+Chạy:  python dedup_uploads.py [--dry-run] [--batch 500]
+"""
+import argparse
+import os
+
+from app import create_app, db
+from app.models.media import Media
+from app.models.media_blob import MediaBlob
+from app.models.post import Post
+from app.media_meta import format_size
+from app.sharding import find_upload
+from backfill_media import backfill
+
+
+def _local_uploads():
+    return Media.query.filter(
+        ~Media.filename.like("http%"),
+        ~Media.filename.like("static/%")
+    )
+
+
+def dedup(upload_folder, batch_size=500, dry_run=False):
+    reclaimed_bytes = removed_files = 0
+    last_sha = ""
+
+    while True:
+        # Duyệt từng lô sha256 (keyset) để không tải cả bảng media
+        shas = [row[0] for row in (
+            _local_uploads()
+            .with_entities(Media.sha256)
+            .filter(Media.sha256.isnot(None), Media.sha256 > last_sha)
+            .group_by(Media.sha256)
+            .order_by(Media.sha256)
+            .limit(batch_size)
+        )]
+        if not shas:
+            break
+        last_sha = shas[-1]
+
+        for sha in shas:
+            rows = _local_uploads().filter(Media.sha256 == sha).order_by(Media.id).all()
+            blob = db.session.get(MediaBlob, sha)
+
+            if blob is not None:
+                keep = blob.filename
+            else:
+                existing = [m.filename for m in rows
+                            if find_upload(m.filename, upload_folder)]
+                if not existing:
+                    continue
+                keep = existing[0]
+
+            for old in {m.filename for m in rows} - {keep}:
+                path = find_upload(old, upload_folder)
+                if path:
+                    reclaimed_bytes += os.path.getsize(path)
+                    removed_files += 1
+                    if not dry_run:
+                        os.remove(path)
+                if not dry_run:
+                    Post.query.filter_by(image=f"/uploads/{old}").update(
+                        {Post.image: f"/uploads/{keep}"}, synchronize_session=False
+                    )
+
+            if dry_run:
+                continue
+
+            for m in rows:
+                m.filename = keep
+            if blob is None:
+                blob = MediaBlob(sha256=sha, filename=keep, size=rows[0].size)
+                db.session.add(blob)
+            blob.ref_count = len(rows)
+
+        if not dry_run:
+            db.session.commit()
+        db.session.expunge_all()
+
+    return removed_files, reclaimed_bytes
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="Chỉ báo cáo, không xóa / sửa gì")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        # Media cũ có thể chưa có sha256
+        if not args.dry_run:
+            backfill()
+        removed, reclaimed = dedup(app.config['UPLOAD_FOLDER'], args.batch, args.dry_run)
+
+    prefix = "🔎 [dry-run] " if args.dry_run else "✅ "
+    print(f"{prefix}Đã gộp {removed} file trùng, thu hồi {format_size(reclaimed)} ({reclaimed} bytes)")
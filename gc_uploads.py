@@ -0,0 +1,163 @@
+"""
+DỌN FILE MỒ CÔI TRONG uploads/
+
+- Duyệt thư mục theo kiểu stream (os.scandir, kể cả thư mục shard và variants/),
+  mỗi lô N file hỏi DB một lần xem file nào còn được tham chiếu bởi
+  Media.filename, MediaVariant.filename, MediaBlob.filename hoặc Post.image.
+  Bộ nhớ chỉ phụ thuộc kích thước lô, không phụ thuộc số file.
+- Bỏ qua file mới hơn thời gian ân hạn (--grace-hours) vì upload có thể
+  đang ghi file trước khi commit DB.
+- File .partial không còn phiên upload tương ứng cũng bị coi là mồ côi.
+- Báo cáo bài viết có Post.image trỏ tới file upload không còn tồn tại.
+
+Chạy:  python gc_uploads.py [--grace-hours 24] [--batch 1000] [--quarantine]
+"""
+import argparse
+import os
+import time
+
+from app import create_app, db, storage
+from app.models.media import Media
+from app.models.media_blob import MediaBlob
+from app.models.media_variant import MediaVariant
+from app.models.post import Post
+from app.models.upload_session import UploadSession
+from app.media_meta import format_size
+from app.resumable import PARTIAL_DIR
+from app.sharding import find_upload, shard_rel
+
+QUARANTINE_DIR = ".quarantine"
+
+
+def iter_files(folder, rel=""):
+    """Yield (đường dẫn tương đối, stat) của mọi file, bỏ qua thư mục ẩn"""
+    with os.scandir(os.path.join(folder, rel) if rel else folder) as entries:
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            child = f"{rel}/{entry.name}" if rel else entry.name
+            if entry.is_dir(follow_symlinks=False):
+                yield from iter_files(folder, child)
+            elif entry.is_file(follow_symlinks=False):
+                yield child, entry.stat(follow_symlinks=False)
+
+
+def iter_partials(folder):
+    partial = os.path.join(folder, PARTIAL_DIR)
+    if not os.path.isdir(partial):
+        return
+    with os.scandir(partial) as entries:
+        for entry in entries:
+            if entry.is_file(follow_symlinks=False) and entry.name.endswith(".part"):
+                yield f"{PARTIAL_DIR}/{entry.name}", entry.stat(follow_symlinks=False)
+
+
+def _public_name(rel):
+    """'ab/cd/abcd.jpg' -> 'abcd.jpg' (Media.filename), 'variants/...' giữ nguyên"""
+    name = rel.rsplit("/", 1)[-1]
+    return name if shard_rel(name) == rel else rel
+
+
+def _referenced(names):
+    """Trong các tên của lô, tên nào còn được tham chiếu"""
+    names = list(names)
+    found = set()
+    found.update(r[0] for r in db.session.query(Media.filename).filter(Media.filename.in_(names)))
+    found.update(r[0] for r in db.session.query(MediaVariant.filename).filter(MediaVariant.filename.in_(names)))
+    found.update(r[0] for r in db.session.query(MediaBlob.filename).filter(MediaBlob.filename.in_(names)))
+    urls = [f"/uploads/{n}" for n in names]
+    found.update(r[0][len("/uploads/"):] for r in db.session.query(Post.image).filter(Post.image.in_(urls)))
+    return found
+
+
+def _referenced_partials(names):
+    ids = [n[len(PARTIAL_DIR) + 1:-len(".part")] for n in names]
+    alive = {r[0] for r in db.session.query(UploadSession.id).filter(UploadSession.id.in_(ids))}
+    return {n for n, i in zip(names, ids) if i in alive}
+
+
+def _batches(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def find_orphans(folder, grace_seconds=24 * 3600, batch_size=1000):
+    """Yield (đường dẫn tương đối, size) của file mồ côi đủ cũ"""
+    cutoff = time.time() - grace_seconds
+    sources = (
+        (iter_files(folder), lambda batch: _referenced(_public_name(r) for r, _ in batch), True),
+        (iter_partials(folder), lambda batch: _referenced_partials([r for r, _ in batch]), False),
+    )
+    for files, lookup, map_name in sources:
+        for batch in _batches(files, batch_size):
+            alive = lookup(batch)
+            for rel, st in batch:
+                key = _public_name(rel) if map_name else rel
+                if key not in alive and st.st_mtime < cutoff:
+                    yield rel, st.st_size
+            db.session.expunge_all()
+
+
+def quarantine(folder, rel):
+    """Chuyển file vào .quarantine/ (giữ nguyên đường dẫn tương đối) thay vì xóa"""
+    dest = os.path.join(folder, QUARANTINE_DIR, *rel.split("/"))
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    os.replace(os.path.join(folder, *rel.split("/")), dest)
+
+
+def dangling_posts(batch_size=1000):
+    """Yield (post id, image) của bài viết trỏ tới file upload không còn tồn tại"""
+    backend = storage.uploads()
+    last_id = 0
+    while True:
+        rows = (db.session.query(Post.id, Post.image)
+                .filter(Post.id > last_id, Post.image.like("/uploads/%"))
+                .order_by(Post.id).limit(batch_size).all())
+        if not rows:
+            return
+        for post_id, image in rows:
+            name = image[len("/uploads/"):]
+            # MEDIA_STORAGE=s3: không có bản cục bộ chưa chắc đã mất, hỏi lại kho chung
+            if find_upload(name) is None and (not backend.remote or backend.stat(name) is None):
+                yield post_id, image
+        last_id = rows[-1][0]
+
+
+def run(folder, grace_seconds=24 * 3600, batch_size=1000, do_quarantine=False, log=print):
+    orphan_count = orphan_bytes = 0
+    for rel, size in find_orphans(folder, grace_seconds, batch_size):
+        orphan_count += 1
+        orphan_bytes += size
+        if do_quarantine:
+            quarantine(folder, rel)
+        log(f"   🗑️  {rel} ({format_size(size)})")
+
+    dangling = 0
+    for post_id, image in dangling_posts(batch_size):
+        dangling += 1
+        log(f"   ⚠️  Bài viết #{post_id} trỏ tới file không tồn tại: {image}")
+
+    return orphan_count, orphan_bytes, dangling
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--grace-hours", type=float, default=24)
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--quarantine", action="store_true",
+                        help="Chuyển file mồ côi vào uploads/.quarantine/ (mặc định chỉ báo cáo)")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        count, size, dangling = run(app.config['UPLOAD_FOLDER'], args.grace_hours * 3600,
+                                    args.batch, args.quarantine)
+
+    action = "Đã cách ly" if args.quarantine else "Tìm thấy"
+    print(f"✅ {action} {count} file mồ côi ({format_size(size)}), {dangling} bài viết trỏ tới file đã mất")
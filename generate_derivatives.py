@@ -0,0 +1,65 @@
+"""
+TẠO ẢNH THU NHỎ CHO MEDIA ĐÃ CÓ
+
+Render các bản WebP/JPEG 160/480/1280 px, tính perceptual hash, BlurHash và màu
+chủ đạo cho media ảnh còn thiếu (bao gồm ảnh trong static/images như phong1.png,
+lehoi.png) bằng process pool. Ảnh upload chưa được bỏ EXIF / xoay theo Orientation
+cũng được xử lý luôn, cuối cùng in tổng dung lượng giảm được.
+
+Chạy:  python generate_derivatives.py [--workers 4] [--force]
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from app import create_app, db
+from app.models.media import Media
+from app.models.media_variant import MediaVariant
+from app.derivatives import wants_variants, process_image, save_results, job_args
+from app.exif_strip import wants_strip, savings_report
+
+
+def pending_media(force=False):
+    query = Media.query.filter(Media.type == "image")
+    if force:
+        return [m for m in query.order_by(Media.id) if wants_variants(m)]
+    query = query.filter(~Media.variants.any() | Media.phash.is_(None) | Media.blurhash.is_(None)
+                         | Media.bytes_saved.is_(None))
+    # bytes_saved chỉ được ghi cho file upload -> ảnh static / blob dùng chung đã đủ variant thì bỏ qua
+    return [m for m in query.order_by(Media.id) if wants_variants(m) and (
+        m.phash is None or m.blurhash is None or not m.variants or wants_strip(m))]
+
+
+def generate(workers=4, force=False):
+    jobs = {m.id: job_args(m) for m in pending_media(force)}
+    done = failed = 0
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(process_image, *args): media_id for media_id, args in jobs.items()}
+        for future in as_completed(futures):
+            media_id = futures[future]
+            try:
+                save_results(media_id, future.result())
+                done += 1
+            except Exception as e:
+                failed += 1
+                print(f"⚠️  Media {media_id}: {e}")
+
+    return done, failed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2)
+    parser.add_argument("--force", action="store_true", help="Render lại cả media đã có variant")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        done, failed = generate(args.workers, args.force)
+        total = db.session.query(db.func.sum(MediaVariant.size)).scalar() or 0
+        report = savings_report()
+
+    print(f"✅ Đã tạo ảnh thu nhỏ cho {done} media ({failed} lỗi), tổng dung lượng variant: {total} bytes")
+    print(f"🧹 Bỏ EXIF: {report['processed']} ảnh đã xử lý, {report['files_reduced']} ảnh nhỏ đi, "
+          f"giảm {report['bytes_saved']} bytes ({report['percent_saved']}%)")
@@ -0,0 +1,49 @@
+"""
+NHẬP BÌNH LUẬN TỪ FILE EXPORT (NDJSON / CSV, có thể nén .gz)
+
+Đọc theo stream, INSERT theo lô bằng executemany, bỏ qua bình luận đã có theo
+khóa (source, external_id) -> chạy lại cùng file không sinh bản trùng. Bình luận
+pending mới được chấm spam nếu đã có model (train_spam_filter.py).
+
+Chạy:  python import_comments.py facebook.ndjson.gz tiktok.csv --source Facebook
+       [--format ndjson|csv] [--batch 5000] [--no-triage]
+"""
+import argparse
+import time
+
+from app import create_app
+from app.comment_ingest import FORMATS, detect_format, import_stream, open_export
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--source", help="nguồn cho cả file (mặc định: trường source / platform của từng dòng)")
+    parser.add_argument("--format", choices=FORMATS, help="mặc định: theo đuôi file")
+    parser.add_argument("--batch", type=int, help="số dòng mỗi lô INSERT (mặc định INGEST_BATCH_SIZE)")
+    parser.add_argument("--no-triage", action="store_true", help="không chấm spam sau khi nhập")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        for path in args.files:
+            fmt = args.format or detect_format(path)
+            if fmt is None:
+                print(f"⚠️  {path}: không nhận ra định dạng, dùng --format")
+                continue
+
+            start = time.perf_counter()
+            with open_export(path) as stream:
+                summary = import_stream(stream, fmt, args.source, args.batch, triage=not args.no_triage)
+            elapsed = time.perf_counter() - start
+
+            rate = summary["read"] / elapsed * 60 if elapsed else 0
+            print(f"✅ {path}: đọc {summary['read']}, thêm {summary['inserted']}, "
+                  f"trùng {summary['duplicates']}, lỗi {summary['invalid']} "
+                  f"({elapsed:.1f}s, {rate:,.0f} dòng/phút)")
+            for error in summary["errors"]:
+                print(f"   dòng {error['line']}: {error['error']}")
+            if summary.get("triage"):
+                triage = summary["triage"]
+                print(f"   spam: tự duyệt {triage['approved']}, tự từ chối {triage['rejected']}, "
+                      f"chờ duyệt {triage['review']}")
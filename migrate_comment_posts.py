@@ -0,0 +1,32 @@
+"""
+GÁN post_id CHO BÌNH LUẬN CŨ (Comment.post_title -> Comment.post_id)
+
+Cột post_id, index (post_id, status, created_at) và cột đếm Post.comment_count /
+pending_comment_count được upgrade_schema() tự thêm khi app khởi động. Script này
+so khớp post_title (bỏ khoảng trắng thừa, không phân biệt hoa thường) với tiêu đề bài
+viết, ghi post_id theo lô rồi đếm lại bình luận theo bài. Chạy lại nhiều lần không sao:
+chỉ xử lý bình luận chưa có post_id.
+
+Chạy:  python migrate_comment_posts.py [--batch 1000] [--dry-run]
+"""
+import argparse
+
+from app import create_app
+from app.comment_posts import resolve_titles
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch", type=int, default=1000, help="số tiêu đề mỗi lô UPDATE")
+    parser.add_argument("--dry-run", action="store_true", help="chỉ báo cáo, không ghi DB")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        result = resolve_titles(batch_size=args.batch, dry_run=args.dry_run)
+
+    print(f"✅ {result['resolved']} bình luận đã gắn với bài viết")
+    for title, n in sorted(result["ambiguous"].items()):
+        print(f"⚠️  Nhiều bài trùng tiêu đề '{title}': {n} bình luận chưa gán")
+    for title, n in sorted(result["unmatched"].items()):
+        print(f"⚠️  Không tìm thấy bài '{title}': {n} bình luận chưa gán")
@@ -0,0 +1,70 @@
+"""
+CHUYỂN uploads/ TỪ BỐ CỤC PHẲNG SANG BỐ CỤC SHARD (online)
+
+uploads/abcd1234.jpg  ->  uploads/ab/cd/abcd1234.jpg
+
+Đọc danh sách thư mục theo kiểu stream (os.scandir) và chuyển từng lô bằng
+os.replace (atomic). App vẫn chạy bình thường trong lúc migrate vì
+app.sharding.find_upload đọc được cả hai bố cục; URL /uploads/<tên file> và
+Media.filename không đổi.
+
+Chạy:  python migrate_upload_layout.py [--batch 1000] [--pause 0.5] [--dry-run]
+"""
+import argparse
+import os
+import time
+
+from app import create_app
+from app.sharding import shard_rel, is_shardable
+
+
+def flat_files(folder):
+    """Các file nằm ngay trong folder (bỏ qua thư mục shard / thư mục ẩn)"""
+    with os.scandir(folder) as entries:
+        for entry in entries:
+            if entry.is_file(follow_symlinks=False) and is_shardable(entry.name):
+                yield entry.name
+
+
+def migrate(folder, batch_size=1000, pause=0.0, dry_run=False, log=print):
+    moved = skipped = 0
+    in_batch = 0
+
+    for name in flat_files(folder):
+        src = os.path.join(folder, name)
+        dest = os.path.join(folder, *shard_rel(name).split("/"))
+
+        if os.path.exists(dest):
+            # Đã có bản shard (ví dụ lần chạy trước bị ngắt) -> giữ bản shard
+            skipped += 1
+            if not dry_run:
+                os.remove(src)
+            continue
+
+        if not dry_run:
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            os.replace(src, dest)
+        moved += 1
+        in_batch += 1
+
+        if in_batch >= batch_size:
+            log(f"   ... đã chuyển {moved} file")
+            in_batch = 0
+            if pause:
+                time.sleep(pause)  # nhường I/O cho request đang phục vụ
+
+    return moved, skipped
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch", type=int, default=1000)
+    parser.add_argument("--pause", type=float, default=0.0, help="Nghỉ (giây) giữa các lô")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    app = create_app()
+    folder = app.config['UPLOAD_FOLDER']
+    print(f"🔧 Chuyển {folder} sang bố cục shard...")
+    moved, skipped = migrate(folder, args.batch, args.pause, args.dry_run)
+    print(f"✅ Đã chuyển {moved} file ({skipped} file đã có bản shard)")
@@ -0,0 +1,29 @@
+"""
+ĐẾM LẠI BỘ ĐẾM TRẠNG THÁI (bảng status_counters)
+
+Bộ đếm được cập nhật cùng transaction với mọi thao tác ghi qua app; job này
+đếm lại bằng GROUP BY để sửa sai lệch do script / thao tác SQL ghi thẳng vào
+bảng comments / campaigns. Có thể chạy định kỳ bằng cron.
+
+Chạy:  python reconcile_counters.py [--scope comments|campaigns]
+"""
+import argparse
+
+from app import create_app
+from app.status_counters import SCOPES, reconcile
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--scope", choices=sorted(SCOPES), action="append")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        drift = reconcile(args.scope)
+
+    if not drift:
+        print("✅ Bộ đếm khớp với dữ liệu")
+    for scope, statuses in drift.items():
+        for status, (old, new) in sorted(statuses.items()):
+            print(f"⚠️  {scope}.{status}: {old} -> {new}")
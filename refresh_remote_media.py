@@ -0,0 +1,33 @@
+"""
+LẤY METADATA CHO MEDIA LÀ URL NGOÀI (Cloudinary...)
+
+Gửi ranged GET / HEAD song song (giới hạn REMOTE_META_WORKERS, timeout
+REMOTE_META_TIMEOUT) cho các dòng media URL ngoài chưa có metadata hoặc đã
+quá REMOTE_META_TTL, rồi lưu size / MIME / kích thước / thời lượng vào DB.
+App cũng tự chạy việc này ở thread nền khi list_media gặp dòng hết hạn.
+
+Chạy:  python refresh_remote_media.py [--workers 8] [--timeout 5] [--batch 200]
+"""
+import argparse
+
+from app import create_app
+from app.remote_meta import refresh_stale
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int)
+    parser.add_argument("--timeout", type=float)
+    parser.add_argument("--batch", type=int, default=200)
+    args = parser.parse_args()
+
+    app = create_app()
+    if args.workers:
+        app.config['REMOTE_META_WORKERS'] = args.workers
+    if args.timeout:
+        app.config['REMOTE_META_TIMEOUT'] = args.timeout
+
+    with app.app_context():
+        ok, failed = refresh_stale(args.batch)
+
+    print(f"✅ Đã cập nhật metadata cho {ok} URL ngoài ({failed} lỗi, sẽ thử lại sau)")
@@ -1,4 +1,4 @@
-from app import create_app, db
+from app import create_app, db, status_counters
 from app.models.campaign import Campaign
 from datetime import datetime
 
@@ -82,4 +82,5 @@ with app.app_context():
             count += 1
     
     db.session.commit()
+    status_counters.reconcile(["campaigns"])  # script ghi thẳng vào bảng -> đếm lại
     print(f"✅ Đã thêm {count} chiến dịch!")
@@ -1,4 +1,5 @@
-from app import create_app, db
+from app import create_app, db, status_counters
+from app.comment_posts import resolve_titles
 from app.models.comment import Comment
 from datetime import datetime
 
@@ -100,7 +101,9 @@ with app.app_context():
                 created_at=datetime.strptime(data["created_at"], "%d/%m/%Y %H:%M")
             )
             db.session.add(cmt)
+            status_counters.comment_created(cmt)  # bộ đếm đổi cùng transaction
             count += 1
     
     db.session.commit()
+    resolve_titles(log=lambda msg: None)  # post_title -> post_id (đếm lại theo bài viết)
     print(f"✅ Đã thêm {count} bình luận vào Database!")
@@ -0,0 +1,135 @@
+import unittest
+import sys
+import os
+import gzip
+import json
+import shutil
+import tempfile
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event
+
+from app import create_app, db, status_counters, comment_ingest
+from app.models.comment import Comment
+from app.models.post import Post
+
+
+def ndjson(*records):
+    return "\n".join(r if isinstance(r, str) else json.dumps(r, ensure_ascii=False) for r in records).encode()
+
+
+class CommentIngestTest(unittest.TestCase):
+    """Test nhập bình luận NDJSON / CSV theo stream, chống trùng (source, external_id), INSERT theo lô"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.app.config['INGEST_BATCH_SIZE'] = 3
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client.post('/auth/login', data={'username': 'admin@hotel.com', 'password': 'admin123'})
+
+        self.post = Post(title='Hồ bơi vô cực')
+        db.session.add(self.post)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def post_import(self, body, query='', content_type='application/x-ndjson'):
+        return self.client.post(f'/auth/api/comments/import{query}', data=body, content_type=content_type)
+
+    def test_01_ndjson_endpoint_idempotent(self):
+        """Tên trường khác nhau theo nền tảng, trùng trong file / giữa các lần nhập, dòng lỗi"""
+        body = ndjson(
+            {'id': 'fb_1', 'message': 'Phòng đẹp quá', 'from': {'name': 'Nguyễn Văn An'},
+             'created_time': '2025-11-05T14:30:00+0700', 'post_title': 'hồ bơi  VÔ CỰC'},
+            {'id': 'fb_2', 'message': 'Giá bao nhiêu?', 'created_time': '05/11/2025 09:00',
+             'post_id': self.post.id},
+            {'id': 'fb_1', 'message': 'Phòng đẹp quá'},  # trùng trong file
+            {'id': 'fb_3'},                                # thiếu nội dung
+            '{"id": "fb_4", ',                             # JSON hỏng
+            '',
+            {'comment_id': 77, 'text': 'Ok', 'create_time': 1762300800, 'status': 'approved'},
+            {'id': 'fb_5', 'message': 'Tuyệt', 'created_time': 'hôm qua'},
+        )
+        res = self.post_import(body, '?source=fb&triage=0')
+        self.assertEqual(res.status_code, 200)
+        summary = res.get_json()
+        self.assertEqual({k: summary[k] for k in ('read', 'inserted', 'duplicates', 'invalid')},
+                         {'read': 7, 'inserted': 3, 'duplicates': 1, 'invalid': 3})
+        self.assertEqual([e['line'] for e in summary['errors']], [4, 5, 8])
+
+        first = Comment.query.filter_by(external_id='fb_1').one()
+        self.assertEqual((first.source, first.author_name, first.avatar_text), ('Facebook', 'Nguyễn Văn An', 'NA'))
+        self.assertEqual(first.created_at, datetime(2025, 11, 5, 7, 30))  # đổi về UTC
+        self.assertEqual((first.post_id, first.post_title), (self.post.id, 'hồ bơi  VÔ CỰC'))
+        self.assertEqual(Comment.query.filter_by(external_id='fb_2').one().post_title, 'Hồ bơi vô cực')
+        tiktok_style = Comment.query.filter_by(external_id='77').one()
+        self.assertEqual((tiktok_style.status, tiktok_style.created_at), ('approved', datetime(2025, 11, 5)))
+
+        # Nhập lại cả file: không thêm dòng nào; cùng external_id ở nguồn khác vẫn là bình luận khác
+        again = self.post_import(body, '?source=Facebook&triage=0').get_json()
+        self.assertEqual((again['inserted'], again['duplicates']), (0, 4))
+        other = self.post_import(ndjson({'id': 'fb_1', 'text': 'Hi', 'platform': 'zalo'}), '?triage=0').get_json()
+        self.assertEqual(other['inserted'], 1)
+
+        self.assertEqual(Comment.query.count(), 4)
+        self.assertEqual(status_counters.counts('comments')['pending'], 3)
+        self.assertEqual(db.session.get(Post, self.post.id).pending_comment_count, 2)
+        self.assertEqual(status_counters.reconcile(), {})
+        self.assertEqual(self.post_import(b'', '?format=xml').status_code, 400)
+
+    def test_02_csv_batches_executemany(self):
+        """CSV (BOM, ô nhiều dòng) -> mỗi lô một câu INSERT executemany"""
+        rows = ['﻿external_id,author,content,created_at']
+        rows += [f'tt_{i},Khách {i},"Dòng 1\nDòng 2, số {i}",2025-11-0{1 + i % 9}T08:00:00Z' for i in range(10)]
+        body = '\r\n'.join(rows).encode()
+
+        statements = []
+        listener = lambda conn, cursor, stmt, params, context, executemany: statements.append((stmt, executemany))
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            summary = self.post_import(body, '?source=TikTok&triage=0', content_type='text/csv').get_json()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        self.assertEqual((summary['inserted'], summary['invalid']), (10, 0))
+        inserts = [many for stmt, many in statements if stmt.startswith('INSERT') and 'comments' in stmt]
+        self.assertEqual(inserts, [True, True, True, False])  # 3 + 3 + 3 + 1
+        c = Comment.query.filter_by(external_id='tt_4').one()
+        self.assertEqual((c.source, c.content), ('Tiktok', 'Dòng 1\nDòng 2, số 4'))
+
+    def test_03_streaming_and_cli_path(self):
+        """Nhập theo lô trong lúc đọc (không giữ cả file); file .gz qua open_export như CLI"""
+        seen_in_db = []
+
+        def records():
+            for i in range(7):
+                seen_in_db.append(Comment.query.count())
+                yield i + 1, {'id': f'z{i}', 'text': 'Xin chào'}, None
+
+        summary = comment_ingest.ingest(records(), source='Zalo')
+        self.assertEqual(summary['inserted'], 7)
+        self.assertEqual(seen_in_db, [0, 0, 0, 3, 3, 3, 6])  # lô 3 dòng đã ghi trước khi đọc tiếp
+
+        folder = tempfile.mkdtemp()
+        try:
+            path = os.path.join(folder, 'youtube.ndjson.gz')
+            with gzip.open(path, 'wb') as f:
+                f.write(ndjson(*[{'id': f'yt{i}', 'text': 'Video hay', 'source': 'YouTube'} for i in range(5)]))
+            self.assertEqual(comment_ingest.detect_format(path), 'ndjson')
+            with comment_ingest.open_export(path) as stream:
+                summary = comment_ingest.import_stream(stream, 'ndjson', triage=False)
+        finally:
+            shutil.rmtree(folder, ignore_errors=True)
+        self.assertEqual(summary['inserted'], 5)
+        self.assertEqual(Comment.query.filter_by(source='Youtube').count(), 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
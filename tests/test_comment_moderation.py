@@ -0,0 +1,143 @@
+import unittest
+import sys
+import os
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from unittest import mock
+
+from sqlalchemy import event
+
+from app import create_app, comment_moderation, db, status_counters
+from app.models.comment import Comment
+from app.models.post import Post
+
+
+class CommentModerationTest(unittest.TestCase):
+    """Test duyệt / từ chối / xóa bình luận hàng loạt: POST /auth/api/comments/bulk"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client.post('/auth/login', data={'username': 'admin@hotel.com', 'password': 'admin123'})
+
+        self.post = Post(title='Hồ bơi vô cực tầng thượng')
+        db.session.add(self.post)
+        db.session.flush()
+        db.session.add_all([
+            Comment(author_name=f'Khách {i}', content='Đẹp quá!', source='Facebook',
+                    post_id=self.post.id, post_title=self.post.title, status='pending',
+                    created_at=datetime(2025, 11, 5, 10))
+            for i in range(2000)
+        ])
+        db.session.add_all([
+            Comment(author_name='Zalo', content='Giá phòng?', source='Zalo', post_title=self.post.title,
+                    status='approved', created_at=datetime(2025, 11, 1, 9)),
+            Comment(author_name='Web', content='Spam link', source='Website', post_title='Bài khác',
+                    status='rejected', created_at=datetime(2025, 10, 20, 9)),
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def bulk(self, payload):
+        return self.client.post('/auth/api/comments/bulk', json=payload)
+
+    def status_counts(self):
+        return dict(db.session.query(Comment.status, db.func.count()).group_by(Comment.status).all())
+
+    def test_01_ids_in_one_transaction(self):
+        """2000 id -> vài câu lệnh set-based, một lần commit"""
+        ids = [c.id for c in Comment.query.filter_by(source='Facebook')]
+        ids.append(Comment.query.filter_by(source='Zalo').one().id)
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            res = self.bulk({'action': 'approve', 'ids': ids})
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.get_json(), {
+            'action': 'approve', 'matched': 2001, 'changed': 2000,
+            'by_status': {'pending': 2000, 'approved': 1},
+        })
+        moderation = [s for s in statements if 'comments' in s]
+        self.assertLessEqual(len(moderation), 2 * 5)  # (đếm + UPDATE) x 5 lô id
+        self.assertEqual(self.status_counts(), {'approved': 2001, 'rejected': 1})
+
+    def test_02_filters(self):
+        """Lọc theo nguồn, bài viết, khoảng ngày, trạng thái"""
+        res = self.bulk({'action': 'reject', 'filter': {'source': 'Facebook', 'post_id': self.post.id}})
+        self.assertEqual(res.get_json()['by_status'], {'pending': 2000})
+
+        res = self.bulk({'action': 'delete', 'filter': {'from': '01/11/2025', 'to': '2025-11-01'}})
+        self.assertEqual(res.get_json()['changed'], 1)
+
+        res = self.bulk({'action': 'approve', 'filter': {'post_title': 'Bài khác', 'status': 'rejected'}})
+        self.assertEqual(res.get_json()['changed'], 1)
+        self.assertEqual(self.status_counts(), {'rejected': 2000, 'approved': 1})
+
+        # ids + filter: chỉ các id khớp bộ lọc
+        ids = [c.id for c in Comment.query.limit(5)]
+        res = self.bulk({'action': 'delete', 'ids': ids, 'filter': {'source': 'Website'}})
+        self.assertEqual(res.get_json()['matched'], 0)
+
+    def test_03_validation(self):
+        self.assertEqual(self.bulk({'action': 'approve'}).status_code, 400)
+        self.assertEqual(self.bulk({'action': 'archive', 'ids': [1]}).status_code, 400)
+        self.assertEqual(self.bulk({'action': 'approve', 'ids': ['x']}).status_code, 400)
+        self.assertEqual(self.bulk({'action': 'approve', 'filter': {'from': '32/13/2025'}}).status_code, 400)
+        self.assertEqual(self.bulk({'action': 'delete', 'ids': '12'}).status_code, 400)
+        self.assertEqual(self.bulk({'action': 'delete', 'ids': [True]}).status_code, 400)
+        self.assertEqual(self.bulk({'action': 'delete', 'ids': {'1': 1}}).status_code, 400)
+        self.assertEqual(Comment.query.count(), 2002)
+        self.assertEqual(self.status_counts()['pending'], 2000)
+
+
+    def test_04_duplicate_ids_across_chunks(self):
+        """Id lặp nằm ở hai lô khác nhau chỉ được tính một lần"""
+        status_counters.reconcile()
+        ids = [c.id for c in Comment.query.filter_by(source='Facebook').order_by(Comment.id)]
+        ids = ids[:comment_moderation.ID_CHUNK] + ids[:3]  # 3 id đầu lặp lại ở lô thứ hai
+
+        res = self.bulk({'action': 'reject', 'ids': ids})
+        self.assertEqual(res.get_json()['matched'], comment_moderation.ID_CHUNK)
+        self.assertEqual(res.get_json()['by_status'], {'pending': comment_moderation.ID_CHUNK})
+        self.assertEqual(status_counters.reconcile(), {})
+        self.assertEqual(db.session.get(Post, self.post.id).pending_comment_count,
+                         2000 - comment_moderation.ID_CHUNK)
+
+
+    def test_05_single_approve_between_count_and_update(self):
+        """Bình luận được duyệt lẻ xen giữa lúc đếm và lúc UPDATE -> bộ đếm không lệch"""
+        status_counters.reconcile()
+        ids = [c.id for c in Comment.query.filter_by(source='Facebook').order_by(Comment.id).limit(5)]
+        real_apply = comment_moderation._apply
+
+        def racing_apply(*args):
+            if args[1] == 'pending':
+                c = db.session.get(Comment, ids[0])
+                status_counters.comment_moved(c, 'approved')
+                c.status = 'approved'
+                db.session.flush()
+            return real_apply(*args)
+
+        with mock.patch.object(comment_moderation, '_apply', racing_apply):
+            result = comment_moderation.moderate('reject', ids=ids)
+
+        self.assertEqual((result['changed'], result['by_status']), (4, {'pending': 4}))
+        self.assertEqual(db.session.get(Comment, ids[0]).status, 'approved')
+        self.assertEqual(status_counters.reconcile(), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
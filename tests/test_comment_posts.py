@@ -0,0 +1,114 @@
+import unittest
+import sys
+import os
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event, text
+
+from app import create_app, db, status_counters
+from app.comment_posts import resolve_titles
+from app.models.comment import Comment
+from app.models.post import Post
+
+
+class CommentPostsTest(unittest.TestCase):
+    """Test Comment.post_id, migrate post_title -> post_id và bộ đếm bình luận theo bài viết"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client.post('/auth/login', data={'username': 'admin@hotel.com', 'password': 'admin123'})
+
+        # Dữ liệu kiểu seed_comments.py cũ: chỉ có post_title, tiêu đề lệch khoảng trắng / hoa thường
+        self.spa = Post(title='Spa & chăm sóc sức khỏe')
+        self.pool = Post(title='Hồ bơi vô cực')
+        db.session.add_all([self.spa, self.pool, Post(title='Trùng tên'), Post(title='trùng  tên')])
+        db.session.add_all(
+            [Comment(author_name='A', content='Hay', post_title='Spa & chăm sóc sức khỏe',
+                     status='pending', created_at=datetime(2025, 11, 1, 9, i)) for i in range(3)]
+            + [Comment(author_name='B', content='Đẹp', post_title='  SPA & chăm sóc   sức khỏe ',
+                       status='approved', created_at=datetime(2025, 11, 2))]
+            + [Comment(author_name='C', content='Ok', post_title='Hồ bơi vô cực', status='rejected'),
+               Comment(author_name='D', content='?', post_title='Trùng tên'),
+               Comment(author_name='E', content='?', post_title='Bài đã xóa')]
+        )
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def posts(self):
+        return {p['id']: p for p in self.client.get('/auth/api/posts').get_json()}
+
+    def test_01_resolve_titles(self):
+        """Tiêu đề chuẩn hóa khớp đúng một bài -> gán post_id; còn lại báo cáo"""
+        self.assertEqual(resolve_titles(dry_run=True)['resolved'], 5)
+        self.assertEqual(Comment.query.filter(Comment.post_id.isnot(None)).count(), 0)
+
+        result = resolve_titles(log=lambda msg: None)
+        self.assertEqual(result, {'resolved': 5, 'unmatched': {'Bài đã xóa': 1}, 'ambiguous': {'Trùng tên': 1}})
+        self.assertEqual(Comment.query.filter_by(post_id=self.spa.id).count(), 4)
+        self.assertEqual(resolve_titles(log=lambda msg: None)['resolved'], 0)  # chạy lại: không làm gì
+
+        posts = self.posts()
+        self.assertEqual((posts[self.spa.id]['comment_count'], posts[self.spa.id]['pending_comment_count']), (4, 3))
+        self.assertEqual((posts[self.pool.id]['comment_count'], posts[self.pool.id]['pending_comment_count']), (1, 0))
+
+        # Lọc theo bài dùng index (post_id, status, created_at)
+        res = self.client.get(f'/auth/api/comments?post_id={self.spa.id}&status=pending').get_json()
+        self.assertEqual([c['created_at'] for c in res], ['01/11/2025 09:02', '01/11/2025 09:01', '01/11/2025 09:00'])
+        self.assertEqual({c['post_id'] for c in res}, {self.spa.id})
+        plan = db.session.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id FROM comments WHERE post_id = :p AND status = 'pending' "
+            "ORDER BY created_at DESC"), {'p': self.spa.id}).fetchall()
+        self.assertIn('ix_comments_post_status_created', ' '.join(str(row) for row in plan))
+
+    def test_02_counts_follow_writes(self):
+        """Duyệt / từ chối / xóa / hàng loạt cập nhật bộ đếm theo bài, danh sách bài không JOIN"""
+        resolve_titles(log=lambda msg: None)
+        pending = [c.id for c in Comment.query.filter_by(post_id=self.spa.id, status='pending')]
+        self.client.put(f'/auth/api/comments/{pending[0]}/approve')
+        self.client.put(f'/auth/api/comments/{pending[0]}/reject')
+        self.client.delete(f'/auth/api/comments/{pending[1]}/delete')
+        self.assertEqual(self.posts()[self.spa.id]['pending_comment_count'], 1)
+
+        self.client.post('/auth/api/comments/bulk', json={'action': 'approve', 'filter': {'post_id': self.spa.id}})
+        self.client.post('/auth/api/comments/bulk', json={'action': 'delete', 'filter': {'status': 'rejected'}})
+
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            posts = self.posts()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+        self.assertEqual((posts[self.spa.id]['comment_count'], posts[self.spa.id]['pending_comment_count']), (3, 0))
+        self.assertEqual(posts[self.pool.id]['comment_count'], 0)
+        self.assertFalse([s for s in statements if 'comments' in s])
+
+        self.assertEqual(status_counters.reconcile(), {})  # không có sai lệch
+
+    def test_03_post_edit_and_delete(self):
+        """Đổi tiêu đề -> post_title đi theo; xóa bài -> bình luận còn, bỏ liên kết; reconcile sửa lệch"""
+        resolve_titles(log=lambda msg: None)
+        self.client.put(f'/auth/api/posts/{self.pool.id}', json={'title': 'Hồ bơi tầng thượng'})
+        self.assertEqual(Comment.query.filter_by(post_id=self.pool.id).one().post_title, 'Hồ bơi tầng thượng')
+
+        self.client.delete(f'/auth/api/posts/{self.spa.id}')
+        self.assertEqual(Comment.query.filter(Comment.post_id.is_(None)).count(), 6)
+
+        db.session.execute(text("UPDATE posts SET comment_count = 9, pending_comment_count = NULL"))
+        db.session.commit()
+        drift = status_counters.reconcile(['comments'])
+        self.assertEqual(drift['posts'][self.pool.id], ((9, None), (1, 0)))
+        self.assertEqual(self.posts()[self.pool.id]['comment_count'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
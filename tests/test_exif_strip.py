@@ -0,0 +1,142 @@
+import unittest
+import sys
+import os
+import io
+import hashlib
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.derivatives import job_args, process_image, save_results
+from app.models.media import Media
+from app.models.post import Post
+from app.media_meta import Image
+from app.sharding import find_upload
+from app.exif_strip import strip_jpeg, ORIENTATION_TAG
+
+
+def make_photo(width, height, orientation=1, description_size=30_000):
+    """JPEG kiểu ảnh điện thoại: EXIF lớn, comment, cờ Orientation"""
+    img = Image.new('RGB', (width, height))
+    img.putdata([((x * 7) % 256, (y * 5) % 256, (x + y) % 256) for y in range(height) for x in range(width)])
+    exif = Image.Exif()
+    exif[ORIENTATION_TAG] = orientation
+    exif[0x010E] = 'x' * description_size  # ImageDescription
+    exif[0x010F] = 'PhoneMaker'
+    buf = io.BytesIO()
+    img.save(buf, 'JPEG', quality=90, exif=exif.tobytes(), comment=b'chup tai sanh khach san')
+    return buf.getvalue()
+
+
+@unittest.skipIf(Image is None, "Cần Pillow")
+class ExifStripTest(unittest.TestCase):
+    """Test bỏ EXIF, xoay ảnh theo Orientation và báo cáo dung lượng giảm được"""
+
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+        self.app = create_app('testing')
+        self.app.config['UPLOAD_FOLDER'] = self.upload_dir
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client.post('/auth/login', data={'username': 'admin@hotel.com', 'password': 'admin123'})
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.upload_dir, ignore_errors=True)
+
+    def upload(self, data, name='phong.jpg'):
+        res = self.client.post('/auth/api/upload-thumbnail', data={'file': (io.BytesIO(data), name)},
+                               content_type='multipart/form-data')
+        return db.session.get(Media, res.get_json()['media_id'])
+
+    def test_01_lossless_strip(self):
+        """Orientation = 1: bỏ EXIF + comment ở mức byte, pixel giữ nguyên"""
+        data = make_photo(64, 48)
+        media = self.upload(data)
+        path = find_upload(media.filename)
+        with open(path, 'rb') as f:
+            stored = f.read()
+
+        self.assertGreater(media.bytes_saved, 30_000)
+        self.assertEqual(len(stored), len(data) - media.bytes_saved)
+        # Đã bỏ metadata trước khi URL (immutable) được trả về: lần tải đầu tiên đã là bản sạch
+        served = self.client.get(f'/uploads/{media.filename}')
+        self.assertEqual(served.data, stored)
+        self.assertIn(media.sha256, served.headers['ETag'])
+        served.close()
+        self.assertEqual((media.size, media.sha256), (len(stored), hashlib.sha256(stored).hexdigest()))
+        with Image.open(path) as img, Image.open(io.BytesIO(data)) as original:
+            self.assertEqual(len(img.getexif()), 0)
+            self.assertNotIn('comment', img.info)
+            self.assertEqual(img.tobytes(), original.tobytes())
+
+        # Ảnh phụ (MPF) nằm sau EOI của ảnh chính cũng bị cắt
+        self.assertEqual(strip_jpeg(stored + b'\xff\xd8\xff\xe2preview'), stored)
+
+    def test_02_orientation_applied(self):
+        """Orientation = 6 (xoay 90°): pixel được xoay, width/height và variant đúng chiều"""
+        media = self.upload(make_photo(200, 100, orientation=6))
+        self.assertEqual((media.width, media.height), (100, 200))
+        self.assertIsNotNone(media.bytes_saved)
+        with Image.open(find_upload(media.filename)) as img:
+            self.assertEqual(img.size, (100, 200))
+            self.assertNotIn(ORIENTATION_TAG, img.getexif())
+        variant = media.variants[0]
+        with Image.open(os.path.join(self.upload_dir, *variant.filename.split('/'))) as img:
+            self.assertLess(img.width, img.height)
+
+    def test_03_png_and_report(self):
+        """PNG bỏ chunk text; API tổng hợp dung lượng giảm được"""
+        from PIL.PngImagePlugin import PngInfo
+
+        info = PngInfo()
+        info.add_text('Comment', 'y' * 5000)
+        buf = io.BytesIO()
+        Image.new('RGB', (32, 32), (10, 20, 30)).save(buf, 'PNG', pnginfo=info)
+        png = self.upload(buf.getvalue(), 'sanh.png')
+        self.assertGreater(png.bytes_saved, 5000)
+
+        jpeg = self.upload(make_photo(64, 48))
+        self.app.config['STRIP_IMAGE_METADATA'] = False
+        untouched = self.upload(make_photo(64, 48, description_size=10))
+        self.assertIsNone(untouched.bytes_saved)
+
+        report = self.client.get('/auth/api/media/metadata-savings').get_json()
+        self.assertEqual(report['processed'], 2)
+        self.assertEqual(report['files_reduced'], 2)
+        self.assertEqual(report['bytes_saved'], png.bytes_saved + jpeg.bytes_saved)
+        self.assertEqual(report['original_bytes'], png.size + jpeg.size + report['bytes_saved'])
+
+    def test_04_backfill_never_rewrites_published_url(self):
+        """Ảnh cũ: bản sạch mang tên mới, bài viết trỏ sang tên mới, file cũ giữ nguyên bytes"""
+        self.app.config['STRIP_IMAGE_METADATA'] = False
+        data = make_photo(64, 48, orientation=6)
+        media = self.upload(data)
+        old_name, old_url = media.filename, f'/uploads/{media.filename}'
+        post = Post(title='Phòng', image=old_url, content=f'<img src="{old_url}">')
+        db.session.add(post)
+        db.session.commit()
+
+        self.app.config['STRIP_IMAGE_METADATA'] = True
+        save_results(media.id, process_image(*job_args(media)))
+        media = db.session.get(Media, media.id)
+
+        self.assertNotEqual(media.filename, old_name)
+        with open(find_upload(old_name), 'rb') as f:
+            self.assertEqual(f.read(), data)
+        with Image.open(find_upload(media.filename)) as img:
+            self.assertEqual(img.size, (48, 64))
+            self.assertNotIn(ORIENTATION_TAG, img.getexif())
+        self.assertEqual(post.image, f'/uploads/{media.filename}')
+        self.assertEqual(post.content, f'<img src="/uploads/{media.filename}">')
+        stem = os.path.splitext(media.filename)[0]
+        self.assertTrue(all(stem in v.filename for v in media.variants))
+
+
+if __name__ == '__main__':
+    unittest.main()
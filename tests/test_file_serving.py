@@ -0,0 +1,82 @@
+import unittest
+import sys
+import os
+import io
+import hashlib
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+
+
+class FileServingTest(unittest.TestCase):
+    """Test phục vụ file upload: ETag, 304, Range, immutable, X-Accel-Redirect"""
+
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+        self.app = create_app('testing')
+        self.app.config['UPLOAD_FOLDER'] = self.upload_dir
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        self.client.post('/auth/login', data={
+            'username': 'admin@hotel.com',
+            'password': 'admin123'
+        })
+        self.data = b'\x00\x00\x00\x18ftypisom\x00\x00\x02\x00isomiso2' + os.urandom(4072)
+        res = self.client.post('/auth/api/upload-thumbnail', data={
+            'file': (io.BytesIO(self.data), 'tour.mp4')
+        }, content_type='multipart/form-data')
+        self.url = res.get_json()['url']
+        self.sha = hashlib.sha256(self.data).hexdigest()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.upload_dir, ignore_errors=True)
+
+    def test_01_strong_etag_and_immutable(self):
+        """ETag mạnh = sha256, Cache-Control immutable, ở cả hai route"""
+        for url in (self.url, '/auth' + self.url):
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, 200)
+            self.assertEqual(res.headers['ETag'], f'"{self.sha}"')
+            self.assertIn('immutable', res.headers['Cache-Control'])
+            self.assertEqual(res.headers['Content-Type'], 'video/mp4')
+            res.close()
+
+    def test_02_not_modified(self):
+        """If-None-Match khớp -> 304"""
+        res = self.client.get(self.url, headers={'If-None-Match': f'"{self.sha}"'})
+        self.assertEqual(res.status_code, 304)
+
+    def test_03_range(self):
+        """Range -> 206 đúng đoạn bytes"""
+        res = self.client.get(self.url, headers={'Range': 'bytes=100-199'})
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(res.data, self.data[100:200])
+        self.assertEqual(res.headers['Content-Range'], 'bytes 100-199/4096')
+        res.close()
+
+    def test_04_x_accel_redirect(self):
+        """MEDIA_OFFLOAD=x-accel -> nginx đẩy file, body rỗng"""
+        self.app.config['MEDIA_OFFLOAD'] = 'x-accel'
+        res = self.client.get(self.url)
+        name = self.url[len('/uploads/'):]
+        self.assertEqual(res.headers['X-Accel-Redirect'], f'/_uploads/{name[:2]}/{name[2:4]}/{name}')
+        self.assertEqual(res.data, b'')
+        self.assertEqual(self.client.get(self.url, headers={'If-None-Match': f'"{self.sha}"'}).status_code, 304)
+
+    def test_05_hidden_folders(self):
+        """Không lộ file trong thư mục ẩn (.partial ...)"""
+        os.makedirs(os.path.join(self.upload_dir, '.partial'))
+        open(os.path.join(self.upload_dir, '.partial', 'x.part'), 'wb').close()
+        self.assertEqual(self.client.get('/uploads/.partial/x.part').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models.media import Media
+from app.models.media_variant import MediaVariant
+from app.models.post import Post
+from gc_uploads import run
+
+
+class GcUploadsTest(unittest.TestCase):
+    """Test job dọn file mồ côi trong uploads/"""
+
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+        self.app = create_app('testing')
+        self.app.config['UPLOAD_FOLDER'] = self.upload_dir
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.upload_dir, ignore_errors=True)
+
+    def touch(self, rel, age_hours=48, size=100):
+        path = os.path.join(self.upload_dir, *rel.split('/'))
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(b'x' * size)
+        old = time.time() - age_hours * 3600
+        os.utime(path, (old, old))
+
+    def test_01_report_and_quarantine(self):
+        """Chỉ file không ai tham chiếu và đủ cũ mới bị cách ly"""
+        media = Media(filename='aaaa0001.jpg', type='image')
+        db.session.add(media)
+        db.session.add(Post(title='Ảnh bài viết', image='/uploads/bbbb0002.jpg'))
+        db.session.add(Post(title='Ảnh đã mất', image='/uploads/dddd0004.jpg'))
+        db.session.commit()
+        db.session.add(MediaVariant(media_id=media.id, width=160, format='webp',
+                                    filename='variants/aa/aa/aaaa0001_160.webp'))
+        db.session.commit()
+
+        self.touch('aa/aa/aaaa0001.jpg')                    # Media (shard)
+        self.touch('bbbb0002.jpg')                          # Post.image (bố cục phẳng)
+        self.touch('variants/aa/aa/aaaa0001_160.webp')      # MediaVariant
+        self.touch('cc/cc/cccc0003.jpg', size=300)          # mồ côi
+        self.touch('eeee0005.mp4', age_hours=1)             # mồ côi nhưng còn trong thời gian ân hạn
+        self.touch('.partial/deadbeef.part', size=50)       # phiên upload không còn
+
+        count, size, dangling = run(self.upload_dir, batch_size=2, do_quarantine=True,
+                                    log=lambda *_: None)
+        self.assertEqual((count, size, dangling), (2, 350, 1))
+
+        quarantined = os.path.join(self.upload_dir, '.quarantine')
+        self.assertTrue(os.path.isfile(os.path.join(quarantined, 'cc', 'cc', 'cccc0003.jpg')))
+        self.assertTrue(os.path.isfile(os.path.join(quarantined, '.partial', 'deadbeef.part')))
+        for rel in ('aa/aa/aaaa0001.jpg', 'bbbb0002.jpg', 'eeee0005.mp4'):
+            self.assertTrue(os.path.isfile(os.path.join(self.upload_dir, *rel.split('/'))), rel)
+
+    def test_02_report_only(self):
+        """Mặc định chỉ báo cáo, không di chuyển file"""
+        self.touch('ffff0006.jpg')
+        count, _, _ = run(self.upload_dir, log=lambda *_: None)
+        self.assertEqual(count, 1)
+        self.assertTrue(os.path.isfile(os.path.join(self.upload_dir, 'ffff0006.jpg')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,134 @@
+import unittest
+import sys
+import os
+from datetime import datetime
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db, derivatives, remote_cache, storage
+from app.media_meta import format_size
+from app.models.campaign import Campaign
+from app.models.comment import Comment
+from app.models.media import Media
+from app.models.post import Post
+from app.routes import EMPTY_PLACEHOLDER
+
+
+def post_item(p, variants, placeholders):
+    """Định dạng list_posts trước khi chuyển sang projection (dựng từ object ORM)"""
+    item = {
+        "id": p.id,
+        "title": p.title,
+        "status": p.status,
+        "publish_at": p.publish_at.strftime("%d/%m/%Y") if p.publish_at else None,
+        "image": p.image,
+        "category": p.category,
+        "author": p.author,
+        "comment_count": p.comment_count or 0,
+        "pending_comment_count": p.pending_comment_count or 0,
+        "image_variants": variants.get(p.image, {}),
+    }
+    item.update(placeholders.get(p.image, EMPTY_PLACEHOLDER))
+    return item
+
+
+def media_item(m, variants):
+    """Định dạng list_media trước khi chuyển sang projection (dựng từ object ORM)"""
+    return {
+        "id": m.id,
+        "filename": m.filename,
+        "type": m.type,
+        "url": remote_cache.media_url(m.id, m.filename),
+        "created_at": m.created_at.strftime("%d/%m/%Y"),
+        "size": "Online" if m.size is None and storage.is_external(m.filename) else format_size(m.size),
+        "size_bytes": m.size,
+        "mime_type": m.mime_type,
+        "width": m.width,
+        "height": m.height,
+        "duration": m.duration,
+        "sha256": m.sha256,
+        "uploader_id": m.user_id,
+        "blurhash": m.blurhash,
+        "dominant_color": m.dominant_color,
+        "bytes_saved": m.bytes_saved,
+        "variants": variants.get(m.id, {}),
+    }
+
+
+class ListProjectionTest(unittest.TestCase):
+    """Test các API danh sách đọc bằng projection trả đúng payload như khi đọc object ORM"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client.post('/auth/login', data={'username': 'admin@hotel.com', 'password': 'admin123'})
+
+        post = Post(title='Phòng Deluxe', author='Admin', status='published',
+                    publish_at=datetime(2025, 11, 20, 8), comment_count=2, pending_comment_count=1)
+        db.session.add_all([post, Post(title='Bản nháp', image=None, category=None)])
+        db.session.flush()
+        db.session.add_all([
+            Comment(author_name='Khách', author_email='khach@hotel.com', avatar_text='KH',
+                    avatar_bg='#e0e7ff', source='Facebook', external_id='fb_1', content='Đẹp quá!',
+                    post_id=post.id, post_title=post.title, spam_score=0.25,
+                    created_at=datetime(2025, 11, 5, 14, 30)),
+            Comment(author_name='Spam', content='Click here', source='Website', status='rejected',
+                    auto_moderated=True, created_at=datetime(2025, 11, 4, 22, 30)),
+        ])
+        db.session.add_all([
+            Campaign(name='Ưu đãi mùa lễ hội', platform='facebook', budget=1500.5, spent=200,
+                     reach=1234567, clicks=4321, conversions=12,
+                     start_date=datetime(2025, 12, 1), end_date=datetime(2025, 12, 31)),
+            Campaign(name='Chưa lên lịch', platform='google', status='scheduled'),
+        ])
+        db.session.add_all([
+            Media(filename='phong.jpg', type='image', size=2048, mime_type='image/jpeg',
+                  width=1200, height=800, sha256='ab' * 32, blurhash='LEHV6nWB2yk8',
+                  dominant_color='#0a78c8', bytes_saved=512),
+            Media(filename='https://res.cloudinary.com/demo/video/upload/tour.mp4', type='video'),
+        ])
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def get(self, url):
+        res = self.client.get(url)
+        self.assertEqual(res.status_code, 200)
+        return res.get_json()
+
+    def test_01_posts(self):
+        items = self.get('/auth/api/posts')
+        self.assertEqual(len(items), Post.query.count())
+        images = {item['image'] for item in items}
+        variants = derivatives.variants_by_image_urls(images)
+        placeholders = derivatives.placeholders_by_image_urls(images)
+        for item in items:
+            self.assertEqual(item, post_item(db.session.get(Post, item['id']), variants, placeholders))
+
+    def test_02_comments(self):
+        items = self.get('/auth/api/comments')
+        self.assertEqual(len(items), 2)
+        for item in items:
+            self.assertEqual(item, db.session.get(Comment, item['id']).to_dict())
+
+    def test_03_campaigns(self):
+        items = self.get('/auth/api/campaigns')
+        self.assertEqual(len(items), 2)
+        for item in items:
+            self.assertEqual(item, db.session.get(Campaign, item['id']).to_dict())
+
+    def test_04_media(self):
+        items = self.get('/auth/api/media')
+        self.assertEqual(len(items), 2)
+        variants = derivatives.variants_by_media_ids([item['id'] for item in items])
+        for item in items:
+            self.assertEqual(item, media_item(db.session.get(Media, item['id']), variants))
+
+
+if __name__ == '__main__':
+    unittest.main()
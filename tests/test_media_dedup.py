@@ -0,0 +1,103 @@
+import unittest
+import sys
+import os
+import io
+import shutil
+import tempfile
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db, dedup
+from app.models.media import Media
+from app.models.media_blob import MediaBlob
+from app.models.post import Post
+
+
+class MediaDedupTest(unittest.TestCase):
+    """Test lưu trữ theo nội dung (MEDIA_DEDUP) và job gộp file trùng"""
+
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+        self.app = create_app('testing')
+        self.app.config['UPLOAD_FOLDER'] = self.upload_dir
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        self.client.post('/auth/login', data={
+            'username': 'admin@hotel.com',
+            'password': 'admin123'
+        })
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.upload_dir, ignore_errors=True)
+
+    def stored_files(self):
+        """Tên các file trên đĩa (kể cả trong thư mục shard)"""
+        return sorted(f for _, _, files in os.walk(self.upload_dir) for f in files)
+
+    def upload(self, data, name='phong.jpg'):
+        res = self.client.post('/auth/api/upload-thumbnail', data={
+            'file': (io.BytesIO(data), name)
+        }, content_type='multipart/form-data')
+        return res.get_json()['media_id']
+
+    def test_01_shared_blob_refcount(self):
+        """Cùng nội dung -> 1 file; chỉ xóa file khi xóa tham chiếu cuối"""
+        self.app.config['MEDIA_DEDUP'] = True
+        ids = [self.upload(b'\xff\xd8\xffsame-photo-bytes') for _ in range(3)]
+
+        filenames = {db.session.get(Media, i).filename for i in ids}
+        self.assertEqual(len(filenames), 1)
+        self.assertEqual(self.stored_files(), list(filenames))
+        self.assertEqual(MediaBlob.query.one().ref_count, 3)
+
+        self.client.delete(f'/auth/api/media/{ids[0]}')
+        self.client.delete(f'/auth/api/media/{ids[1]}')
+        self.assertEqual(len(self.stored_files()), 1)
+        self.assertEqual(MediaBlob.query.one().ref_count, 1)
+
+        self.client.delete(f'/auth/api/media/{ids[2]}')
+        self.assertEqual(self.stored_files(), [])
+        self.assertEqual(MediaBlob.query.count(), 0)
+
+    def test_02_dedup_job(self):
+        """Job gộp file trùng đã upload ở chế độ thường, cập nhật cả Post.image"""
+        from dedup_uploads import dedup
+
+        data = b'\xff\xd8\xff' + b'x' * 4997
+        ids = [self.upload(data) for _ in range(3)]
+        self.upload(b'\xff\xd8\xffother-photo')
+        old = db.session.get(Media, ids[2]).filename
+        db.session.add(Post(title='Bài có ảnh trùng', image=f'/uploads/{old}'))
+        db.session.commit()
+
+        removed, reclaimed = dedup(self.upload_dir)
+        self.assertEqual((removed, reclaimed), (2, 10000))
+        self.assertEqual(len(self.stored_files()), 2)
+
+        keep = db.session.get(Media, ids[0]).filename
+        self.assertEqual({db.session.get(Media, i).filename for i in ids}, {keep})
+        self.assertEqual(Post.query.filter_by(title='Bài có ảnh trùng').one().image, f'/uploads/{keep}')
+        self.assertEqual(MediaBlob.query.filter_by(filename=keep).one().ref_count, 3)
+
+
+    def test_03_concurrent_first_uploads(self):
+        """Hai upload cùng nội dung mới đều không thấy blob -> một blob ref_count 2, không lỗi unique"""
+        self.app.config['MEDIA_DEDUP'] = True
+        data = b'\xff\xd8\xffbrand-new-photo'
+        with mock.patch.object(dedup.db.session, 'get', return_value=None):
+            ids = [self.upload(data, 'phong.jpg'), self.upload(data, 'phong.jpeg')]
+
+        filenames = {db.session.get(Media, i).filename for i in ids}
+        self.assertEqual(len(filenames), 1)
+        self.assertEqual(self.stored_files(), list(filenames))
+        self.assertEqual(MediaBlob.query.one().ref_count, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+import unittest
+import sys
+import os
+import io
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models.media import Media
+from app.models.post import Post
+from app.media_meta import Image
+
+
+@unittest.skipIf(Image is None, "Cần Pillow")
+class MediaDerivativesTest(unittest.TestCase):
+    """Test tạo ảnh thu nhỏ WebP/JPEG và trả URL theo kích thước"""
+
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+        self.app = create_app('testing')
+        self.app.config['UPLOAD_FOLDER'] = self.upload_dir
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        self.client.post('/auth/login', data={
+            'username': 'admin@hotel.com',
+            'password': 'admin123'
+        })
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.upload_dir, ignore_errors=True)
+
+    def upload_image(self, width, height, mode='RGB'):
+        buf = io.BytesIO()
+        Image.new(mode, (width, height), (200, 100, 50, 255)[:len(mode)]).save(buf, 'PNG')
+        res = self.client.post('/auth/api/upload-thumbnail', data={
+            'file': (io.BytesIO(buf.getvalue()), 'phong.png')
+        }, content_type='multipart/form-data')
+        return res.get_json()
+
+    def test_01_variants_created(self):
+        """Ảnh 2000px -> 3 kích thước x 2 định dạng, trả về trong list_media"""
+        media_id = self.upload_image(2000, 1000)['media_id']
+
+        item = next(m for m in self.client.get('/auth/api/media').get_json() if m['id'] == media_id)
+        self.assertEqual(set(item['variants']), {'160', '480', '1280'})
+        self.assertEqual(set(item['variants']['480']), {'webp', 'jpeg'})
+
+        for size in item['variants'].values():
+            for url in size.values():
+                path = os.path.join(self.upload_dir, url[len('/uploads/'):])
+                self.assertTrue(os.path.isfile(path))
+
+        with Image.open(os.path.join(self.upload_dir, item['variants']['480']['webp'][9:])) as img:
+            self.assertEqual(img.size, (480, 240))
+
+    def test_02_small_image_not_upscaled(self):
+        """Ảnh nhỏ (RGBA 300px) chỉ có bản 160, không phóng to"""
+        media_id = self.upload_image(300, 300, mode='RGBA')['media_id']
+        media = db.session.get(Media, media_id)
+        self.assertEqual({v.width for v in media.variants}, {160})
+
+    def test_03_post_image_variants_and_delete(self):
+        """list_posts trả image_variants; xóa media xóa luôn file thu nhỏ"""
+        data = self.upload_image(1600, 900)
+        db.session.add(Post(title='Phòng mới', image=data['url']))
+        db.session.commit()
+
+        posts = self.client.get('/auth/api/posts').get_json()
+        post = next(p for p in posts if p['title'] == 'Phòng mới')
+        self.assertIn('1280', post['image_variants'])
+
+        self.client.delete(f"/auth/api/media/{data['media_id']}")
+        variant_dir = os.path.join(self.upload_dir, 'variants')
+        self.assertEqual([f for _, _, files in os.walk(variant_dir) for f in files], [])
+
+
+if __name__ == '__main__':
+    unittest.main()
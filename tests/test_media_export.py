@@ -0,0 +1,116 @@
+import unittest
+import sys
+import os
+import io
+import shutil
+import tempfile
+import zipfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models.media import Media
+from app.sharding import find_upload
+from app.zip_stream import ZipEntry, ZipStream, ZIP_STORED, ZIP_DEFLATED
+
+
+class MediaExportTest(unittest.TestCase):
+    """Test xuất ZIP stream: GET /auth/api/media/export"""
+
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+        self.app = create_app('testing')
+        self.app.config['UPLOAD_FOLDER'] = self.upload_dir
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        self.client.post('/auth/login', data={
+            'username': 'admin@hotel.com',
+            'password': 'admin123'
+        })
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.upload_dir, ignore_errors=True)
+
+    def upload(self, data, name):
+        res = self.client.post('/auth/api/upload-thumbnail', data={'file': (io.BytesIO(data), name)},
+                               content_type='multipart/form-data')
+        return res.get_json()['media_id']
+
+    def test_01_stored_with_content_length(self):
+        """JPEG / MP4 -> STORED, có Content-Length đúng, giải nén ra đúng bytes"""
+        photo = b'\xff\xd8\xff' + os.urandom(150_000)
+        video = b'\x00\x00\x00\x18ftypisom\x00\x00\x02\x00isomiso2' + os.urandom(300_000)
+        photo_id = self.upload(photo, 'phong.jpg')
+        self.upload(video, 'tour.mp4')
+
+        res = self.client.get('/auth/api/media/export')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.mimetype, 'application/zip')
+        self.assertEqual(int(res.headers['Content-Length']), len(res.data))
+
+        with zipfile.ZipFile(io.BytesIO(res.data)) as zf:
+            self.assertIsNone(zf.testzip())
+            infos = {i.filename.split('/')[0]: i for i in zf.infolist()}
+            self.assertEqual(set(infos), {'images', 'videos'})
+            self.assertEqual(zf.read(infos['images']), photo)
+            self.assertEqual(zf.read(infos['videos']), video)
+            self.assertTrue(all(i.compress_type == ZIP_STORED for i in infos.values()))
+
+        # Chọn theo ids
+        res = self.client.get(f'/auth/api/media/export?ids={photo_id}')
+        with zipfile.ZipFile(io.BytesIO(res.data)) as zf:
+            self.assertEqual(len(zf.namelist()), 1)
+        self.assertEqual(self.client.get('/auth/api/media/export?ids=a,b').status_code, 400)
+        self.assertEqual(self.client.get('/auth/api/media/export?type=none').status_code, 404)
+
+    def test_02_deflated_is_chunked(self):
+        """Định dạng chưa nén -> DEFLATED, không biết trước độ dài"""
+        text = b'<svg xmlns="http://www.w3.org/2000/svg">' + b"<text>khach san</text>" * 10_000 + b"</svg>"
+        self.upload(text, 'bang-gia.svg')
+        res = self.client.get('/auth/api/media/export')
+        self.assertNotIn('Content-Length', res.headers)
+        with zipfile.ZipFile(io.BytesIO(res.data)) as zf:
+            info = zf.infolist()[0]
+            self.assertEqual(info.compress_type, ZIP_DEFLATED)
+            self.assertLess(info.compress_size, len(text) // 10)
+            self.assertEqual(zf.read(info), text)
+
+    def test_03_zip64_entries(self):
+        """Entry không rõ kích thước dùng ZIP64 vẫn đọc được bằng zipfile"""
+        data = os.urandom(10_000)
+        archive = ZipStream([
+            ZipEntry("a.mp4", lambda: io.BytesIO(data)),
+            ZipEntry("b.jpg", lambda: io.BytesIO(data), size=len(data)),
+        ])
+        self.assertIsNone(archive.content_length())
+        with zipfile.ZipFile(io.BytesIO(b"".join(archive))) as zf:
+            self.assertIsNone(zf.testzip())
+            self.assertEqual(zf.read("a.mp4"), data)
+            self.assertEqual(zf.read("b.jpg"), data)
+
+
+    def test_04_missing_file_skipped(self):
+        """Media còn trong DB (có size) nhưng file đã mất -> bỏ qua, ZIP vẫn nguyên vẹn"""
+        photo = b'\xff\xd8\xff' + os.urandom(50_000)
+        self.upload(photo, 'phong.jpg')
+        lost_id = self.upload(b'\xff\xd8\xff' + os.urandom(50_000), 'mat.jpg')
+        os.remove(find_upload(db.session.get(Media, lost_id).filename))
+
+        res = self.client.get('/auth/api/media/export')
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.headers['X-Skipped-Media'], '1')
+        self.assertEqual(int(res.headers['Content-Length']), len(res.data))
+        with zipfile.ZipFile(io.BytesIO(res.data)) as zf:
+            self.assertIsNone(zf.testzip())
+            self.assertEqual([zf.read(n) for n in zf.namelist()], [photo])
+
+        self.assertEqual(self.client.get(f'/auth/api/media/export?ids={lost_id}').status_code, 404)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import unittest
+import sys
+import os
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import text
+
+from app import create_app, db
+from app.models.media import Media
+
+
+class MediaPaginationTest(unittest.TestCase):
+    """Test phân trang + bộ lọc cho GET /auth/api/media"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        base = datetime(2025, 1, 1)
+        for i in range(30):
+            db.session.add(Media(
+                filename=f"{i:032x}.{'mp4' if i % 3 == 0 else 'jpg'}",
+                type="video" if i % 3 == 0 else "image",
+                created_at=base + timedelta(days=i),
+                size=i * 1000,
+                user_id=1 if i % 2 else None,
+            ))
+        db.session.commit()
+
+        self.client.post('/auth/login', data={
+            'username': 'admin@hotel.com',
+            'password': 'admin123'
+        })
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _walk(self, query=""):
+        ids, cursor = [], None
+        while True:
+            url = f"/auth/api/media?limit=4{query}"
+            if cursor:
+                url += f"&cursor={cursor}"
+            res = self.client.get(url)
+            self.assertEqual(res.status_code, 200, res.get_json())
+            data = res.get_json()
+            self.assertLessEqual(len(data["items"]), 4)
+            ids += [m["id"] for m in data["items"]]
+            cursor = data["next_cursor"]
+            if not cursor:
+                return ids
+
+    def expected(self, *criteria):
+        return [m.id for m in Media.query.filter(*criteria).order_by(Media.id.desc())]
+
+    def test_01_walk_all_pages(self):
+        """Duyệt hết các trang = toàn bộ thư viện theo id giảm dần"""
+        self.assertEqual(self._walk(), self.expected())
+
+    def test_02_filters(self):
+        """Lọc theo type, khoảng ngày, người upload, dung lượng"""
+        self.assertEqual(self._walk("&type=video"), self.expected(Media.type == "video"))
+        self.assertEqual(
+            self._walk("&from=05/01/2025&to=2025-01-10"),
+            self.expected(Media.created_at >= datetime(2025, 1, 5),
+                          Media.created_at < datetime(2025, 1, 11)))
+        self.assertEqual(self._walk("&uploader=1&type=image"),
+                         self.expected(Media.user_id == 1, Media.type == "image"))
+        self.assertEqual(self._walk("&min_size=5000&max_size=12000"),
+                         self.expected(Media.size >= 5000, Media.size <= 12000))
+
+    def test_03_legacy_and_errors(self):
+        """Không có limit/cursor -> mảng như cũ; tham số sai -> 400"""
+        data = self.client.get("/auth/api/media?type=image").get_json()
+        self.assertEqual([m["id"] for m in data], self.expected(Media.type == "image"))
+        self.assertEqual(self.client.get("/auth/api/media?cursor=!!").status_code, 400)
+        self.assertEqual(self.client.get("/auth/api/media?from=abc").status_code, 400)
+        self.assertEqual(self.client.get("/auth/api/media?min_size=x").status_code, 400)
+
+    def test_04_uses_index(self):
+        """Trang lọc theo type dùng index (type, id), không quét cả bảng"""
+        plan = db.session.execute(text(
+            "EXPLAIN QUERY PLAN SELECT id FROM media WHERE type = 'image' "
+            "AND id < 100 ORDER BY id DESC LIMIT 21"
+        )).fetchall()
+        self.assertIn("ix_media_type_id", " ".join(str(row) for row in plan))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import unittest
+import sys
+import os
+import io
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models.post import Post
+from app.media_meta import Image
+
+BASE83 = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~"
+
+
+def decode83(text):
+    value = 0
+    for ch in text:
+        value = value * 83 + BASE83.index(ch)
+    return value
+
+
+class MediaPlaceholdersTest(unittest.TestCase):
+    """Test BlurHash + màu chủ đạo tính trong pipeline ảnh"""
+
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+        self.app = create_app('testing')
+        self.app.config['UPLOAD_FOLDER'] = self.upload_dir
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        self.client.post('/auth/login', data={
+            'username': 'admin@hotel.com',
+            'password': 'admin123'
+        })
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.upload_dir, ignore_errors=True)
+
+    @unittest.skipIf(Image is None, "Cần Pillow")
+    def test_01_list_media_and_posts(self):
+        """list_media và list_posts trả blurhash + dominant_color của ảnh"""
+        img = Image.new("RGB", (300, 200), (200, 30, 40))
+        img.paste((20, 20, 20), (0, 0, 60, 40))  # góc nhỏ màu khác
+        buf = io.BytesIO()
+        img.save(buf, format="PNG")
+        buf.seek(0)
+        url = self.client.post('/auth/api/upload-thumbnail', data={'file': (buf, 'phong.png')},
+                               content_type='multipart/form-data').get_json()['url']
+
+        item = self.client.get('/auth/api/media').get_json()[0]
+        self.assertEqual(item['dominant_color'], '#c81e28')
+
+        blurhash = item['blurhash']
+        self.assertEqual(len(blurhash), 4 + 2 * 4 * 3)       # 4x3 thành phần
+        self.assertEqual(decode83(blurhash[0]), 3 + 2 * 9)   # cờ kích thước
+        dc = decode83(blurhash[2:6])
+        r, g, b = dc >> 16, (dc >> 8) & 255, dc & 255
+        self.assertTrue(r > 150 and g < 80 and b < 80, (r, g, b))  # màu trung bình vẫn đỏ
+
+        db.session.add(Post(title="Phòng mới", image=url))
+        db.session.commit()
+        posts = {p['image']: p for p in self.client.get('/auth/api/posts').get_json()}
+        self.assertEqual(posts[url]['blurhash'], blurhash)
+        self.assertEqual(posts[url]['dominant_color'], '#c81e28')
+        self.assertIsNone(posts['/static/images/phong1.png']['blurhash'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+import sys
+import os
+import io
+import random
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db, image_hash
+from app.models.media import Media
+from app.media_meta import Image
+
+
+def room_photo(seed, size=(480, 360)):
+    """Ảnh giả lập: các khối màu ngẫu nhiên (cố định theo seed)"""
+    from PIL import ImageDraw
+    rnd = random.Random(seed)
+    img = Image.new("RGB", size, (200, 200, 200))
+    draw = ImageDraw.Draw(img)
+    for _ in range(25):
+        x, y = rnd.randrange(size[0]), rnd.randrange(size[1])
+        w, h = rnd.randrange(40, 200), rnd.randrange(40, 160)
+        draw.rectangle([x, y, x + w, y + h], fill=tuple(rnd.randrange(256) for _ in range(3)))
+    return img
+
+
+class MediaSimilarTest(unittest.TestCase):
+    """Test perceptual hash + GET /auth/api/media/<id>/similar"""
+
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+        self.app = create_app('testing')
+        self.app.config['UPLOAD_FOLDER'] = self.upload_dir
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        self.client.post('/auth/login', data={
+            'username': 'admin@hotel.com',
+            'password': 'admin123'
+        })
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.upload_dir, ignore_errors=True)
+
+    def upload(self, img, name, **save_args):
+        buf = io.BytesIO()
+        img.save(buf, **save_args)
+        buf.seek(0)
+        res = self.client.post('/auth/api/upload-thumbnail', data={'file': (buf, name)},
+                               content_type='multipart/form-data')
+        return res.get_json()['media_id']
+
+    @unittest.skipIf(Image is None, "Cần Pillow")
+    def test_01_recompressed_and_cropped(self):
+        """Bản nén lại / cắt nhẹ được tìm thấy, ảnh khác thì không"""
+        original = room_photo(1)
+        base = self.upload(original, 'phong.png', format='PNG')
+        recompressed = self.upload(original, 'phong.jpg', format='JPEG', quality=40)
+        w, h = original.size
+        cropped = self.upload(original.crop((6, 5, w - 6, h - 5)).resize((400, 300)),
+                              'phong-crop.jpg', format='JPEG', quality=85)
+        other = self.upload(room_photo(2), 'spa.png', format='PNG')
+
+        self.assertIsNotNone(db.session.get(Media, base).phash)
+        res = self.client.get(f'/auth/api/media/{base}/similar')
+        self.assertEqual(res.status_code, 200)
+        found = {m['id']: m['distance'] for m in res.get_json()}
+        self.assertIn(recompressed, found)
+        self.assertIn(cropped, found)
+        self.assertNotIn(other, found)
+        self.assertEqual(self.client.get('/auth/api/media/999/similar').status_code, 404)
+
+    def test_02_index_lookup_matches_full_scan(self):
+        """Multi-index hashing cho cùng kết quả với quét toàn bộ"""
+        rnd = random.Random(7)
+        query = rnd.getrandbits(64)
+        hashes = []
+        for i in range(400):
+            value = query
+            for bit in rnd.sample(range(64), rnd.randrange(0, 20)):
+                value ^= 1 << bit
+            hashes.append(value)
+            media = Media(filename=f"{i:032x}.jpg", type="image", phash=image_hash.to_hex(value))
+            media.phash_0, media.phash_1, media.phash_2, media.phash_3 = image_hash.bands(value)
+            db.session.add(media)
+        target = Media(filename="target.jpg", type="image", phash=image_hash.to_hex(query))
+        target.phash_0, target.phash_1, target.phash_2, target.phash_3 = image_hash.bands(query)
+        db.session.add(target)
+        db.session.commit()
+
+        for max_distance in (0, 4, 10):
+            found = image_hash.find_similar(target, max_distance, limit=1000)
+            full_scan = sorted(
+                (d, m.id) for m, d in zip(Media.query.filter(Media.id != target.id).order_by(Media.id),
+                                          image_hash.hamming_distances(query, hashes))
+                if d <= max_distance
+            )
+            self.assertEqual(sorted((d, i) for i, d in found), full_scan)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+import sys
+import os
+import io
+import hashlib
+import shutil
+import struct
+import tempfile
+import zlib
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models.media import Media
+from app.sharding import find_upload
+
+
+def make_png(width, height):
+    """Tạo file PNG tối thiểu (không cần Pillow)"""
+    def chunk(tag, data):
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+    raw = b"".join(b"\x00" + b"\xff\x00\x00" * width for _ in range(height))
+    return (b"\x89PNG\r\n\x1a\n"
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"IDAT", zlib.compress(raw))
+            + chunk(b"IEND", b""))
+
+
+class MediaUploadTest(unittest.TestCase):
+    """Test upload media + metadata lưu trong DB"""
+
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+        self.app = create_app('testing')
+        self.app.config['UPLOAD_FOLDER'] = self.upload_dir
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        self.client.post('/auth/login', data={
+            'username': 'admin@hotel.com',
+            'password': 'admin123'
+        })
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.upload_dir, ignore_errors=True)
+
+    def upload(self, data, name):
+        return self.client.post('/auth/api/upload-thumbnail', data={
+            'file': (io.BytesIO(data), name)
+        }, content_type='multipart/form-data')
+
+    def test_01_upload_stores_metadata(self):
+        """Upload ảnh -> lưu size, sha256, MIME vào bảng media"""
+        png = make_png(4, 3)
+        res = self.upload(png, 'phong.png')
+        self.assertEqual(res.status_code, 200)
+
+        media = db.session.get(Media, res.get_json()['media_id'])
+        self.assertEqual(media.size, len(png))
+        self.assertEqual(media.sha256, hashlib.sha256(png).hexdigest())
+        self.assertEqual(media.mime_type, 'image/png')
+        self.assertEqual((media.width, media.height), (4, 3))
+
+    def test_02_list_media_reads_db_only(self):
+        """list_media trả size từ DB, kể cả khi file đã bị xóa khỏi đĩa"""
+        png = make_png(2, 2)
+        media_id = self.upload(png, 'a.png').get_json()['media_id']
+        os.remove(find_upload(db.session.get(Media, media_id).filename))
+
+        items = self.client.get('/auth/api/media').get_json()
+        item = next(m for m in items if m['id'] == media_id)
+        self.assertEqual(item['size_bytes'], len(png))
+        self.assertEqual(item['size'], f"{len(png)} B")
+
+    def test_03_backfill(self):
+        """backfill_media điền metadata cho dòng cũ trong static/images"""
+        from backfill_media import backfill
+
+        db.session.add(Media(filename='static/images/logo.svg', type='image'))
+        db.session.add(Media(filename='https://example.com/v.mp4', type='video'))
+        db.session.commit()
+
+        updated, missing = backfill()
+        self.assertEqual((updated, missing), (1, 0))
+
+        media = Media.query.filter_by(filename='static/images/logo.svg').one()
+        path = os.path.join(self.app.static_folder, 'images', 'logo.svg')
+        self.assertEqual(media.size, os.path.getsize(path))
+        self.assertEqual(media.mime_type, 'image/svg+xml')
+
+
+if __name__ == '__main__':
+    unittest.main()
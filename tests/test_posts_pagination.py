@@ -0,0 +1,104 @@
+import unittest
+import sys
+import os
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import text
+
+from app import create_app, db, upgrade_schema
+from app.models.post import Post
+
+
+class PostsPaginationTest(unittest.TestCase):
+    """Test phân trang keyset cho GET /auth/api/posts"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        # Thêm 25 bài viết, một số bài trùng created_at để kiểm tra tie-break theo id
+        base = datetime(2025, 1, 1)
+        for i in range(25):
+            db.session.add(Post(
+                title=f"Bài {i}",
+                status="draft" if i % 2 else "published",
+                created_at=base + timedelta(minutes=i // 3),
+            ))
+        db.session.commit()
+
+        self.client.post('/auth/login', data={
+            'username': 'admin@hotel.com',
+            'password': 'admin123'
+        })
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def _walk(self, query=""):
+        ids, cursor = [], None
+        while True:
+            url = f"/auth/api/posts?limit=7{query}"
+            if cursor:
+                url += f"&cursor={cursor}"
+            data = self.client.get(url).get_json()
+            self.assertLessEqual(len(data["items"]), 7)
+            ids += [p["id"] for p in data["items"]]
+            cursor = data["next_cursor"]
+            if not cursor:
+                return ids
+
+    def test_01_walk_all_pages(self):
+        """Duyệt hết các trang = danh sách đầy đủ, đúng thứ tự, không trùng"""
+        expected = [p.id for p in Post.query.order_by(
+            Post.created_at.desc(), Post.id.desc()).all()]
+        self.assertEqual(self._walk(), expected)
+
+    def test_02_walk_with_status(self):
+        """Phân trang kết hợp lọc status"""
+        expected = [p.id for p in Post.query.filter_by(status="draft").order_by(
+            Post.created_at.desc(), Post.id.desc()).all()]
+        self.assertEqual(self._walk("&status=draft"), expected)
+
+    def test_03_legacy_list(self):
+        """Không truyền limit/cursor -> vẫn trả về mảng như cũ"""
+        data = self.client.get("/auth/api/posts").get_json()
+        self.assertIsInstance(data, list)
+        self.assertEqual(len(data), Post.query.count())
+
+    def test_04_bad_cursor(self):
+        """Cursor sai định dạng -> 400"""
+        res = self.client.get("/auth/api/posts?cursor=khong-hop-le")
+        self.assertEqual(res.status_code, 400)
+
+
+    def test_05_walk_rows_created_through_api(self):
+        """Bài tạo qua API trong cùng một giây + dòng cũ lưu tới giây -> cursor vẫn tiến"""
+        for i in range(10):
+            res = self.client.post('/auth/api/posts', json={'title': f'Bài API {i}'})
+            self.assertEqual(res.status_code, 201)
+        db.session.execute(text(
+            "INSERT INTO posts (title, status, created_at) VALUES ('Bài cũ', 'draft', '2025-01-01 00:05:00')"))
+        db.session.commit()
+        upgrade_schema()
+
+        ids, cursor = [], None
+        for _ in range(50):
+            url = '/auth/api/posts?limit=3' + (f'&cursor={cursor}' if cursor else '')
+            data = self.client.get(url).get_json()
+            ids += [p['id'] for p in data['items']]
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+        expected = [p.id for p in Post.query.order_by(Post.created_at.desc(), Post.id.desc())]
+        self.assertEqual(ids, expected)
+        self.assertEqual(len(ids), len(set(ids)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+import sys
+import os
+import io
+import struct
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.probe import probe_stream, probe_file
+from app.media_meta import Image
+
+STATIC_IMAGES = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'static', 'images'))
+
+
+def box(box_type, payload):
+    return struct.pack(">I", 8 + len(payload)) + box_type + payload
+
+
+def make_mp4(width, height, timescale, duration, mdat_size=100_000, qt=False):
+    """MP4 tối thiểu: ftyp + mdat (đứng trước) + moov(mvhd, trak/tkhd video, trak/tkhd audio)"""
+    ftyp = box(b"ftyp", (b"qt  " if qt else b"isom") + b"\x00\x00\x02\x00")
+    mvhd = box(b"mvhd", b"\x00\x00\x00\x00" + b"\x00" * 8 + struct.pack(">II", timescale, duration) + b"\x00" * 80)
+
+    def tkhd(w, h):
+        body = b"\x00\x00\x00\x07" + b"\x00" * 72 + struct.pack(">II", w << 16, h << 16)
+        return box(b"trak", box(b"tkhd", body))
+
+    moov = box(b"moov", mvhd + tkhd(0, 0) + tkhd(width, height))
+    return ftyp + box(b"mdat", b"\x00" * mdat_size) + moov
+
+
+class ProbeTest(unittest.TestCase):
+    """Test đọc kích thước / thời lượng chỉ từ header"""
+
+    def test_01_mp4_moov_after_mdat(self):
+        """MP4 có moov nằm sau mdat: seek qua mdat, lấy track video (bỏ track audio)"""
+        info = probe_stream(io.BytesIO(make_mp4(1920, 1080, 600, 600 * 42)))
+        self.assertEqual((info["format"], info["width"], info["height"]), ("mp4", 1920, 1080))
+        self.assertAlmostEqual(info["duration"], 42.0)
+
+    def test_02_mov(self):
+        """QuickTime MOV"""
+        info = probe_stream(io.BytesIO(make_mp4(1280, 720, 1000, 12500, qt=True)))
+        self.assertEqual(info["format"], "mov")
+        self.assertAlmostEqual(info["duration"], 12.5)
+
+    def test_03_gif_and_unknown(self):
+        """GIF header + file không nhận dạng được"""
+        gif = b"GIF89a" + struct.pack("<HH", 320, 240) + b"\x00" * 10
+        self.assertEqual(probe_stream(io.BytesIO(gif))["width"], 320)
+        self.assertIsNone(probe_stream(io.BytesIO(b"hello world" * 10)))
+
+    @unittest.skipIf(Image is None, "Cần Pillow để tạo ảnh mẫu")
+    def test_04_matches_pillow(self):
+        """Kết quả probe khớp Pillow cho JPEG (kèm ICC lớn hơn 64 KB), PNG, WebP"""
+        cases = []
+        with tempfile.TemporaryDirectory() as tmp:
+            for fmt, size, kwargs in (
+                ("JPEG", (640, 480), {"icc_profile": b"\x00" * 150000}),
+                ("JPEG", (300, 200), {"progressive": True}),
+                ("PNG", (123, 45), {}),
+                ("WEBP", (200, 100), {}),
+                ("WEBP", (201, 99), {"lossless": True}),
+            ):
+                path = os.path.join(tmp, f"{len(cases)}.{fmt.lower()}")
+                Image.new("RGB", size, (1, 2, 3)).save(path, fmt, **kwargs)
+                cases.append((path, size))
+
+            for path, size in cases:
+                info = probe_file(path)
+                self.assertEqual((info["width"], info["height"]), size, path)
+
+    @unittest.skipIf(Image is None, "Cần Pillow")
+    def test_05_static_corpus(self):
+        """Ảnh thật trong static/images"""
+        for name in os.listdir(STATIC_IMAGES):
+            if not name.endswith(".png"):
+                continue
+            path = os.path.join(STATIC_IMAGES, name)
+            with Image.open(path) as img:
+                self.assertEqual((probe_file(path)["width"], probe_file(path)["height"]), img.size)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db, remote_cache
+from app.models.media import Media
+
+VIDEO = os.urandom(300_000)
+
+
+class OriginHandler(BaseHTTPRequestHandler):
+    """Host ngoài giả lập: đếm số lần GET mỗi path, trả chậm để các request chồng nhau"""
+
+    hits = {}
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        with OriginHandler.lock:
+            OriginHandler.hits[self.path] = OriginHandler.hits.get(self.path, 0) + 1
+        if not self.path.endswith(".mp4"):
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        time.sleep(0.2)
+        self.send_response(200)
+        self.send_header("Content-Type", "video/mp4")
+        self.send_header("Content-Length", str(len(VIDEO)))
+        self.end_headers()
+        try:
+            self.wfile.write(VIDEO)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+class RemoteCacheTest(unittest.TestCase):
+    """Test cache đọc-qua cho video URL ngoài: GET /remote/<media id>"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), OriginHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.origin = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        OriginHandler.hits = {}
+        remote_cache._usage.bytes = None
+        self.upload_dir = tempfile.mkdtemp()
+        self.app = create_app('testing')
+        self.app.config.update(UPLOAD_FOLDER=self.upload_dir, REMOTE_CACHE=True,
+                               REMOTE_CACHE_TIMEOUT=2)
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.upload_dir, ignore_errors=True)
+
+    def add(self, path):
+        media = Media(filename=f"{self.origin}{path}", type="video")
+        db.session.add(media)
+        db.session.commit()
+        return media.id
+
+    def test_01_read_through_and_range(self):
+        """Lần đầu tải từ host gốc, sau đó phục vụ từ đĩa kèm Range"""
+        media_id = self.add("/tour.mp4")
+        res = self.client.get(f"/remote/{media_id}")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data, VIDEO)
+        self.assertEqual(res.mimetype, "video/mp4")
+
+        res = self.client.get(f"/remote/{media_id}", headers={"Range": "bytes=1000-1999"})
+        self.assertEqual(res.status_code, 206)
+        self.assertEqual(res.data, VIDEO[1000:2000])
+        self.assertEqual(res.headers["Content-Range"], f"bytes 1000-1999/{len(VIDEO)}")
+        self.assertEqual(OriginHandler.hits["/tour.mp4"], 1)
+
+        # list_media trả URL qua cache
+        self.client.post('/auth/login', data={'username': 'admin@hotel.com', 'password': 'admin123'})
+        self.assertEqual(self.client.get('/auth/api/media').get_json()[0]['url'], f"/remote/{media_id}")
+
+    def test_02_concurrent_first_hits_collapse(self):
+        """Nhiều request đầu tiên cùng lúc chỉ tải từ host gốc một lần"""
+        url = f"{self.origin}/hot.mp4"
+        results = []
+
+        def worker():
+            with self.app.app_context():
+                path = remote_cache.cached_path(url)
+                with open(path, "rb") as f:
+                    results.append(f.read())
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(results), 8)
+        self.assertTrue(all(data == VIDEO for data in results))
+        self.assertEqual(OriginHandler.hits["/hot.mp4"], 1)
+
+    def test_03_lru_eviction_and_fallbacks(self):
+        """Vượt giới hạn -> xóa file cũ nhất; file quá lớn / host lỗi -> redirect về URL gốc"""
+        self.app.config['REMOTE_CACHE_MAX_BYTES'] = len(VIDEO) * 2 + 1000
+        first = remote_cache.cached_path(f"{self.origin}/a.mp4")
+        os.utime(first, (time.time() - 60, time.time() - 60))
+        remote_cache.cached_path(f"{self.origin}/b.mp4")
+        remote_cache.cached_path(f"{self.origin}/c.mp4")
+        self.assertFalse(os.path.exists(first))
+        self.assertTrue(os.path.exists(remote_cache.cached_path(f"{self.origin}/c.mp4")))
+
+        self.app.config['REMOTE_CACHE_MAX_BYTES'] = len(VIDEO)
+        big = self.add("/big.mp4")
+        res = self.client.get(f"/remote/{big}")
+        self.assertEqual(res.status_code, 302)
+        self.assertEqual(res.headers["Location"], f"{self.origin}/big.mp4")
+
+        missing = self.add("/missing.jpg")
+        self.assertEqual(self.client.get(f"/remote/{missing}").status_code, 302)
+
+    def test_04_only_external_media(self):
+        """Media lưu cục bộ / id không tồn tại -> 404; tắt cache -> redirect"""
+        local = Media(filename="phong.mp4", type="video")
+        db.session.add(local)
+        db.session.commit()
+        self.assertEqual(self.client.get(f"/remote/{local.id}").status_code, 404)
+        self.assertEqual(self.client.get("/remote/9999").status_code, 404)
+
+        self.app.config['REMOTE_CACHE'] = False
+        media_id = self.add("/tour.mp4")
+        self.assertEqual(self.client.get(f"/remote/{media_id}").status_code, 302)
+        self.assertEqual(OriginHandler.hits, {})
+
+
+    def test_05_evicted_between_hit_and_send(self):
+        """Bản cache bị LRU xóa ngay sau cache hit -> tải lại, không trả 500"""
+        media_id = self.add("/evicted.mp4")
+        self.client.get(f"/remote/{media_id}").close()
+        real_cached_path = remote_cache.cached_path
+        evicted = []
+
+        def evicting_cached_path(url):
+            path = real_cached_path(url)
+            if not evicted:
+                os.remove(path)
+                evicted.append(path)
+            return path
+
+        with mock.patch.object(remote_cache, 'cached_path', evicting_cached_path):
+            res = self.client.get(f"/remote/{media_id}")
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.data, VIDEO)
+        res.close()
+        self.assertEqual(OriginHandler.hits["/evicted.mp4"], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
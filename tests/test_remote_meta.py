@@ -0,0 +1,169 @@
+import unittest
+import sys
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.insert(0, os.path.dirname(__file__))
+
+from app import create_app, db, remote_meta
+from app.models.media import Media
+from test_probe import make_mp4
+
+VIDEO = make_mp4(1280, 720, 1000, 42_500, mdat_size=300_000)
+PHOTO = b"\xff\xd8" + b"\x00" * 200_000
+
+
+class OriginHandler(BaseHTTPRequestHandler):
+    """Host ngoài giả lập (kiểu Cloudinary): Range, không Range, chặn GET, chậm, 404"""
+
+    active = 0
+    peak = 0
+    requests = []
+    lock = threading.Lock()
+
+    def log_message(self, *args):
+        pass
+
+    def _send(self, status, body=b"", headers=None):
+        self.send_response(status)
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if self.command != "HEAD":
+            try:
+                self.wfile.write(body)
+            except (BrokenPipeError, ConnectionResetError):
+                pass  # client đã bỏ đi vì timeout
+
+    def handle_one_request(self):
+        cls = OriginHandler
+        with cls.lock:
+            cls.active += 1
+            cls.peak = max(cls.peak, cls.active)
+        try:
+            super().handle_one_request()
+        finally:
+            with cls.lock:
+                cls.active -= 1
+
+    def do_HEAD(self):
+        self.do_GET()
+
+    def do_GET(self):
+        OriginHandler.requests.append((self.command, self.path))
+        time.sleep(0.05)  # để các request chồng lên nhau
+        if self.path.startswith("/video"):
+            spec = self.headers.get("Range", "")[len("bytes="):]
+            start, end = (int(x) for x in spec.split("-"))
+            if start >= len(VIDEO):
+                return self._send(416)
+            chunk = VIDEO[start:end + 1]
+            return self._send(206, chunk, {
+                "Content-Type": "video/mp4",
+                "Content-Range": f"bytes {start}-{start + len(chunk) - 1}/{len(VIDEO)}",
+            })
+        if self.path == "/photo.jpg":
+            return self._send(200, PHOTO, {"Content-Type": "image/jpeg"})
+        if self.path == "/head-only.mp4":
+            if self.command == "GET":
+                return self._send(405)
+            return self._send(200, b"", {"Content-Type": "video/mp4", "Content-Length": "777"})
+        if self.path == "/slow.mp4":
+            time.sleep(1.5)
+            return self._send(200, b"late")
+        return self._send(404)
+
+
+class RemoteMetaTest(unittest.TestCase):
+    """Test lấy metadata cho media là URL ngoài + cache TTL trong DB"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), OriginHandler)
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.origin = f"http://127.0.0.1:{cls.server.server_address[1]}"
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        OriginHandler.peak = 0
+        OriginHandler.requests = []
+        self.app = create_app('testing')
+        self.app.config.update(REMOTE_META_WORKERS=2, REMOTE_META_TIMEOUT=0.5)
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def add(self, path, media_type="video"):
+        media = Media(filename=f"{self.origin}{path}", type=media_type)
+        db.session.add(media)
+        db.session.commit()
+        return media.id
+
+    def test_01_fetch_and_cache(self):
+        """Range GET đọc được cả moov ở cuối file; lần sau không gọi host nữa"""
+        ids = {p: self.add(p) for p in ("/video-1.mp4", "/video-2.mp4", "/video-3.mp4",
+                                        "/photo.jpg", "/head-only.mp4")}
+        ok, failed = remote_meta.refresh_stale()
+        self.assertEqual((ok, failed), (5, 0))
+        self.assertLessEqual(OriginHandler.peak, 2)  # REMOTE_META_WORKERS
+
+        video = db.session.get(Media, ids["/video-1.mp4"])
+        self.assertEqual((video.size, video.mime_type), (len(VIDEO), "video/mp4"))
+        self.assertEqual((video.width, video.height, video.duration), (1280, 720, 42.5))
+        video_requests = [r for r in OriginHandler.requests if r[1] == "/video-1.mp4"]
+        self.assertLessEqual(len(video_requests), 2)  # block đầu + block chứa moov
+
+        photo = db.session.get(Media, ids["/photo.jpg"])
+        self.assertEqual((photo.size, photo.mime_type), (len(PHOTO), "image/jpeg"))
+        self.assertEqual(db.session.get(Media, ids["/head-only.mp4"]).size, 777)
+
+        OriginHandler.requests = []
+        self.assertEqual(remote_meta.refresh_stale(), (0, 0))
+        self.assertEqual(OriginHandler.requests, [])
+
+        # Hết TTL -> lấy lại
+        video.remote_checked_at = datetime.utcnow() - timedelta(days=2)
+        db.session.commit()
+        self.assertEqual(remote_meta.refresh_stale(), (1, 0))
+
+    def test_02_failures_retry_later(self):
+        """Timeout / 404 không chặn các URL khác và được thử lại sau REMOTE_META_RETRY"""
+        slow, missing = self.add("/slow.mp4"), self.add("/missing.mp4")
+        good = self.add("/video-ok.mp4")
+        started = time.monotonic()
+        self.assertEqual(remote_meta.refresh_stale(), (1, 2))
+        self.assertLess(time.monotonic() - started, 1.4)  # timeout 0.5s, không chờ hết 1.5s
+
+        self.assertIsNotNone(db.session.get(Media, good).size)
+        self.assertIsNone(db.session.get(Media, slow).size)
+        self.assertEqual(remote_meta.stale_query().count(), 0)
+        later = datetime.utcnow() + timedelta(seconds=self.app.config['REMOTE_META_RETRY'] + 1)
+        self.assertEqual({m.id for m in remote_meta.stale_query(later)}, {slow, missing})
+
+    def test_03_list_media_uses_cache(self):
+        """list_media hiển thị dung lượng đã lưu thay vì "Online" """
+        self.client.post('/auth/login', data={'username': 'admin@hotel.com', 'password': 'admin123'})
+        self.add("/video-list.mp4")
+        self.assertEqual(self.client.get('/auth/api/media').get_json()[0]['size'], 'Online')
+        remote_meta.refresh_stale()
+        item = self.client.get('/auth/api/media').get_json()[0]
+        self.assertEqual(item['size_bytes'], len(VIDEO))
+        self.assertEqual(item['duration'], 42.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
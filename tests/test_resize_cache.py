@@ -0,0 +1,114 @@
+import unittest
+import sys
+import os
+import io
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db, resize_cache
+from app.disk_cache import scan_usage
+from app.media_meta import Image
+
+
+@unittest.skipIf(Image is None, "Cần Pillow")
+class ResizeCacheTest(unittest.TestCase):
+    """Test route /uploads/<w>x<h>/<file> và cache LRU trên đĩa"""
+
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+        self.app = create_app('testing')
+        self.app.config['UPLOAD_FOLDER'] = self.upload_dir
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        Image.new('RGB', (1200, 800), (10, 120, 200)).save(
+            os.path.join(self.upload_dir, 'phong.jpg'), 'JPEG')
+        resize_cache._usage.bytes = None
+
+        self.renders = 0
+        real_render = resize_cache._render
+
+        def counting_render(*args):
+            self.renders += 1
+            time.sleep(0.05)  # đủ lâu để các request song song chồng lên nhau
+            real_render(*args)
+
+        patcher = mock.patch.object(resize_cache, '_render', counting_render)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.upload_dir, ignore_errors=True)
+
+    def test_01_resize_and_cache_hit(self):
+        """Lần đầu resize, lần sau trả từ cache"""
+        res = self.client.get('/uploads/300x300/phong.jpg')
+        self.assertEqual(res.status_code, 200)
+        with Image.open(io.BytesIO(res.data)) as img:
+            self.assertEqual(img.size, (300, 200))
+        res.close()
+
+        self.client.get('/uploads/300x300/phong.jpg').close()
+        self.assertEqual(self.renders, 1)
+
+    def test_02_concurrent_requests_coalesced(self):
+        """8 request song song cùng kích thước -> chỉ resize 1 lần"""
+        def fetch():
+            with self.app.test_client() as c:
+                c.get('/uploads/480x0/phong.jpg').close()
+
+        threads = [threading.Thread(target=fetch) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(self.renders, 1)
+
+    def test_03_cache_bounded(self):
+        """Vượt RESIZE_CACHE_MAX_BYTES -> xóa bớt file cũ"""
+        self.app.config['RESIZE_CACHE_MAX_BYTES'] = 20_000
+        for w in range(100, 1100, 100):
+            self.client.get(f'/uploads/{w}x0/phong.jpg').close()
+        folder = resize_cache.cache_folder()
+        self.assertLessEqual(scan_usage(folder), 20_000)
+
+    def test_04_bad_requests(self):
+        """Kích thước quá lớn -> 400, file không tồn tại -> 404"""
+        self.assertEqual(self.client.get('/uploads/9999x10/phong.jpg').status_code, 400)
+        self.assertEqual(self.client.get('/uploads/100x100/khong-co.jpg').status_code, 404)
+        self.assertEqual(self.client.get('/uploads/100x100/../../etc/passwd.jpg').status_code, 404)
+
+
+    def test_05_evicted_between_hit_and_send(self):
+        """Bản resize bị LRU xóa ngay sau cache hit -> render lại, không trả 500"""
+        self.client.get('/uploads/300x300/phong.jpg').close()
+        real_resized_path = resize_cache.resized_path
+        evicted = []
+
+        def evicting_resized_path(*args):
+            path = real_resized_path(*args)
+            if not evicted:
+                os.remove(path)
+                evicted.append(path)
+            return path
+
+        with mock.patch.object(resize_cache, 'resized_path', evicting_resized_path):
+            res = self.client.get('/uploads/300x300/phong.jpg')
+        self.assertEqual(res.status_code, 200)
+        with Image.open(io.BytesIO(res.data)) as img:
+            self.assertEqual(img.size, (300, 200))
+        res.close()
+        self.assertEqual(self.renders, 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,196 @@
+import unittest
+import sys
+import os
+import hashlib
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db, resumable, routes
+from app.models.media import Media
+from app.models.upload_session import UploadSession
+from app.models.user import User
+from app.sharding import find_upload
+
+
+class ResumableUploadTest(unittest.TestCase):
+    """Test upload resumable: tạo phiên, PATCH từng đoạn, resume, finalize"""
+
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+        self.app = create_app('testing')
+        self.app.config['UPLOAD_FOLDER'] = self.upload_dir
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        self.client.post('/auth/login', data={
+            'username': 'admin@hotel.com',
+            'password': 'admin123'
+        })
+        self.data = b'\x00\x00\x00\x18ftypmp42' + os.urandom(300_000)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.upload_dir, ignore_errors=True)
+
+    def create(self):
+        res = self.client.post('/auth/api/uploads', json={
+            'filename': 'tour-phong.mp4', 'size': len(self.data)
+        })
+        self.assertEqual(res.status_code, 201)
+        return res.get_json()['id']
+
+    def patch(self, upload_id, offset, body):
+        return self.client.patch(f'/auth/api/uploads/{upload_id}', data=body, headers={
+            'Upload-Offset': str(offset),
+            'Content-Type': 'application/offset+octet-stream'
+        })
+
+    def test_01_full_flow(self):
+        """Upload 3 đoạn -> finalize -> có file + Media với sha256 đúng"""
+        upload_id = self.create()
+        for start in range(0, len(self.data), 128_000):
+            res = self.patch(upload_id, start, self.data[start:start + 128_000])
+            self.assertEqual(res.status_code, 204)
+
+        res = self.client.post(f'/auth/api/uploads/{upload_id}/finalize')
+        self.assertEqual(res.status_code, 200)
+
+        media = db.session.get(Media, res.get_json()['media_id'])
+        self.assertEqual(media.type, 'video')
+        self.assertEqual(media.size, len(self.data))
+        self.assertEqual(media.sha256, hashlib.sha256(self.data).hexdigest())
+        with open(find_upload(media.filename), 'rb') as f:
+            self.assertEqual(f.read(), self.data)
+        self.assertIsNone(db.session.get(UploadSession, upload_id))
+
+    def test_02_resume_after_worker_restart(self):
+        """Mất trạng thái hash trong bộ nhớ -> dựng lại từ file tạm, kết quả vẫn đúng"""
+        upload_id = self.create()
+        self.patch(upload_id, 0, self.data[:100_000])
+        resumable._hashers.clear()
+
+        res = self.client.head(f'/auth/api/uploads/{upload_id}')
+        self.assertEqual(res.headers['Upload-Offset'], '100000')
+
+        self.patch(upload_id, 100_000, self.data[100_000:])
+        res = self.client.post(f'/auth/api/uploads/{upload_id}/finalize')
+        media = db.session.get(Media, res.get_json()['media_id'])
+        self.assertEqual(media.sha256, hashlib.sha256(self.data).hexdigest())
+
+    def test_03_offset_conflict(self):
+        """Offset sai -> 409, finalize khi chưa đủ bytes -> 409"""
+        upload_id = self.create()
+        self.assertEqual(self.patch(upload_id, 10, b'abc').status_code, 409)
+        self.assertEqual(self.client.post(f'/auth/api/uploads/{upload_id}/finalize').status_code, 409)
+
+    def test_04_too_large(self):
+        """Gửi nhiều hơn size đã khai báo -> 413"""
+        upload_id = self.create()
+        self.assertEqual(self.patch(upload_id, 0, self.data + b'x').status_code, 413)
+
+    def test_05_rejects_disallowed_extension_and_size(self):
+        """Phần mở rộng ngoài danh sách -> 415; size khai báo vượt giới hạn -> 413"""
+        res = self.client.post('/auth/api/uploads', json={'filename': 'x.html', 'size': 100})
+        self.assertEqual(res.status_code, 415)
+        self.assertEqual(UploadSession.query.count(), 0)
+
+        limit = self.app.config['UPLOAD_MAX_VIDEO_BYTES']
+        res = self.client.post('/auth/api/uploads', json={'filename': 'a.mp4', 'size': limit + 1})
+        self.assertEqual(res.status_code, 413)
+
+    def test_06_finalize_rejects_content_mismatch(self):
+        """Nội dung không khớp phần mở rộng -> 415 lúc finalize, xóa file tạm + phiên"""
+        self.data = b'<html><script>alert(1)</script></html>'.ljust(5000, b' ')
+        upload_id = self.create()
+        self.assertEqual(self.patch(upload_id, 0, self.data).status_code, 204)
+
+        res = self.client.post(f'/auth/api/uploads/{upload_id}/finalize')
+        self.assertEqual(res.status_code, 415)
+        self.assertFalse(os.path.exists(resumable.partial_path(upload_id)))
+        self.assertIsNone(db.session.get(UploadSession, upload_id))
+        self.assertEqual(Media.query.count(), 0)
+
+
+    def test_07_session_lock_serializes_requests(self):
+        """Request thứ hai của cùng phiên chờ lock; phiên đã kết thúc -> UploadGone"""
+        upload_id = self.create()
+        entered = []
+
+        def second():
+            with self.app.app_context(), resumable.locked(upload_id):
+                entered.append(time.monotonic())
+
+        with resumable.locked(upload_id):
+            worker = threading.Thread(target=second)
+            worker.start()
+            time.sleep(0.2)
+            self.assertEqual(entered, [])
+            released = time.monotonic()
+        worker.join()
+        self.assertGreaterEqual(entered[0], released)
+        self.assertNotIn(upload_id, resumable._session_locks)
+
+        self.client.delete(f'/auth/api/uploads/{upload_id}')
+        with self.assertRaises(resumable.UploadGone):
+            with resumable.locked(upload_id):
+                pass
+
+    def test_08_idle_hashers_evicted(self):
+        """Hash của phiên bỏ dở quá lâu bị bỏ khỏi bộ nhớ, resume vẫn đúng"""
+        abandoned = self.create()
+        self.patch(abandoned, 0, self.data[:100_000])
+        offset, digest, _ = resumable._hashers[abandoned]
+        resumable._hashers[abandoned] = (offset, digest, time.monotonic() - resumable.HASHER_IDLE_SECONDS - 1)
+
+        self.create()
+        self.assertNotIn(abandoned, resumable._hashers)
+
+        self.patch(abandoned, 100_000, self.data[100_000:])
+        res = self.client.post(f'/auth/api/uploads/{abandoned}/finalize')
+        media = db.session.get(Media, res.get_json()['media_id'])
+        self.assertEqual(media.sha256, hashlib.sha256(self.data).hexdigest())
+        self.assertNotIn(abandoned, resumable._hashers)
+
+
+    def test_09_other_users_cannot_touch_session(self):
+        """Người dùng khác không HEAD / PATCH / finalize / hủy được phiên -> 404"""
+        upload_id = self.create()
+        self.assertEqual(self.patch(upload_id, 0, self.data).status_code, 204)
+
+        other = User(username='staff@hotel.com', email='staff@hotel.com')
+        other.set_password('staff123')
+        db.session.add(other)
+        db.session.commit()
+        self.client.get('/auth/logout')
+        self.client.post('/auth/login', data={'username': 'staff@hotel.com', 'password': 'staff123'})
+
+        self.assertEqual(self.client.head(f'/auth/api/uploads/{upload_id}').status_code, 404)
+        self.assertEqual(self.patch(upload_id, len(self.data), b'x').status_code, 404)
+        self.assertEqual(self.client.post(f'/auth/api/uploads/{upload_id}/finalize').status_code, 404)
+        self.assertEqual(self.client.delete(f'/auth/api/uploads/{upload_id}').status_code, 404)
+        self.assertTrue(os.path.exists(resumable.partial_path(upload_id)))
+        self.assertEqual(Media.query.count(), 0)
+
+    def test_10_register_failure_removes_assembled_file(self):
+        """register_media lỗi lúc finalize -> không để lại file đã ghép, phiên bị hủy"""
+        upload_id = self.create()
+        self.patch(upload_id, 0, self.data)
+        self.app.config['PROPAGATE_EXCEPTIONS'] = False
+        with mock.patch.object(routes, 'register_media', side_effect=OSError('disk full')):
+            res = self.client.post(f'/auth/api/uploads/{upload_id}/finalize')
+        self.assertEqual(res.status_code, 500)
+        self.assertEqual([f for _, _, files in os.walk(self.upload_dir) for f in files], [])
+        self.assertIsNone(db.session.get(UploadSession, upload_id))
+        self.assertEqual(Media.query.count(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+import unittest
+import sys
+import os
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import numpy as np
+
+from app import create_app, db, spam_filter, status_counters
+from app.models.comment import Comment
+from app.models.post import Post
+
+HAM = ["Phòng sạch sẽ, nhân viên thân thiện", "Buffet sáng ngon, view hồ bơi đẹp",
+       "Cho mình hỏi giá phòng Deluxe cuối tuần", "Dịch vụ spa tuyệt vời, cảm ơn khách sạn"]
+SPAM = ["Kiếm 5 triệu/ngày tại nhà, inbox zalo 0912345678", "Click here to win free money www.scam.com",
+        "Follow tiktok nhận quà 500k, link bio", "Vay tiền nhanh không thế chấp, liên hệ 0987654321"]
+
+
+class SpamFilterTest(unittest.TestCase):
+    """Test bộ lọc spam: n-gram băm, học từ quyết định duyệt, định tuyến pending theo ngưỡng"""
+
+    def setUp(self):
+        self.model_dir = tempfile.mkdtemp()
+        self.app = create_app('testing')
+        self.app.config['SPAM_MODEL_PATH'] = os.path.join(self.model_dir, 'spam_model.npz')
+        self.app.config['SPAM_MIN_EXAMPLES'] = 10
+        self.app.config['SPAM_BATCH_SIZE'] = 4
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client.post('/auth/login', data={'username': 'admin@hotel.com', 'password': 'admin123'})
+
+        self.post = Post(title='Hồ bơi')
+        db.session.add(self.post)
+        db.session.flush()
+        # Lịch sử duyệt của người kiểm duyệt
+        db.session.add_all(
+            [Comment(author_name='Khách', content=f'{text} #{i}', source='Website', status='approved')
+             for i in range(5) for text in HAM]
+            + [Comment(author_name='Spam', content=f'{text} #{i}', source='Tiktok', status='rejected')
+               for i in range(5) for text in SPAM]
+            # Bộ lọc tự từ chối nhầm -> không được dùng làm dữ liệu học
+            + [Comment(author_name='Khách', content=HAM[0], status='rejected', auto_moderated=True)]
+        )
+        db.session.commit()
+        status_counters.reconcile()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.model_dir, ignore_errors=True)
+
+    def add_pending(self, *contents):
+        comments = [Comment(author_name='Mới', content=text, source='Zalo', post_id=self.post.id)
+                    for text in contents]
+        db.session.add_all(comments)
+        db.session.flush()
+        for c in comments:
+            status_counters.comment_created(c)
+        db.session.commit()
+        return [c.id for c in comments]
+
+    def test_01_featurize(self):
+        """n-gram 2..5 của ' ab ', không vắt qua hai văn bản; chuẩn hóa chữ hoa / chữ số / khoảng trắng"""
+        doc, bucket = spam_filter.featurize(['ab', 'ab'])
+        self.assertEqual(np.bincount(doc).tolist(), [6, 6])  # 3 + 2 + 1 + 0
+        self.assertEqual(sorted(bucket[doc == 0]), sorted(bucket[doc == 1]))
+        self.assertTrue((bucket < 2 ** spam_filter.HASH_BITS).all())
+
+        _, a = spam_filter.featurize(['Gọi  0912 345'])
+        _, b = spam_filter.featurize(['gọi 0000 111'])
+        self.assertEqual(sorted(a), sorted(b))
+
+        doc, _ = spam_filter.featurize(['x', ''], sources=['Zalo', 'Zalo'])
+        self.assertEqual(np.bincount(doc).tolist(), [4, 2])  # + 1 đặc trưng nguồn
+
+    def test_02_retrain_and_triage(self):
+        """Học từ quyết định của người duyệt rồi định tuyến pending theo lô"""
+        self.assertEqual(self.client.post('/auth/api/comments/triage').status_code, 409)  # chưa có model
+
+        result = spam_filter.retrain(evaluate_holdout=True)
+        self.assertEqual((result['ham'], result['spam']), (20, 20))  # bỏ dòng auto_moderated
+        self.assertEqual(result['evaluation']['comments'], 4)
+
+        spam_id, ham_id, unsure_id = self.add_pending(
+            'Kiếm 9 triệu/ngày tại nhà, inbox zalo 0900000000', 'Phòng sạch sẽ, buffet sáng ngon', 'xin chào mọi người')
+        self.add_pending(*[f'Click here to win free money #{i}' for i in range(6)])
+
+        summary = self.client.post('/auth/api/comments/triage').get_json()
+        self.assertEqual(summary['approved'] + summary['rejected'] + summary['review'], 9)
+        spam, ham, unsure = (db.session.get(Comment, i) for i in (spam_id, ham_id, unsure_id))
+        self.assertEqual((spam.status, spam.auto_moderated), ('rejected', True))
+        self.assertEqual((ham.status, ham.auto_moderated), ('approved', True))
+        self.assertEqual(unsure.status, 'pending')
+        self.assertTrue(0.01 < unsure.spam_score < 0.99)
+
+        # Đã chấm -> lần sau bỏ qua; bộ đếm (toàn cục + theo bài) khớp dữ liệu
+        self.assertEqual(self.client.post('/auth/api/comments/triage').get_json()['review'], 0)
+        self.assertEqual(status_counters.reconcile(), {})
+        self.assertEqual(db.session.get(Post, self.post.id).pending_comment_count, 1)
+
+        # Người duyệt sửa quyết định của bộ lọc -> dòng đó thành dữ liệu học
+        self.client.put(f'/auth/api/comments/{spam_id}/approve')
+        self.assertFalse(db.session.get(Comment, spam_id).auto_moderated)
+        self.assertEqual(sum(1 for _ in spam_filter.labelled_rows()), 41)
+
+    def test_03_model_reload_and_thresholds(self):
+        """Process tự nạp model mới khi file đổi; ngưỡng lấy từ config"""
+        spam_filter.retrain()
+        first = spam_filter.current_model()
+        self.assertIs(spam_filter.current_model(), first)
+
+        db.session.add_all([Comment(author_name='Spam', content=f'Vay tiền nhanh #{i}', status='rejected')
+                            for i in range(10)])
+        db.session.commit()
+        spam_filter.retrain()
+        os.utime(self.app.config['SPAM_MODEL_PATH'], ns=(1, 1))
+        self.assertEqual(spam_filter.current_model().counts, (20, 30))
+
+        self.app.config['SPAM_REJECT_THRESHOLD'] = 1.01
+        self.app.config['SPAM_APPROVE_THRESHOLD'] = -1
+        self.add_pending(*SPAM)
+        self.assertEqual(spam_filter.triage_pending(limit=3), {'approved': 0, 'rejected': 0, 'review': 3})
+
+        self.app.config['SPAM_FILTER'] = False
+        self.assertIsNone(spam_filter.triage_pending())
+
+        db.session.query(Comment).filter_by(status='rejected').delete()
+        db.session.commit()
+        with self.assertRaises(spam_filter.SpamFilterError):
+            spam_filter.retrain()
+
+
+    def test_04_triage_skips_rows_moderated_meanwhile(self):
+        """Người duyệt xử lý bình luận giữa lúc SELECT và UPDATE -> bộ đếm không bị trừ hai lần"""
+        spam_filter.retrain()
+        spam_id, ham_id = self.add_pending('Click here to win free money now', 'Phòng sạch sẽ, buffet sáng ngon')
+        rows = (db.session.query(Comment.id, Comment.content, Comment.source)
+                .filter(Comment.id.in_([spam_id, ham_id])).order_by(Comment.id).all())
+
+        self.client.put(f'/auth/api/comments/{spam_id}/approve')
+        summary = spam_filter.triage(rows, spam_filter.current_model())
+        db.session.commit()
+
+        self.assertEqual((summary['approved'], summary['rejected']), (1, 0))
+        spam = db.session.get(Comment, spam_id)
+        self.assertEqual((spam.status, spam.auto_moderated, spam.spam_score), ('approved', False, None))
+        self.assertEqual(status_counters.reconcile(), {})
+        self.assertEqual(db.session.get(Post, self.post.id).pending_comment_count, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import event, text
+
+from app import create_app, db, status_counters
+from app.models.campaign import Campaign
+from app.models.comment import Comment
+
+
+class StatusCountersTest(unittest.TestCase):
+    """Test bộ đếm trạng thái bình luận / chiến dịch và job đếm lại"""
+
+    def setUp(self):
+        self.app = create_app('testing')
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client.post('/auth/login', data={'username': 'admin@hotel.com', 'password': 'admin123'})
+
+        # Dữ liệu có sẵn (như seed_comments.py / seed_campaigns.py) rồi đếm lại
+        db.session.add_all([Comment(author_name=f'K{i}', content='Hay', status=status)
+                            for i, status in enumerate(['pending'] * 5 + ['approved'] * 3 + ['rejected'])])
+        db.session.add_all([Campaign(name=f'C{i}', status=status)
+                            for i, status in enumerate(['active', 'active', 'paused', 'completed'])])
+        db.session.commit()
+        status_counters.reconcile()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def comment_stats(self):
+        return self.client.get('/auth/api/comments/stats').get_json()
+
+    def test_01_stats_read_counters_only(self):
+        """Trang thống kê không quét bảng comments / campaigns"""
+        statements = []
+        listener = lambda *args: statements.append(args[2])
+        event.listen(db.engine, 'before_cursor_execute', listener)
+        try:
+            comments = self.comment_stats()
+            campaigns = self.client.get('/auth/api/campaigns/stats').get_json()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', listener)
+
+        self.assertEqual(comments, {'total': 9, 'pending': 5, 'approved': 3, 'rejected': 1})
+        self.assertEqual(campaigns, {'total': 4, 'active': 2, 'paused': 1, 'scheduled': 0})
+        self.assertFalse([s for s in statements if 'FROM comments' in s or 'FROM campaigns' in s])
+
+    def test_02_write_paths(self):
+        """Duyệt / từ chối / xóa / hàng loạt / đổi trạng thái chiến dịch cập nhật bộ đếm"""
+        pending = [c.id for c in Comment.query.filter_by(status='pending')]
+        self.client.put(f'/auth/api/comments/{pending[0]}/approve')
+        self.client.put(f'/auth/api/comments/{pending[0]}/approve')  # lặp lại: không đếm 2 lần
+        self.client.put(f'/auth/api/comments/{pending[1]}/reject')
+        self.client.delete(f'/auth/api/comments/{pending[2]}/delete')
+        self.assertEqual(self.comment_stats(), {'total': 8, 'pending': 2, 'approved': 4, 'rejected': 2})
+
+        self.client.post('/auth/api/comments/bulk', json={'action': 'approve', 'filter': {'status': 'pending'}})
+        self.client.post('/auth/api/comments/bulk', json={'action': 'delete', 'filter': {'status': 'rejected'}})
+        self.assertEqual(self.comment_stats(), {'total': 6, 'pending': 0, 'approved': 6, 'rejected': 0})
+
+        active = Campaign.query.filter_by(status='active').first()
+        self.client.put(f'/auth/api/campaigns/{active.id}', json={'status': 'scheduled'})
+        self.client.delete(f'/auth/api/campaigns/{Campaign.query.filter_by(status="paused").one().id}')
+        self.assertEqual(self.client.get('/auth/api/campaigns/stats').get_json(),
+                         {'total': 3, 'active': 1, 'paused': 0, 'scheduled': 1})
+
+        self.assertEqual(status_counters.reconcile(), {})  # không có sai lệch
+
+    def test_03_transactional_and_reconcile(self):
+        """Rollback bỏ luôn thay đổi bộ đếm; ghi thẳng SQL -> reconcile sửa lại"""
+        status_counters.moved('comments', 'pending', 'approved')
+        db.session.rollback()
+        self.assertEqual(self.comment_stats()['pending'], 5)
+
+        db.session.execute(text("UPDATE comments SET status = 'spam' WHERE status = 'rejected'"))
+        db.session.commit()
+        drift = status_counters.reconcile(['comments'])
+        self.assertEqual(drift, {'comments': {'rejected': (1, 0), 'spam': (0, 1)}})
+        self.assertEqual(status_counters.counts('comments')['spam'], 1)
+        self.assertEqual(self.comment_stats()['total'], 9)
+
+
+if __name__ == '__main__':
+    unittest.main()
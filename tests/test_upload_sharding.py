@@ -0,0 +1,79 @@
+import unittest
+import sys
+import os
+import io
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models.media import Media
+from app.sharding import shard_rel, find_upload
+from migrate_upload_layout import migrate, flat_files
+
+
+class UploadShardingTest(unittest.TestCase):
+    """Test bố cục shard uploads/ab/cd/<file> và công cụ migrate online"""
+
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+        self.app = create_app('testing')
+        self.app.config['UPLOAD_FOLDER'] = self.upload_dir
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+
+        # Dữ liệu cũ: file nằm phẳng trong uploads/
+        self.names = [f"{i:02x}" + "c0ffee" * 5 + ".jpg" for i in range(30)]
+        for name in self.names:
+            with open(os.path.join(self.upload_dir, name), 'wb') as f:
+                f.write(name.encode())
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.upload_dir, ignore_errors=True)
+
+    def test_01_shard_rel(self):
+        """uuid/sha256 dùng 4 ký tự đầu, tên khác được băm"""
+        self.assertEqual(shard_rel("abcd1234.jpg"), "ab/cd/abcd1234.jpg")
+        self.assertRegex(shard_rel("Anh Phong.png"), r"^[0-9a-f]{2}/[0-9a-f]{2}/Anh Phong\.png$")
+
+    def test_02_migrate_keeps_urls_working(self):
+        """Trước, giữa và sau khi migrate, /uploads/<tên> vẫn trả đúng file"""
+        def check_all():
+            for name in self.names:
+                res = self.client.get(f'/uploads/{name}')
+                self.assertEqual(res.status_code, 200, name)
+                self.assertEqual(res.data, name.encode())
+                res.close()
+
+        check_all()
+        # Lô đầu: chỉ chuyển một phần -> hai bố cục cùng tồn tại
+        moved = 0
+        for name in list(flat_files(self.upload_dir))[:10]:
+            dest = os.path.join(self.upload_dir, *shard_rel(name).split('/'))
+            os.makedirs(os.path.dirname(dest), exist_ok=True)
+            os.replace(os.path.join(self.upload_dir, name), dest)
+            moved += 1
+        check_all()
+
+        moved_rest, skipped = migrate(self.upload_dir, batch_size=7, log=lambda *_: None)
+        self.assertEqual((moved + moved_rest, skipped), (30, 0))
+        self.assertEqual(list(flat_files(self.upload_dir)), [])
+        check_all()
+
+    def test_03_new_upload_goes_to_shard(self):
+        """Upload mới được ghi thẳng vào thư mục shard"""
+        self.client.post('/auth/login', data={'username': 'admin@hotel.com', 'password': 'admin123'})
+        res = self.client.post('/auth/api/upload-thumbnail', data={
+            'file': (io.BytesIO(b'\x00\x00\x00\x18ftypisom\x00\x00\x02\x00isomiso2video-bytes'), 'tour.mp4')
+        }, content_type='multipart/form-data')
+        name = db.session.get(Media, res.get_json()['media_id']).filename
+        self.assertEqual(find_upload(name), os.path.join(self.upload_dir, name[:2], name[2:4], name))
+
+
+if __name__ == '__main__':
+    unittest.main()
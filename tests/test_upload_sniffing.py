@@ -0,0 +1,160 @@
+import unittest
+import sys
+import os
+import io
+import shutil
+import tempfile
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import create_app, db
+from app.models.media import Media
+from app.upload_stream import sniff
+
+BOUNDARY = 'sniff-test-boundary'
+PNG = b'\x89PNG\r\n\x1a\n' + b'\x00' * 100
+MP4 = b'\x00\x00\x00\x18ftypisom\x00\x00\x02\x00isomiso2'
+
+
+class LazyBody(io.RawIOBase):
+    """Body multipart rất lớn sinh dần khi đọc, đếm số bytes server đã đọc"""
+
+    def __init__(self, filename, head, size):
+        self.prefix = (f'--{BOUNDARY}\r\nContent-Disposition: form-data; name="file"; '
+                       f'filename="{filename}"\r\nContent-Type: application/octet-stream\r\n\r\n'
+                       ).encode() + head
+        self.suffix = f'\r\n--{BOUNDARY}--\r\n'.encode()
+        self.length = len(self.prefix) + size + len(self.suffix)
+        self.pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.pos
+
+    def seek(self, offset, whence=0):
+        self.pos = offset + (self.length if whence == 2 else self.pos if whence == 1 else 0)
+        return self.pos
+
+    def readinto(self, buf):
+        n = min(len(buf), self.length - self.pos)
+        end = self.pos + n
+        data = bytearray(n)
+        if self.pos < len(self.prefix):
+            part = self.prefix[self.pos:end]
+            data[:len(part)] = part
+        tail_start = self.length - len(self.suffix)
+        if end > tail_start:
+            part = self.suffix[max(0, self.pos - tail_start):end - tail_start]
+            data[n - len(part):] = part
+        buf[:n] = data
+        self.pos = end
+        return n
+
+
+class UploadSniffingTest(unittest.TestCase):
+    """Test kiểm tra magic bytes + giới hạn dung lượng trong lúc stream upload"""
+
+    def setUp(self):
+        self.upload_dir = tempfile.mkdtemp()
+        self.app = create_app('testing')
+        self.app.config['UPLOAD_FOLDER'] = self.upload_dir
+        self.client = self.app.test_client()
+        self.app_context = self.app.app_context()
+        self.app_context.push()
+        self.client.post('/auth/login', data={'username': 'admin@hotel.com', 'password': 'admin123'})
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+        shutil.rmtree(self.upload_dir, ignore_errors=True)
+
+    def stored_files(self):
+        return [f for _, _, files in os.walk(self.upload_dir) for f in files]
+
+    def upload(self, data, name):
+        return self.client.post('/auth/api/upload-thumbnail', data={'file': (io.BytesIO(data), name)},
+                                content_type='multipart/form-data')
+
+    def post_lazy(self, body):
+        return self.client.post('/auth/api/upload-thumbnail', input_stream=body,
+                                content_length=body.length,
+                                content_type=f'multipart/form-data; boundary={BOUNDARY}')
+
+    def test_01_sniff(self):
+        self.assertEqual(sniff(b'\xff\xd8\xff\xe0'), 'jpeg')
+        self.assertEqual(sniff(PNG), 'png')
+        self.assertEqual(sniff(MP4), 'mp4')
+        self.assertEqual(sniff(b'\x00\x00\x00\x1cftypavif'), 'heif')
+        self.assertEqual(sniff(b'RIFF\x00\x00\x00\x00WEBPVP8 '), 'webp')
+        self.assertEqual(sniff(b'\xef\xbb\xbf<?xml version="1.0"?>\n<svg>'), 'svg')
+        self.assertIsNone(sniff(b'PK\x03\x04'))
+        self.assertIsNone(sniff(b'<html><script>'))
+
+    def test_02_mismatch_and_disallowed(self):
+        """Sai nội dung / phần mở rộng không hỗ trợ -> 415, không ghi file, không tạo Media"""
+        res = self.upload(PNG, 'tour.mp4')
+        self.assertEqual(res.status_code, 415)
+        self.assertEqual(self.upload(b'MZ\x90\x00' * 100, 'setup.exe').status_code, 415)
+        self.assertEqual(self.upload(b'<html><script>alert(1)</script>', 'phong.svg').status_code, 415)
+        self.assertEqual(self.upload(b'', 'rong.jpg').status_code, 415)
+        self.assertEqual(self.stored_files(), [])
+        self.assertEqual(Media.query.count(), 0)
+
+        self.assertEqual(self.client.post('/auth/api/upload-thumbnail', data={}).status_code, 400)
+        self.assertEqual(self.upload(PNG, '').status_code, 400)
+
+    def test_03_extension_from_content(self):
+        """Không có phần mở rộng -> lấy theo magic bytes"""
+        res = self.upload(PNG, 'anh-phong')
+        self.assertEqual(res.status_code, 200)
+        self.assertTrue(res.get_json()['url'].endswith('.png'))
+        media = db.session.get(Media, res.get_json()['media_id'])
+        self.assertEqual((media.type, media.size), ('image', len(PNG)))
+
+        res = self.upload(MP4 + b'\x00' * 50, 'clip')
+        self.assertEqual(db.session.get(Media, res.get_json()['media_id']).type, 'video')
+
+    def test_04_abort_early(self):
+        """File 2 GB ghi nhầm đuôi bị cắt sau vài KB; vượt giới hạn ảnh bị cắt trong lúc stream"""
+        self.app.config['UPLOAD_MAX_VIDEO_BYTES'] = 4 * 1024 ** 3
+        body = LazyBody('phong.jpg', b'PK\x03\x04', 2 * 1024 ** 3)
+        self.assertEqual(self.post_lazy(body).status_code, 415)
+        self.assertLess(body.pos, 256 * 1024)
+
+        self.app.config['UPLOAD_MAX_IMAGE_BYTES'] = 100_000
+        body = LazyBody('phong.jpg', b'\xff\xd8\xff\xe0', 50 * 1024 * 1024)
+        res = self.post_lazy(body)
+        self.assertEqual(res.status_code, 413)
+        self.assertLess(body.pos, 512 * 1024)
+        self.assertEqual(self.stored_files(), [])
+
+        # Body lớn hơn mọi giới hạn -> từ chối trước khi đọc
+        self.app.config['UPLOAD_MAX_VIDEO_BYTES'] = 1024 ** 2
+        body = LazyBody('tour.mp4', MP4, 50 * 1024 * 1024)
+        self.assertEqual(self.post_lazy(body).status_code, 413)
+        self.assertEqual(body.pos, 0)
+
+    def test_05_svg_served_sandboxed(self):
+        """SVG (có thể chứa script) phục vụ dạng attachment + CSP sandbox, ảnh khác thì không"""
+        svg = b'<svg xmlns="http://www.w3.org/2000/svg"><script>alert(1)</script></svg>'
+        res = self.client.get(self.upload(svg, 'so-do.svg').get_json()['url'])
+        self.assertEqual(res.status_code, 200)
+        self.assertEqual(res.headers['Content-Security-Policy'], 'sandbox')
+        self.assertTrue(res.headers['Content-Disposition'].startswith('attachment'))
+        self.assertEqual(res.headers['X-Content-Type-Options'], 'nosniff')
+        res.close()
+
+        res = self.client.get(self.upload(PNG, 'phong.png').get_json()['url'])
+        self.assertNotIn('Content-Security-Policy', res.headers)
+        self.assertFalse(res.headers.get('Content-Disposition', '').startswith('attachment'))
+        res.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+"""
+HỌC LẠI BỘ LỌC SPAM BÌNH LUẬN (offline)
+
+Đọc các bình luận đã được người duyệt duyệt / từ chối (bỏ qua dòng do bộ lọc tự
+xử lý), học Naive Bayes trên n-gram ký tự và ghi file model (mặc định
+instance/spam_model.npz). App đang chạy tự nạp model mới, không cần khởi động lại.
+
+Chạy:  python train_spam_filter.py [--evaluate] [--triage] [--rescore]
+  --evaluate  học thử trên 90% dữ liệu, báo cáo kết quả định tuyến trên 10% còn lại
+  --triage    sau khi học, chấm và định tuyến các bình luận pending chưa chấm
+  --rescore   (cùng --triage) chấm lại cả bình luận đang chờ người duyệt
+"""
+import argparse
+
+from app import create_app
+from app.spam_filter import SpamFilterError, retrain, thresholds, triage_pending
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--evaluate", action="store_true")
+    parser.add_argument("--triage", action="store_true")
+    parser.add_argument("--rescore", action="store_true")
+    args = parser.parse_args()
+
+    app = create_app()
+    with app.app_context():
+        try:
+            result = retrain(evaluate_holdout=args.evaluate)
+        except SpamFilterError as e:
+            raise SystemExit(f"❌ {e}")
+        print(f"✅ Đã học từ {result['ham']} bình luận hợp lệ, {result['spam']} spam -> {result['path']}")
+
+        report = result.get("evaluation")
+        if report:
+            approve_below, reject_above = thresholds()
+            n = max(1, report["comments"])
+            print(f"📊 Đánh giá trên {report['comments']} bình luận giữ lại "
+                  f"(tự duyệt khi P(spam) <= {approve_below}, tự từ chối khi >= {reject_above}):")
+            print(f"   tự duyệt    {report['auto_approved']:>7} ({report['auto_approved'] / n:.1%}), "
+                  f"lọt spam {report['spam_approved']}")
+            print(f"   tự từ chối  {report['auto_rejected']:>7} ({report['auto_rejected'] / n:.1%}), "
+                  f"chặn nhầm {report['ham_rejected']}")
+            print(f"   chờ duyệt   {report['review']:>7} ({report['review'] / n:.1%})")
+
+        if args.triage:
+            summary = triage_pending(rescore=args.rescore)
+            if summary is None:
+                print("⚠️  Bộ lọc spam đang tắt (SPAM_FILTER)")
+            else:
+                print(f"🗂  Tự duyệt {summary['approved']}, tự từ chối {summary['rejected']}, "
+                      f"chờ duyệt {summary['review']}")